@@ -0,0 +1,48 @@
+"""
+Checks that the copies of files shared between separately deployed
+directories are identical.
+
+Each directory listed below is packaged and deployed on its own, so these
+files cannot be imported from one place and are copied instead. Exits with
+status 1 and names the differing copies if any of them drifted apart.
+
+Usage: python check_shared_files.py
+"""
+
+import hashlib
+import os
+import sys
+from typing import Dict, List
+
+# Every copy of each shared file, relative to the repository root
+SHARED_FILES: Dict[str, List[str]] = {
+    "logging_config.py": [
+        "event_management_local_agent_system/tools/logging_config.py",
+        "event_management_remote_agent_system/logging_config.py",
+        "event_management_remote_agent_system/src/tools/logging_config.py",
+    ],
+}
+
+
+def digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def main() -> int:
+    root = os.path.dirname(os.path.abspath(__file__))
+    failed = False
+    for name, copies in SHARED_FILES.items():
+        digests = {path: digest(os.path.join(root, path)) for path in copies}
+        if len(set(digests.values())) > 1:
+            failed = True
+            print(f"The copies of {name} differ:")
+            for path, value in digests.items():
+                print(f"  {value[:12]}  {path}")
+        else:
+            print(f"OK: {len(copies)} identical copies of {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
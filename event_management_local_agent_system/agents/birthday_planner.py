@@ -1,10 +1,29 @@
+from typing import List
+
 from google.adk.agents import LlmAgent
+from pydantic import BaseModel, Field
 import logging
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
+
+
+class PartyTheme(BaseModel):
+    """One party suggestion; only `id`, `name` and `summary` reach the organizer."""
+
+    id: str = Field(description="Short identifier, e.g. '1'.")
+    name: str = Field(description="Theme name, at most a few words.")
+    summary: str = Field(description="One sentence, under 25 words.")
+    details: str = Field(
+        description="Descriptive and fun plan: decorations, activities, food."
+    )
+
+
+class PartyIdeas(BaseModel):
+    """Structured output of the Birthday Planner Agent."""
+
+    themes: List[PartyTheme] = Field(description="3 to 5 distinct themes.")
+
 
 # Create the Birthday Planner Agent
 birthday_planner_agent = LlmAgent(
@@ -14,10 +33,14 @@ birthday_planner_agent = LlmAgent(
     instruction=(
         "You are a specialized Birthday Party Idea Generator.\n"
         "Given the age and interests of the birthday person, provide 3-5 creative and distinct "
-        "theme or activity suggestions suitable for them. Be descriptive and fun!\n"
-        "Do NOT ask any further questions. Only provide suggestions based on the input given.\n"
-        "Present your suggestions clearly."
+        "theme or activity suggestions suitable for them.\n"
+        "For each theme give a short name, a one-sentence summary, and in 'details' a "
+        "descriptive and fun plan (decorations, activities, food).\n"
+        "Do NOT ask any further questions. Only provide suggestions based on the input given."
     ),
+    output_schema=PartyIdeas,
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
     tools=[],
 )
-logging.info("Birthday Planner Agent initialized.")
+logger.info("Birthday Planner Agent initialized.")
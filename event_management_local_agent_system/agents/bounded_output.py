@@ -0,0 +1,145 @@
+import json
+import logging
+import uuid
+from typing import Any, Dict
+
+from google.adk.agents import BaseAgent
+from google.adk.tools import ToolContext
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Field of structured specialist output holding prose kept out of the history
+DETAILS_FIELD = "details"
+
+
+def _details_artifact(detail_id: str) -> str:
+    return f"details_{detail_id}.md"
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+class BoundedAgentTool(AgentTool):
+    """
+    AgentTool whose result stays small in the calling agent's history.
+
+    Whatever a specialist returns is added to the caller's conversation and
+    re-sent with every later turn. This wrapper moves the long parts of a
+    result out of it: for structured output (an agent with an
+    `output_schema`), every `details` field is saved as a session artifact and
+    replaced by a `detail_id`; free-form text longer than the budget is saved
+    whole and returned clipped. Without an artifact service, `details` stay
+    in the result and are clipped like any other string. Remaining strings
+    are clipped to `max_field_chars`, ending in "…", and trailing list items
+    are dropped until the JSON result fits in `max_result_chars`. The caller
+    fetches details on demand with the `load_details` tool.
+    """
+
+    def __init__(
+        self,
+        agent: BaseAgent,
+        max_result_chars: int = 1200,
+        max_field_chars: int = 160,
+        skip_summarization: bool = False,
+    ):
+        super().__init__(agent=agent, skip_summarization=skip_summarization)
+        self.max_result_chars = max_result_chars
+        self.max_field_chars = max_field_chars
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext):
+        result = await super().run_async(args=args, tool_context=tool_context)
+        can_offload = tool_context._invocation_context.artifact_service is not None
+        call_id = uuid.uuid4().hex[:6]
+
+        if isinstance(result, str):
+            if len(result) <= self.max_result_chars:
+                return result
+            # Leave room for the detail_id next to the clipped text
+            compact: Dict[str, Any] = {
+                "summary": _clip(result, self.max_result_chars - 64)
+            }
+            if can_offload:
+                await self._save_details(tool_context, call_id, result)
+                compact["detail_id"] = call_id
+            return self._fit(compact)
+
+        compact = await self._offload(result, call_id, tool_context, can_offload)
+        return self._fit(compact)
+
+    async def _offload(
+        self, value: Any, call_id: str, tool_context: ToolContext, can_offload: bool
+    ) -> Any:
+        if isinstance(value, list):
+            return [
+                await self._offload(v, call_id, tool_context, can_offload)
+                for v in value
+            ]
+        if not isinstance(value, dict):
+            if isinstance(value, str):
+                return _clip(value, self.max_field_chars)
+            return value
+        compact = {}
+        for key, item in value.items():
+            if key == DETAILS_FIELD and isinstance(item, str) and can_offload:
+                detail_id = f"{call_id}-{value.get('id', len(compact))}"
+                await self._save_details(tool_context, detail_id, item)
+                compact["detail_id"] = detail_id
+                continue
+            compact[key] = await self._offload(item, call_id, tool_context, can_offload)
+        return compact
+
+    async def _save_details(
+        self, tool_context: ToolContext, detail_id: str, text: str
+    ) -> None:
+        await tool_context.save_artifact(
+            filename=_details_artifact(detail_id),
+            artifact=types.Part(text=text),
+        )
+
+    def _fit(self, compact: Dict[str, Any]) -> Dict[str, Any]:
+        """Drops trailing list items until the result fits the budget."""
+        dropped = 0
+        while len(json.dumps(compact)) > self.max_result_chars:
+            lists = [v for v in compact.values() if isinstance(v, list) and v]
+            if not lists:
+                break
+            max(lists, key=len).pop()
+            dropped += 1
+        if dropped:
+            compact["omitted_items"] = dropped
+            logger.info(
+                "Result of '%s' over %d characters; omitted %d items",
+                self.name,
+                self.max_result_chars,
+                dropped,
+            )
+        return compact
+
+
+async def load_details(detail_id: str, tool_context: ToolContext) -> dict:
+    """
+    Loads the full text behind a `detail_id` returned by a specialist agent.
+
+    Use it only when the user wants more than the summary, e.g. the full
+    description of one party theme they picked.
+
+    Args:
+        detail_id: The `detail_id` from a specialist's result, e.g. "3fa2c1-2".
+
+    Returns:
+        dict: Contains the status and the full text.
+    """
+    try:
+        artifact = await tool_context.load_artifact(_details_artifact(detail_id))
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    if artifact is None or not artifact.text:
+        return {
+            "status": "error",
+            "message": f"No details found for detail_id '{detail_id}'.",
+        }
+    return {"status": "success", "detail_id": detail_id, "details": artifact.text}
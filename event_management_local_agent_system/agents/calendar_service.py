@@ -1,57 +1,107 @@
 import os
+from typing import Optional
 from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, SseServerParams
+from google.adk.tools import FunctionTool
+from google.adk.tools.mcp_tool.mcp_toolset import SseServerParams
 from google.adk.models.anthropic_llm import Claude
 from google.adk.models.registry import LLMRegistry
 import logging
 from dotenv import load_dotenv
 
+from .mcp_client import load_mcp_tools, wrap_with_backoff
+from .write_behind import MCP_WRITE_BEHIND, WriteBehindTool, get_write_behind_queue
+
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 # Load and set environment variables from .env file
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 MCP_CALENDAR_SERVER_URL = os.getenv(
     "MCP_CALENDAR_SERVICE_URL", "http://0.0.0.0:8080/sse"
 )
+# Sent as X-Client-Id when set; only a calendar server run with
+# ADMISSION_CLIENT_KEY=client-id keys its per-client admission limits on it
+MCP_CLIENT_ID = os.getenv("MCP_CLIENT_ID", "")
+
+# Tools whose calls are queued locally and sent later when write-behind is on
+WRITE_BEHIND_TOOLS = {"create_calendar_event"}
 
 # Register Claude Model for ADK
 LLMRegistry.register(Claude)
-logging.info("Claude model registered with LLMRegistry.")
+logger.info("Claude model registered with LLMRegistry.")
 
 
-async def create_calendar_service_agent():
+async def create_calendar_service_agent(
+    mcp_url: Optional[str] = None, write_behind: Optional[bool] = None
+):
     """
-    Creates the CalendarServiceAgent, asynchronously fetching tools from the MCP server.
+    Creates the CalendarServiceAgent with the tools of the MCP server.
+
+    Args:
+        mcp_url: The MCP Calendar Service SSE endpoint (default MCP_CALENDAR_SERVICE_URL).
+        write_behind: Queue new events locally and create them in the background
+            (default MCP_WRITE_BEHIND).
     """
+    mcp_url = mcp_url or MCP_CALENDAR_SERVER_URL
+    logger.info("Loading tools of the MCP Calendar Service at: %s", mcp_url)
 
-    logging.info(
-        f"Attempting to connect to MCP Calendar Service at: {MCP_CALENDAR_SERVER_URL}"
+    # Load the tools from the manifest cache; the connection opens on first use
+    connection_params = SseServerParams(
+        url=mcp_url, headers={"X-Client-Id": MCP_CLIENT_ID} if MCP_CLIENT_ID else None
     )
+    mcp_tools, exit_stack = await load_mcp_tools(connection_params=connection_params)
+
+    logger.info("Loaded %d tools of the MCP Calendar Service.", len(mcp_tools))
 
-    # Fetch tools from the MCP Calendar Service
-    mcp_tools, exit_stack = await MCPToolset.from_server(
-        connection_params=SseServerParams(url=MCP_CALENDAR_SERVER_URL)
+    # Retry calls the server sheds under load, with jittered backoff
+    mcp_tools = wrap_with_backoff(mcp_tools)
+
+    instruction = (
+        "You are a Calendar Assistant connected to an external calendar service.\n"
+        "Use the tool 'check_calendar_availability' to check for free time slots; pass several calendar_ids to find a time when everyone is free.\n"
+        "Use the tool 'create_calendar_event' to schedule new events.\n"
+        "Use the tool 'search_calendar_events' to find existing events by words in their title or description (e.g. 'when is the pixel party?'), optionally within start_date and end_date; it returns their event IDs, dates and times.\n"
+        "Use the tools 'import_calendar_events' and 'export_calendar_events' to move whole calendars in or out as iCalendar (.ics) files.\n"
+        "Ensure you have all necessary details (date, time, duration, title, description) before creating an event.\n"
+        "If a tool reports that the calendar service is down, tell the user right away instead of retrying.\n"
+        "Confirm actions with the user."
     )
 
-    logging.info(f"Fetched {len(mcp_tools)} tools from MCP Calendar Service.")
+    write_behind = MCP_WRITE_BEHIND if write_behind is None else write_behind
+    if write_behind:
+        # Answer with the event's ID at once; the queue creates the event later
+        queue = get_write_behind_queue(connection_params)
+        queue.start()
+        exit_stack.push_async_callback(queue.release)
+        mcp_tools = [
+            WriteBehindTool(tool, queue) if tool.name in WRITE_BEHIND_TOOLS else tool
+            for tool in mcp_tools
+        ]
+
+        def check_calendar_sync_status() -> dict:
+            """
+            Reports events that were accepted but may not be saved yet.
+
+            Returns:
+                dict: The events still waiting to be saved, the event IDs of saved
+                ones by the ID they were accepted with, and the ones that failed.
+            """
+            return {"status": "success", **queue.status()}
+
+        mcp_tools.append(FunctionTool(check_calendar_sync_status))
+        instruction += (
+            "\n'create_calendar_event' answers with status 'pending' and the event's ID: "
+            "tell the user the event is being saved. Use 'check_calendar_sync_status' to confirm it was created."
+        )
 
     agent = LlmAgent(
         name="CalendarServiceAgent",
         model="claude-3-7-sonnet@20250219",
         description="Manages calendar operations like checking availability and creating events by connecting to an MCP Calendar Service.",
-        instruction=(
-            "You are a Calendar Assistant connected to an external calendar service.\n"
-            "Use the tool 'check_calendar_availability' to check for free time slots.\n"
-            "Use the tool 'create_calendar_event' to schedule new events.\n"
-            "Ensure you have all necessary details (date, time, duration, title, description) before creating an event.\n"
-            "Confirm actions with the user."
-        ),
+        instruction=instruction,
         tools=mcp_tools,
     )
-    logging.info(
+    logger.info(
         "Calendar Service Agent initialized with tools from MCP Calendar Service."
     )
     return agent, exit_stack
@@ -0,0 +1,98 @@
+import logging
+import os
+import time
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Consecutive connection failures that open the circuit
+MCP_BREAKER_FAILURES = int(os.getenv("MCP_BREAKER_FAILURES", "3"))
+# Seconds an open circuit fails calls before letting one through again
+MCP_BREAKER_RESET_SECONDS = float(os.getenv("MCP_BREAKER_RESET_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency that is known to be down."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            f"{name} is unavailable; retry_after={retry_after:.1f} seconds"
+        )
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails calls to a dependency immediately while it is down.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `before_call` raises `CircuitOpenError` without waiting on the network.
+    After `reset_timeout` seconds a single call is let through as a probe
+    (half-open) while the others keep failing fast: its success closes the
+    circuit, its failure opens it for another `reset_timeout`. A probe that
+    never reports back is replaced after `reset_timeout`. `record_success`
+    may also be called by a background reconnect that found the dependency
+    healthy again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = MCP_BREAKER_FAILURES,
+        reset_timeout: float = MCP_BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self) -> None:
+        if self.state == self.OPEN:
+            remaining = self.retry_after()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = self.HALF_OPEN
+            logger.info("Circuit for %s is half-open; trying a call", self.name)
+        elif self.state == self.HALF_OPEN:
+            # One probe at a time; the rest fail fast until it reports back
+            remaining = self.probe_started + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, min(remaining, 1.0))
+            logger.info("Probe of %s did not report back; trying another", self.name)
+        else:
+            return
+        self.probe_started = time.monotonic()
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Circuit for %s closed; the service is back", self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    "Circuit for %s opened after %d failures; failing fast for %.0fs",
+                    self.name,
+                    self.failures,
+                    self.reset_timeout,
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
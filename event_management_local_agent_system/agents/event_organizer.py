@@ -1,13 +1,13 @@
 from google.adk.agents import LlmAgent
-from google.adk.tools import agent_tool
+from google.adk.tools import FunctionTool, load_memory
 from google.adk.models.anthropic_llm import Claude
 from google.adk.models.registry import LLMRegistry
 import logging
 
+from .bounded_output import BoundedAgentTool, load_details
+
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 
 # Create the Event Organizer Agent
@@ -31,14 +31,18 @@ def create_event_organizer_agent(
             f"- '{planner_agent_instance.name}': This agent is an expert at brainstorming birthday party ideas, themes, or activities. Delegate to it ONLY for generating these ideas.\n"
             f"- '{calendar_agent_instance.name}': This agent handles all calendar-related tasks, specifically creating calendar events using the 'create_calendar_event' tool. Delegate to it for scheduling.\n"
             "Your primary job is to understand the user's request and delegate to the correct specialist agent.\n"
-            "If the user asks for birthday ideas, delegate to the BirthdayPlannerAgent.\n"
+            "If the user asks for birthday ideas, delegate to the BirthdayPlannerAgent. It returns compact themes; present their names and summaries.\n"
+            "Specialist results may carry a 'detail_id'. Call 'load_details' with it only when the user wants the full description of one item.\n"
             "If the user asks to create a calendar event, delegate to the CalendarServiceAgent. Ensure you have all details like date, time, duration, title, and description before asking CalendarServiceAgent to create an event.\n"
+            "Before asking the user for details they may have shared in past conversations (ages, interests, preferred venues, family members), use the 'load_memory' tool to look them up.\n"
             "If the request is unclear, ask clarifying questions to determine which specialist to use or what information is missing for a task."
         ),
         tools=[
-            agent_tool.AgentTool(agent=planner_agent_instance),
-            agent_tool.AgentTool(agent=calendar_agent_instance),
+            BoundedAgentTool(agent=planner_agent_instance),
+            BoundedAgentTool(agent=calendar_agent_instance),
+            FunctionTool(load_details),
+            load_memory,
         ],
     )
-    logging.info(f"Organizer Agent defined")
+    logger.info("Organizer Agent defined")
     return organizer
@@ -0,0 +1,451 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+import httpx
+from google.adk.tools import BaseTool, ToolContext
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    MCPSessionManager,
+    SseServerParams,
+)
+from google.adk.tools.openapi_tool.openapi_spec_parser.rest_api_tool import (
+    to_gemini_schema,
+)
+from google.genai import types
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.types import Tool as McpBaseTool
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Directory holding the cached tool manifests, one file per MCP server URL
+MCP_TOOL_CACHE_DIR = os.getenv("MCP_TOOL_CACHE_DIR", ".mcp_cache")
+
+# Seconds to wait for the SSE connection to open and for one tool call
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "30"))
+# Upper bound of the delay between background reconnect attempts
+MCP_RECONNECT_MAX_DELAY = float(os.getenv("MCP_RECONNECT_MAX_DELAY", "30"))
+# Background reconnect attempts before leaving it to the next call's probe
+MCP_RECONNECT_MAX_ATTEMPTS = int(os.getenv("MCP_RECONNECT_MAX_ATTEMPTS", "10"))
+
+# The calendar server reports shed calls as "<reason>; retry_after=<seconds>"
+_RETRY_AFTER_RE = re.compile(r"retry_after=(\d+(?:\.\d+)?)")
+
+
+def _retry_after(result: Any) -> Optional[float]:
+    """Returns the server's retry hint if `result` is an overload rejection."""
+    if not getattr(result, "isError", False):
+        return None
+    for content in getattr(result, "content", None) or []:
+        match = _RETRY_AFTER_RE.search(getattr(content, "text", "") or "")
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class BackoffTool(BaseTool):
+    """
+    Wraps an MCP tool and retries calls the server shed because it was overloaded.
+
+    Each retry waits for the server's retry-after hint plus a random jitter
+    that grows exponentially with the attempt number, so clients rejected at
+    the same moment do not all come back at the same moment.
+    """
+
+    def __init__(
+        self,
+        tool: BaseTool,
+        max_retries: int = 4,
+        base_delay: float = 0.25,
+        max_delay: float = 10.0,
+    ):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            is_long_running=tool.is_long_running,
+        )
+        self.tool = tool
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        return self.tool._get_declaration()
+
+    def backoff_delay(self, attempt: int, retry_after: float) -> float:
+        jitter = random.uniform(0, self.base_delay * 2**attempt)
+        return min(self.max_delay, retry_after + jitter)
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext):
+        for attempt in range(self.max_retries + 1):
+            result = await self.tool.run_async(args=args, tool_context=tool_context)
+            retry_after = _retry_after(result)
+            if retry_after is None or attempt == self.max_retries:
+                return result
+            delay = self.backoff_delay(attempt, retry_after)
+            logger.warning(
+                "Tool '%s' was shed by the server; retrying in %.2fs (attempt %d/%d)",
+                self.name,
+                delay,
+                attempt + 1,
+                self.max_retries,
+            )
+            await asyncio.sleep(delay)
+        return result
+
+
+def wrap_with_backoff(tools: List[BaseTool], **kwargs: Any) -> List[BaseTool]:
+    """Wraps every tool in a `BackoffTool`."""
+    return [BackoffTool(tool, **kwargs) for tool in tools]
+
+
+class LazyMCPConnection:
+    """
+    An MCP session that is only opened when a tool is first called.
+
+    The session lives in a dedicated task, because the SSE client's cancel
+    scopes must be exited by the task that entered them; `aclose` can then be
+    called from any task.
+
+    Calls go through a `CircuitBreaker`: connecting and calling are bounded
+    by timeouts, and once the server keeps failing, calls fail immediately
+    instead of each waiting for a timeout. A lost connection is re-established
+    in the background with exponential backoff and jitter, capped at
+    `reconnect_max_delay`, which closes the circuit again as soon as the
+    server answers. After `reconnect_max_attempts` failed attempts the
+    reconnect gives up; the breaker's next probe call starts a new one.
+    """
+
+    def __init__(
+        self,
+        connection_params: SseServerParams,
+        breaker: Optional[CircuitBreaker] = None,
+        connect_timeout: float = MCP_CONNECT_TIMEOUT,
+        call_timeout: float = MCP_CALL_TIMEOUT,
+        reconnect_base_delay: float = 0.5,
+        reconnect_max_delay: float = MCP_RECONNECT_MAX_DELAY,
+        reconnect_max_attempts: int = MCP_RECONNECT_MAX_ATTEMPTS,
+    ):
+        self.connection_params = connection_params
+        self.breaker = breaker or CircuitBreaker(connection_params.url)
+        self.connect_timeout = connect_timeout
+        self.call_timeout = call_timeout
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.reconnect_max_attempts = reconnect_max_attempts
+        self.session: Optional[ClientSession] = None
+        self._lock = asyncio.Lock()
+        self._close: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    async def get_session(self) -> ClientSession:
+        async with self._lock:
+            if self.session is None:
+                ready = asyncio.get_running_loop().create_future()
+                self._close = asyncio.Event()
+                self._task = asyncio.create_task(self._hold(ready, self._close))
+                try:
+                    self.session = await asyncio.wait_for(
+                        asyncio.shield(ready), self.connect_timeout
+                    )
+                except BaseException:
+                    self._task.cancel()
+                    self._close = self._task = None
+                    raise
+                logger.info("Connected to MCP server at %s", self.connection_params.url)
+            return self.session
+
+    async def _hold(self, ready: asyncio.Future, close: asyncio.Event) -> None:
+        try:
+            async with AsyncExitStack() as exit_stack:
+                manager = MCPSessionManager(self.connection_params, exit_stack)
+                ready.set_result(await manager.create_session())
+                await close.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(
+                    "MCP connection to %s closed: %s", self.connection_params.url, e
+                )
+
+    async def ping(self) -> None:
+        """Pings the session, opening it first; a failed ping closes it."""
+        try:
+            session = await self.get_session()
+            await asyncio.wait_for(session.send_ping(), self.connect_timeout)
+        except Exception:
+            # The next call or health check opens a fresh session
+            await self._close_session()
+            raise
+
+    async def call_tool(self, name: str, args: dict[str, Any]) -> Any:
+        """Calls a tool; raises `CircuitOpenError` at once while the server is down."""
+        self.breaker.before_call()
+        try:
+            result = await self._call(name, args)
+        except McpError:
+            # The server answered, so the connection itself is fine
+            self.breaker.record_success()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            self._connection_lost(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _call(self, name: str, args: dict[str, Any]) -> Any:
+        session = await self.get_session()
+        try:
+            return await asyncio.wait_for(
+                session.call_tool(name, arguments=args), self.call_timeout
+            )
+        except anyio.ClosedResourceError:
+            # The server restarted since we connected; reconnect once
+            await self._close_session()
+            session = await self.get_session()
+            return await asyncio.wait_for(
+                session.call_tool(name, arguments=args), self.call_timeout
+            )
+
+    def _connection_lost(self, error: Exception) -> None:
+        logger.warning(
+            "Call to MCP server at %s failed: %r", self.connection_params.url, error
+        )
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        await self._close_session()
+        for attempt in range(1, self.reconnect_max_attempts + 1):
+            # The exponent is bounded too, so the delay never overflows a float
+            delay = min(
+                self.reconnect_max_delay,
+                self.reconnect_base_delay * 2 ** min(attempt - 1, 32),
+            )
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            try:
+                session = await self.get_session()
+                await asyncio.wait_for(session.send_ping(), self.connect_timeout)
+            except Exception as e:
+                logger.info(
+                    "Reconnecting to %s failed (attempt %d): %r",
+                    self.connection_params.url,
+                    attempt,
+                    e,
+                )
+                await self._close_session()
+                continue
+            self.breaker.record_success()
+            return
+        logger.warning(
+            "Gave up reconnecting to %s after %d attempts",
+            self.connection_params.url,
+            self.reconnect_max_attempts,
+        )
+
+    async def _close_session(self) -> None:
+        async with self._lock:
+            self.session = None
+            if self._close is not None:
+                self._close.set()
+            if self._task is not None:
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._close = self._task = None
+
+    async def aclose(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        await self._close_session()
+
+
+class LazyMCPTool(BaseTool):
+    """
+    An MCP tool declared from a cached schema that connects on its first call.
+
+    Calls that cannot reach the server return an error result, so the agent
+    can tell the user right away instead of the turn failing.
+    """
+
+    def __init__(self, mcp_tool: McpBaseTool, connection: LazyMCPConnection):
+        super().__init__(name=mcp_tool.name, description=mcp_tool.description or "")
+        self.mcp_tool = mcp_tool
+        self.connection = connection
+
+    @property
+    def mcp_session(self) -> Optional[ClientSession]:
+        return self.connection.session
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=to_gemini_schema(self.mcp_tool.inputSchema),
+        )
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext):
+        try:
+            return await self.connection.call_tool(self.name, args)
+        except CircuitOpenError as e:
+            return {
+                "status": "error",
+                "message": f"The service behind '{self.name}' is down; "
+                f"try again in {e.retry_after:.0f} seconds.",
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Could not reach the service behind '{self.name}': {e!r}",
+            }
+
+
+def manifest_url(sse_url: str) -> str:
+    """Derives the tool manifest URL from the server's SSE endpoint."""
+    base = sse_url[: -len("/sse")] if sse_url.endswith("/sse") else sse_url
+    return base.rstrip("/") + "/tools/manifest"
+
+
+class ToolManifestCache:
+    """Stores the tool manifest of each MCP server as a JSON file on disk."""
+
+    def __init__(self, cache_dir: str = MCP_TOOL_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"tools_{digest}.json")
+
+    def load(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(url), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("url") == url else None
+
+    def save(self, url: str, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(url)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({**manifest, "url": url}, f)
+        os.replace(path + ".tmp", path)
+
+
+async def fetch_manifest(
+    connection_params: SseServerParams,
+    version: Optional[str] = None,
+    timeout: float = 5.0,
+) -> Optional[Dict[str, Any]]:
+    """Downloads the tool manifest; returns None if `version` is still current."""
+    headers = dict(connection_params.headers or {})
+    if version:
+        headers["If-None-Match"] = f'"{version}"'
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        response = await client.get(
+            manifest_url(connection_params.url), headers=headers
+        )
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def _apply_manifest(tools: List[LazyMCPTool], manifest: Dict[str, Any]) -> None:
+    """Updates already built tools in place with newer schemas."""
+    schemas = {t["name"]: McpBaseTool.model_validate(t) for t in manifest["tools"]}
+    for tool in tools:
+        schema = schemas.pop(tool.name, None)
+        if schema is None:
+            logger.warning("MCP tool '%s' no longer exists on the server", tool.name)
+            continue
+        tool.mcp_tool = schema
+        tool.description = schema.description or ""
+    if schemas:
+        logger.info(
+            "New MCP tools %s will be available to newly built agents", list(schemas)
+        )
+
+
+async def _revalidate(
+    connection_params: SseServerParams,
+    cache: ToolManifestCache,
+    cached: Dict[str, Any],
+    tools: List[LazyMCPTool],
+) -> None:
+    try:
+        manifest = await fetch_manifest(connection_params, cached.get("version"))
+    except Exception as e:
+        logger.warning("Could not revalidate the MCP tool manifest: %s", e)
+        return
+    if manifest is None:
+        logger.debug("MCP tool manifest %s is current", cached.get("version"))
+        return
+    logger.info(
+        "MCP tool manifest changed from %s to %s",
+        cached.get("version"),
+        manifest["version"],
+    )
+    cache.save(connection_params.url, manifest)
+    _apply_manifest(tools, manifest)
+
+
+async def load_mcp_tools(
+    connection_params: SseServerParams,
+    cache: Optional[ToolManifestCache] = None,
+) -> Tuple[List[LazyMCPTool], AsyncExitStack]:
+    """
+    Returns the server's tools without waiting for the server when possible.
+
+    Tool schemas come from the on-disk manifest cache; the cached version is
+    revalidated against the server in the background and no MCP session is
+    opened until a tool is called. Only the very first start, with an empty
+    cache, waits for the manifest to download (or for `list_tools` on servers
+    that do not publish one).
+    """
+    cache = cache or ToolManifestCache()
+    connection = LazyMCPConnection(connection_params)
+    exit_stack = AsyncExitStack()
+    exit_stack.push_async_callback(connection.aclose)
+
+    cached = cache.load(connection_params.url)
+    if cached is not None:
+        tools = [
+            LazyMCPTool(McpBaseTool.model_validate(t), connection)
+            for t in cached["tools"]
+        ]
+        task = asyncio.create_task(_revalidate(connection_params, cache, cached, tools))
+        exit_stack.callback(task.cancel)
+        return tools, exit_stack
+
+    try:
+        manifest = await fetch_manifest(connection_params)
+    except httpx.HTTPStatusError:
+        # The server does not publish a manifest; list the tools over MCP
+        session = await connection.get_session()
+        listed = (await session.list_tools()).tools
+        manifest = {
+            "version": None,
+            "tools": [t.model_dump(mode="json", exclude_none=True) for t in listed],
+        }
+    if manifest.get("version"):
+        cache.save(connection_params.url, manifest)
+    tools = [
+        LazyMCPTool(McpBaseTool.model_validate(t), connection)
+        for t in manifest["tools"]
+    ]
+    return tools, exit_stack
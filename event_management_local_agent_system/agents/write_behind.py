@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from google.adk.tools import BaseTool, ToolContext
+from google.adk.tools.mcp_tool.mcp_session_manager import SseServerParams
+from google.genai import types
+from mcp.shared.exceptions import McpError
+
+from .circuit_breaker import CircuitOpenError
+from .mcp_client import LazyMCPConnection, _retry_after
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Directory of the local outboxes of writes not yet sent, one per MCP server
+MCP_OUTBOX_DIR = os.getenv("MCP_OUTBOX_DIR", ".mcp_outbox")
+
+# Queue writes locally and send them in the background instead of waiting
+MCP_WRITE_BEHIND = os.getenv("MCP_WRITE_BEHIND", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+# The calendar create_calendar_event writes to when none is given
+DEFAULT_CALENDAR_ID = "primary"
+
+
+def derived_event_id(args: Dict[str, Any]) -> str:
+    """
+    The ID `create_calendar_event` gives an event created without one: a
+    digest of its calendar, title, date and time (see tools/calendar_tools.py).
+    """
+    key = "\0".join(
+        (
+            str(args.get("calendar_id") or DEFAULT_CALENDAR_ID),
+            str(args.get("title", "")),
+            str(args.get("date", "")),
+            str(args.get("time", "")),
+        )
+    ).encode("utf-8")
+    return f"mcp_event_{hashlib.blake2b(key, digest_size=8).hexdigest()}"
+
+
+def _result_payload(result: Any) -> Dict[str, Any]:
+    """Returns the JSON object an MCP tool result carries as text, if any."""
+    for content in getattr(result, "content", None) or []:
+        text = getattr(content, "text", None)
+        if text:
+            try:
+                payload = json.loads(text)
+            except ValueError:
+                return {"message": text}
+            return payload if isinstance(payload, dict) else {"result": payload}
+    return {}
+
+
+class WriteBehindQueue:
+    """
+    Durable local queue of MCP tool calls that are sent in the background.
+
+    Every queued call gets an ID at once and is appended, fsynced, to a
+    JSONL outbox file, so calls accepted while the server is down also
+    survive a restart of the agent. The file is written by one background
+    thread, in order, so the event loop never waits on the disk. One task
+    sends the calls in order over its own connection; while the server is
+    unreachable it waits, with backoff or until the circuit breaker lets
+    calls through again. Calls the server rejects are reported as failed and
+    not retried. Once the queue is empty and `compact_after` records have been
+    appended, the outbox is rewritten to what is still pending.
+
+    For tools with an `event_id` argument, the call's ID is the event's: the
+    `event_id` the caller gave, e.g. to replace an event it found, or else
+    the one the server would derive (`derived_event_id`). The ID is sent
+    with the call, so resending a call that timed out after it was applied,
+    or queueing the same create twice, replaces the event instead of
+    creating another one. Other calls get a provisional ID, and the ID the
+    server assigns is recorded next to it.
+    """
+
+    def __init__(
+        self,
+        connection_params: SseServerParams,
+        outbox_dir: str = MCP_OUTBOX_DIR,
+        max_delay: float = 30.0,
+        compact_after: int = 1000,
+    ):
+        self.connection = LazyMCPConnection(connection_params)
+        digest = hashlib.sha256(connection_params.url.encode("utf-8")).hexdigest()
+        self.path = os.path.join(outbox_dir, f"outbox_{digest[:16]}.jsonl")
+        self.max_delay = max_delay
+        self.compact_after = compact_after
+        self.pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.synced: Dict[str, str] = {}
+        self.failed: Dict[str, str] = {}
+        self._users = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._appended = 0
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="outbox-writer"
+        )
+        self._load()
+
+    def _load(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by a crash
+                    if record["op"] == "queued":
+                        self.pending[record["id"]] = record
+                    else:
+                        self.pending.pop(record["id"], None)
+        self._rewrite(list(self.pending.values()))
+        if self.pending:
+            logger.info(
+                "%d queued writes to %s will be sent",
+                len(self.pending),
+                self.connection.connection_params.url,
+            )
+
+    def _rewrite(self, records: List[Dict[str, Any]]) -> None:
+        """Replaces the outbox with `records`, keeping only what is unsent."""
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _write(self, function, *args: Any) -> None:
+        # One writer thread keeps the outbox's records in the order submitted
+        await asyncio.get_running_loop().run_in_executor(self._writer, function, *args)
+
+    async def enqueue(
+        self, tool_name: str, args: Dict[str, Any], id_arg: Optional[str] = None
+    ) -> str:
+        """
+        Queues a call and returns its ID once it is on disk: with `id_arg`,
+        the ID of the event it writes, which is sent as that argument.
+        """
+        provisional_id = f"provisional_{uuid.uuid4().hex[:16]}"
+        record = {"op": "queued", "id": provisional_id, "tool": tool_name, "args": args}
+        if id_arg is not None:
+            event_id = args.get(id_arg) or derived_event_id(args)
+            record["args"] = {**args, id_arg: event_id}
+            record["event_id"] = event_id
+        # Pending before it is written, so a compaction cannot drop it
+        self.pending[provisional_id] = record
+        self._appended += 1
+        await self._write(self._append, record)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return record.get("event_id") or provisional_id
+
+    def start(self) -> None:
+        """Starts sending; every `start` must be paired with a `release`."""
+        self._users += 1
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def release(self) -> None:
+        """Stops sending once the last user is gone; unsent calls stay queued."""
+        self._users -= 1
+        if self._users == 0 and self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.connection.aclose()
+
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            if not self.pending:
+                if self._appended >= self.compact_after:
+                    self._appended = 0
+                    await self._write(self._rewrite, [])
+                    continue
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            provisional_id, record = next(iter(self.pending.items()))
+            try:
+                result = await self.connection.call_tool(record["tool"], record["args"])
+            except CircuitOpenError as e:
+                # The connection reconnects on its own; check back regularly
+                await asyncio.sleep(min(e.retry_after, 1.0))
+                continue
+            except McpError as e:
+                await self._finish(provisional_id, error=str(e))
+                continue
+            except Exception:
+                attempt += 1
+                delay = min(self.max_delay, 0.5 * 2**attempt)
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+                continue
+            retry_after = _retry_after(result)
+            if retry_after is not None:
+                await asyncio.sleep(retry_after)
+                continue
+            attempt = 0
+            payload = _result_payload(result)
+            if getattr(result, "isError", False) or payload.get("status") == "error":
+                await self._finish(
+                    provisional_id, error=payload.get("message", str(result))
+                )
+            else:
+                await self._finish(provisional_id, event_id=payload.get("event_id", ""))
+
+    async def _finish(
+        self, provisional_id: str, event_id: str = "", error: Optional[str] = None
+    ) -> None:
+        record = self.pending.pop(provisional_id)
+        # Calls are reported under the ID enqueue returned
+        queued_id = record.get("event_id") or provisional_id
+        if error is None:
+            self.synced[queued_id] = event_id
+            self._appended += 1
+            await self._write(
+                self._append,
+                {"op": "synced", "id": provisional_id, "event_id": event_id},
+            )
+            logger.info("Sent queued %s %s as %s", record["tool"], queued_id, event_id)
+        else:
+            self.failed[queued_id] = error
+            self._appended += 1
+            await self._write(
+                self._append, {"op": "failed", "id": provisional_id, "error": error}
+            )
+            logger.error(
+                "Queued %s %s was rejected: %s", record["tool"], queued_id, error
+            )
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pending": [
+                {
+                    "event_id": record.get("event_id") or provisional_id,
+                    "args": record["args"],
+                }
+                for provisional_id, record in self.pending.items()
+            ],
+            "synced": dict(self.synced),
+            "failed": dict(self.failed),
+        }
+
+
+# One queue per server URL, shared by all agents built in this process
+_queues: Dict[str, WriteBehindQueue] = {}
+
+
+def get_write_behind_queue(connection_params: SseServerParams) -> WriteBehindQueue:
+    queue = _queues.get(connection_params.url)
+    if queue is None:
+        queue = _queues[connection_params.url] = WriteBehindQueue(connection_params)
+    return queue
+
+
+class WriteBehindTool(BaseTool):
+    """Queues calls of a tool instead of making them and answers at once."""
+
+    def __init__(self, tool: BaseTool, queue: WriteBehindQueue):
+        super().__init__(name=tool.name, description=tool.description)
+        self.tool = tool
+        self.queue = queue
+        declaration = tool._get_declaration()
+        properties = (
+            declaration.parameters.properties
+            if declaration is not None and declaration.parameters is not None
+            else None
+        )
+        # Calls that name their event can be resent without creating another
+        self.id_arg = "event_id" if properties and "event_id" in properties else None
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        return self.tool._get_declaration()
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext):
+        queued_id = await self.queue.enqueue(self.name, args, self.id_arg)
+        if self.id_arg is not None:
+            message = "Accepted; it will be saved in the background under this ID."
+        else:
+            message = (
+                "Accepted; it will be saved in the background. "
+                "The ID is provisional until the sync is confirmed."
+            )
+        return {"status": "pending", "event_id": queued_id, "message": message}
@@ -0,0 +1,374 @@
+"""
+Runs planning conversations from a JSONL file through the agents, offline.
+
+Every input line is one conversation:
+
+    {"id": "req-1", "user_id": "alice", "turns": ["Ideas for a 7-year-old?", "Book Saturday 3 PM"]}
+
+("query" may be used instead of "turns" for single-turn requests). Results
+are appended to the output JSONL as each conversation finishes, and the
+output doubles as the checkpoint: rerunning the same command skips every
+item that already has a successful result, so a crashed job resumes where it
+stopped. Failed items are retried on the next run; the last line per id wins.
+An id that occurs on several input lines is processed once per run, for its
+first line; the later lines are skipped with a warning.
+
+An item is rerun from its first turn, so the tool calls of an item that was
+interrupted or failed are made again: items must be safe to repeat. Calendar
+events are idempotent as long as the model repeats the same call, because
+`create_calendar_event` derives the event ID from the calendar, title, date
+and time, so the second call replaces the first event.
+
+Usage: python batch.py requests.jsonl results.jsonl [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import contextvars
+import copy
+import json
+import logging
+import os
+import statistics
+import time
+import uuid
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.agent_tool import AgentTool
+
+from conversation import MEMORY_INDEX_DIR, build_root_agent, interact
+from memory import VectorMemoryService
+from serving import RunnerConfig, RunnerPool
+from tools.logging_config import setup_logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# USD per million input and output tokens, used for the per-item cost estimate
+MODEL_PRICES_PER_MTOK = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "claude-3-7-sonnet@20250219": (3.00, 15.00),
+}
+
+# ADK 0.5 responses carry no token usage, so tokens are estimated from text
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ItemUsage:
+    """Model usage accumulated while processing one batch item."""
+
+    model_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, model: str, input_tokens: int, output_tokens: int) -> None:
+        input_price, output_price = MODEL_PRICES_PER_MTOK.get(model, (0.0, 0.0))
+        self.model_calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += (
+            input_tokens * input_price + output_tokens * output_price
+        ) / 1_000_000
+
+
+_current_usage: contextvars.ContextVar[Optional[ItemUsage]] = contextvars.ContextVar(
+    "batch_item_usage", default=None
+)
+
+
+def _estimate_tokens(contents) -> int:
+    chars = sum(
+        len(part.text or "")
+        for content in contents or []
+        for part in content.parts or []
+    )
+    return chars // CHARS_PER_TOKEN
+
+
+def copy_agent_graph(agent: BaseAgent) -> BaseAgent:
+    """
+    Copies the agents of a graph, including those behind AgentTools, while
+    sharing their models and tools, so that callbacks can be added to the copy
+    without changing agents that are shared at module level.
+    """
+    sub_agents = [copy_agent_graph(sub_agent) for sub_agent in agent.sub_agents]
+    update: Dict[str, Any] = {"sub_agents": sub_agents, "parent_agent": None}
+    if isinstance(agent, LlmAgent):
+        tools = []
+        for tool in agent.tools:
+            if isinstance(tool, AgentTool):
+                tool = copy.copy(tool)
+                tool.agent = copy_agent_graph(tool.agent)
+            tools.append(tool)
+        update["tools"] = tools
+    copied = agent.model_copy(update=update)
+    for sub_agent in sub_agents:
+        sub_agent.parent_agent = copied
+    return copied
+
+
+def track_usage(agent: BaseAgent) -> BaseAgent:
+    """
+    Returns a copy of an agent graph whose LlmAgents charge each model call to
+    the batch item being processed in the current task.
+    """
+    agent = copy_agent_graph(agent)
+    tracked: Set[int] = set()
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        pending.extend(
+            tool.agent
+            for tool in getattr(current, "tools", [])
+            if isinstance(tool, AgentTool)
+        )
+        if not isinstance(current, LlmAgent) or id(current) in tracked:
+            continue
+        tracked.add(id(current))
+        prompt_tokens: contextvars.ContextVar[int] = contextvars.ContextVar(
+            f"prompt_tokens_{current.name}", default=0
+        )
+
+        def before_model(callback_context, llm_request, prompt_tokens=prompt_tokens):
+            instruction = getattr(llm_request.config, "system_instruction", None) or ""
+            prompt_tokens.set(
+                _estimate_tokens(llm_request.contents)
+                + len(str(instruction)) // CHARS_PER_TOKEN
+            )
+
+        def after_model(
+            callback_context,
+            llm_response,
+            model=getattr(current.model, "model", current.model),
+            prompt_tokens=prompt_tokens,
+        ):
+            usage = _current_usage.get()
+            if usage is not None:
+                output = [llm_response.content] if llm_response.content else []
+                usage.add(model, prompt_tokens.get(), _estimate_tokens(output))
+
+        for field, callback in (
+            ("before_model_callback", before_model),
+            ("after_model_callback", after_model),
+        ):
+            existing = getattr(current, field)
+            if existing is None:
+                existing = []
+            elif not isinstance(existing, list):
+                existing = [existing]
+            setattr(current, field, [*existing, callback])
+    return agent
+
+
+async def build_tracked_agent(config: RunnerConfig) -> Tuple[LlmAgent, AsyncExitStack]:
+    agent, exit_stack = await build_root_agent(config)
+    return track_usage(agent), exit_stack
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """
+    Returns the ids that already have a successful result.
+
+    A line cut short by a crash is removed so that appending starts cleanly.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            logger.warning("Removed an incomplete result line from %s", output_path)
+    done = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            result = json.loads(line)
+            if result.get("status") == "ok":
+                done.add(result["id"])
+            else:
+                done.discard(result["id"])
+    return done
+
+
+def read_items(input_path: str) -> Iterator[Dict[str, Any]]:
+    """Streams conversations from the input file without loading it whole."""
+    with open(input_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                logger.error("Skipping invalid JSON on line %d: %s", line_number, e)
+                continue
+            item.setdefault("id", f"line-{line_number}")
+            item["id"] = str(item["id"])
+            if "turns" not in item:
+                item["turns"] = [item["query"]] if item.get("query") else []
+            yield item
+
+
+class BatchRunner:
+    """Processes conversations with bounded concurrency over a RunnerPool."""
+
+    def __init__(
+        self,
+        pool: RunnerPool,
+        config: RunnerConfig,
+        session_service: InMemorySessionService,
+        concurrency: int,
+    ):
+        self.pool = pool
+        self.config = config
+        self.session_service = session_service
+        self.concurrency = concurrency
+        self.results: list = []
+
+    async def process(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        usage = ItemUsage()
+        _current_usage.set(usage)
+        user_id = str(item.get("user_id") or f"batch_user_{item['id']}")
+        session_id = f"batch_session_{item['id']}_{uuid.uuid4().hex[:8]}"
+        result: Dict[str, Any] = {
+            "id": item["id"],
+            "user_id": user_id,
+            "session_id": session_id,
+        }
+        started = time.perf_counter()
+        responses = []
+        try:
+            if not item["turns"]:
+                raise ValueError("The item has neither 'turns' nor 'query'")
+            for query in item["turns"]:
+                async with self.pool.lease(self.config) as runner:
+                    responses.append(
+                        await interact(
+                            app_name=self.config.app_name,
+                            user_id=user_id,
+                            session_id=session_id,
+                            query=query,
+                            session_service=self.session_service,
+                            runner=runner,
+                            raise_errors=True,
+                        )
+                    )
+            result["status"] = "ok"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["responses"] = responses
+        result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        result.update(asdict(usage))
+        result["cost_usd"] = round(usage.cost_usd, 6)
+        return result
+
+    async def run(self, input_path: str, output_path: str) -> Dict[str, Any]:
+        done = load_checkpoint(output_path)
+        if done:
+            logger.info("Resuming: %d items already done", len(done))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.perf_counter()
+        skipped = duplicates = 0
+        queued: Set[str] = set()
+
+        with open(output_path, "a", encoding="utf-8") as output:
+
+            async def worker() -> None:
+                while (item := await queue.get()) is not None:
+                    result = await self.process(item)
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+                    os.fsync(output.fileno())
+                    self.results.append(result)
+                    if len(self.results) % 10 == 0:
+                        self.log_progress(started)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            for item in read_items(input_path):
+                if item["id"] in done:
+                    skipped += 1
+                    continue
+                if item["id"] in queued:
+                    logger.warning("Skipping duplicate id %s in this run", item["id"])
+                    duplicates += 1
+                    continue
+                queued.add(item["id"])
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        return self.summary(started, skipped, duplicates)
+
+    def log_progress(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Processed %d items (%.2f items/s)",
+            len(self.results),
+            len(self.results) / elapsed if elapsed > 0 else 0.0,
+        )
+
+    def summary(self, started: float, skipped: int, duplicates: int) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        processed = len(self.results)
+        latencies = [r["elapsed_seconds"] for r in self.results]
+        total_cost = sum(r["cost_usd"] for r in self.results)
+        return {
+            "processed": processed,
+            "succeeded": sum(r["status"] == "ok" for r in self.results),
+            "failed": sum(r["status"] != "ok" for r in self.results),
+            "skipped_already_done": skipped,
+            "skipped_duplicate_ids": duplicates,
+            "elapsed_seconds": round(elapsed, 2),
+            "items_per_second": round(processed / elapsed, 3) if elapsed > 0 else 0.0,
+            "p50_item_seconds": (
+                round(statistics.median(latencies), 3) if latencies else 0.0
+            ),
+            "model_calls_per_item": (
+                round(sum(r["model_calls"] for r in self.results) / processed, 2)
+                if processed
+                else 0.0
+            ),
+            "cost_usd_per_item": round(total_cost / processed, 6) if processed else 0.0,
+            "cost_usd_total": round(total_cost, 4),
+        }
+
+
+async def main(args: argparse.Namespace) -> None:
+    session_service = InMemorySessionService()
+    pool = RunnerPool(
+        build_agent=build_tracked_agent,
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService(),
+        memory_service=VectorMemoryService(index_dir=MEMORY_INDEX_DIR),
+        max_size=args.concurrency,
+        min_idle=args.concurrency,
+    )
+    config = RunnerConfig(app_name=args.app_name, mcp_url=args.mcp_url)
+    await pool.start([config])
+    try:
+        batch = BatchRunner(pool, config, session_service, args.concurrency)
+        summary = await batch.run(args.input, args.output)
+    finally:
+        await pool.close()
+    logger.info("Batch finished: %s", summary)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL file with one conversation per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--app-name", default="EventManagementBatch")
+    parser.add_argument("--mcp-url", default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,146 @@
+"""
+Local check of the calendar connection's circuit breaker, reconnect and
+write-behind queue against an MCP server that hangs, dies and comes back.
+
+1. Calls a tool against a healthy local `calendar_mcp_server.py`.
+2. Freezes the server (SIGSTOP), so calls hang like against a cold or stuck
+   Cloud Run instance: the first calls time out, then the circuit opens and
+   calls fail immediately.
+3. Creates an event through the write-behind queue while the server is down:
+   it returns the event's ID at once, the same one the server will use.
+4. Kills the server and restarts it on the same port with the same data
+   directory: the background reconnect closes the circuit, the queued event is
+   created and shows up as busy time.
+
+Usage: python calendar_resilience_demo.py [--port 8970]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from google.adk.tools.mcp_tool.mcp_session_manager import SseServerParams
+
+from agents.mcp_client import ToolManifestCache, load_mcp_tools
+from agents.write_behind import WriteBehindQueue, WriteBehindTool
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools")
+
+
+def start_server(port: int, data_dir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ, PORT=str(port), LOG_LEVEL="WARNING", CALENDAR_DATA_DIR=data_dir
+    )
+    process = subprocess.Popen(
+        [sys.executable, "calendar_mcp_server.py"],
+        cwd=TOOLS_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/tools/manifest", timeout=0.5)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"The MCP server on port {port} did not start")
+
+
+async def timed_call(tool, args: dict) -> tuple:
+    started = time.perf_counter()
+    result = await tool.run_async(args=args, tool_context=None)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if isinstance(result, dict):
+        return result["status"], elapsed_ms, result
+    return ("error" if result.isError else "success"), elapsed_ms, result
+
+
+async def main(args: argparse.Namespace) -> None:
+    workdir = tempfile.mkdtemp(prefix="calendar_resilience_")
+    data_dir = os.path.join(workdir, "data")
+    server = start_server(args.port, data_dir)
+    params = SseServerParams(url=f"http://127.0.0.1:{args.port}/sse")
+    tools, exit_stack = await load_mcp_tools(
+        params, cache=ToolManifestCache(os.path.join(workdir, "cache"))
+    )
+    tools = {tool.name: tool for tool in tools}
+    check = tools["check_calendar_availability"]
+    connection = check.connection
+    connection.call_timeout = connection.connect_timeout = args.timeout
+    connection.breaker.reset_timeout = args.reset
+    queue = WriteBehindQueue(params, outbox_dir=os.path.join(workdir, "outbox"))
+    queue.connection.call_timeout = queue.connection.connect_timeout = args.timeout
+    queue.connection.breaker.reset_timeout = args.reset
+    queue.start()
+    create = WriteBehindTool(tools["create_calendar_event"], queue)
+    day = {"date": "2025-07-20", "start_time": "09:00", "end_time": "17:00"}
+
+    try:
+        status, ms, _ = await timed_call(check, day)
+        print(f"Healthy server: {status} in {ms:.0f} ms")
+
+        server.send_signal(signal.SIGSTOP)
+        print(f"\nServer frozen; calls time out after {args.timeout:.0f}s at first:")
+        for i in range(5):
+            status, ms, result = await timed_call(check, day)
+            print(f"  call {i + 1}: {status} in {ms:.0f} ms")
+        assert ms < 50, "an open circuit must fail fast"
+        assert connection.breaker.state == "open"
+
+        party = {
+            "date": "2025-07-20",
+            "time": "10:00",
+            "duration_hours": 2,
+            "title": "Leo's party",
+            "description": "Dinosaurs",
+        }
+        status, ms, result = await timed_call(create, party)
+        event_id = result["event_id"]
+        print(f"\nWrite-behind create while down: {status} in {ms:.1f} ms")
+        # The outbox is written off the loop, so this includes a step of the
+        # background reconnect that runs meanwhile, but no wait on the server
+        assert status == "pending" and ms < 200
+
+        server.send_signal(signal.SIGKILL)
+        server.wait()
+        started = time.perf_counter()
+        server = start_server(args.port, data_dir)
+        print("\nServer restarted; waiting for the reconnect and the queued write")
+        while connection.breaker.state != "closed" or queue.pending:
+            await asyncio.sleep(0.1)
+            assert time.perf_counter() - started < 120, "did not recover"
+        print(
+            f"Recovered {time.perf_counter() - started:.1f}s after the restart; "
+            f"saved as {queue.synced[event_id]}"
+        )
+        assert queue.synced[event_id] == event_id
+        status, ms, result = await timed_call(check, day)
+        busy = json.loads(result.content[0].text)["busy"]
+        assert busy == [{"start": "10:00", "end": "12:00"}], busy
+        print(f"Busy time after recovery: {busy} ({ms:.0f} ms)")
+        print("\nOK")
+    finally:
+        await queue.release()
+        await exit_stack.aclose()
+        server.send_signal(signal.SIGCONT)
+        server.kill()
+        server.wait()
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8970)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--reset", type=float, default=3.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""
+The conversation helpers shared by agent.py, batch.py and the benchmarks.
+
+Importing this module has no side effects: it neither configures logging nor
+builds the agents or connects to the calendar MCP server. agent.py does those
+when it is imported or run.
+"""
+
+import os
+from typing import Optional
+from contextlib import AsyncExitStack
+import logging
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+from agents import (
+    birthday_planner_agent,
+    create_calendar_service_agent,
+    create_event_organizer_agent,
+)
+from serving import RunnerConfig, TurnProfiler
+from tools.logging_config import log_context, track_logging_cost
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Directory of the VectorMemoryService index
+MEMORY_INDEX_DIR = os.getenv("MEMORY_INDEX_DIR", ".memory_index")
+
+# Profiles a sample of turns when TURN_PROFILE_DIR is set; a no-op otherwise
+turn_profiler = TurnProfiler()
+
+
+async def interact(
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    query: str,
+    session_service: InMemorySessionService,
+    runner: Runner,
+    raise_errors: bool = False,
+) -> str:
+    """
+    Sends a query to the agent and returns the final text response.
+
+    Errors are returned as "Error: ..." text unless `raise_errors` is set.
+    """
+    with log_context(
+        session_id=session_id, agent_id=runner.agent.name
+    ), track_logging_cost() as logging_cost, turn_profiler.turn(
+        session_id=session_id, agent=runner.agent.name
+    ):
+        logger.info("User (%s) query: %s", user_id, query)
+        print(f"\n> User ({user_id}): {query}")
+        final_response_text = "Agent did not provide a response."
+
+        try:
+            session = session_service.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+            if not session:
+                session = session_service.create_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id
+                )
+                logger.info("New session created: %s", session_id)
+
+            user_message = Content(parts=[Part(text=query)], role="user")
+
+            try:
+                async for event in runner.run_async(
+                    user_id=user_id, session_id=session_id, new_message=user_message
+                ):
+                    if (
+                        event.is_final_response()
+                        and event.content
+                        and event.content.parts
+                    ):
+                        final_response_text = (
+                            event.content.parts[0].text
+                            or "Agent sent non-text content."
+                        )
+            except Exception as e:
+                logger.error("Error during agent run: %s", e)
+                if raise_errors:
+                    raise
+                final_response_text = f"Error: {e}"
+                return final_response_text
+
+            # Make this turn recallable from later sessions
+            if runner.memory_service:
+                session = session_service.get_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id
+                )
+                await runner.memory_service.add_session_to_memory(session)
+
+            logger.debug("Agent response: %s", final_response_text)
+            return final_response_text
+        finally:
+            # Reported on errors too; only this turn's own logging is counted
+            logger.info(
+                "Agent responded with %d characters.",
+                len(final_response_text),
+                extra={"logging_overhead_us": logging_cost.caller_ns // 1000},
+            )
+
+
+async def get_root_agent(
+    mcp_url: Optional[str] = None,
+) -> tuple[LlmAgent, AsyncExitStack]:
+    """
+    Asynchronously initializes all agents, including those requiring
+    async setup (like fetching MCP tools), and returns the root_agent.
+    """
+
+    logger.info("Initializing specialist agents...")
+
+    # Create CalendarServiceAgent (which connects to MCP)
+    calendar_agent, exit_stack = await create_calendar_service_agent(mcp_url)
+
+    # Create the EventOrganizerAgent, passing the initialized specialist agents
+    organizer = create_event_organizer_agent(
+        planner_agent_instance=birthday_planner_agent,
+        calendar_agent_instance=calendar_agent,
+    )
+
+    logger.info("All agents initialized.")
+    return organizer, exit_stack
+
+
+async def build_root_agent(config: RunnerConfig) -> tuple[LlmAgent, AsyncExitStack]:
+    """Agent builder used by the RunnerPool."""
+    return await get_root_agent(mcp_url=config.mcp_url)
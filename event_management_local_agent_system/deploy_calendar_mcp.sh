@@ -7,6 +7,11 @@
 DEFAULT_SERVICE_NAME="adk-calendar-mcp-service"
 TOOLS_DIR="./tools" 
 ENV_FILE=".env"
+# Cloud Storage bucket holding the calendar data. Unset, events are kept in
+# memory only and are lost whenever an instance restarts.
+CALENDAR_BUCKET="${CALENDAR_BUCKET:-}"
+# Where the bucket is mounted in the container (CALENDAR_DATA_DIR)
+CALENDAR_MOUNT_PATH="/data"
 
 # Helper Functions
 print_usage() {
@@ -48,11 +53,36 @@ if [ -z "$GCP_REGION" ]; then
   fi
 fi
 
+# Instances Cloud Run may scale to (its default is 100). A data directory is
+# owned by one process, and the shard ring lives in one process, so persisted
+# deployments and adding shards while running need MAX_INSTANCES=1.
+if [ -n "$CALENDAR_BUCKET" ]; then
+  MAX_INSTANCES="${MAX_INSTANCES:-1}"
+  if [ "$MAX_INSTANCES" != "1" ]; then
+    echo "Error: CALENDAR_BUCKET requires MAX_INSTANCES=1 (one process per data directory)."
+    exit 1
+  fi
+  PERSISTENCE="Cloud Storage bucket $CALENDAR_BUCKET at $CALENDAR_MOUNT_PATH"
+  PERSISTENCE_FLAGS=(
+    --execution-environment=gen2
+    --add-volume="name=calendar-data,type=cloud-storage,bucket=$CALENDAR_BUCKET"
+    --add-volume-mount="volume=calendar-data,mount-path=$CALENDAR_MOUNT_PATH"
+  )
+  ENV_VARS="CALENDAR_MAX_INSTANCES=$MAX_INSTANCES,CALENDAR_DATA_DIR=$CALENDAR_MOUNT_PATH"
+else
+  MAX_INSTANCES="${MAX_INSTANCES:-100}"
+  PERSISTENCE="none (in memory; events are lost when an instance restarts)"
+  PERSISTENCE_FLAGS=(--remove-env-vars=CALENDAR_DATA_DIR)
+  ENV_VARS="CALENDAR_MAX_INSTANCES=$MAX_INSTANCES"
+fi
+
 echo "--------------------------------------------------"
 echo "Deploying FastMCP Calendar Server to Cloud Run"
 echo "Project: $GCP_PROJECT_ID"
 echo "Region:  $GCP_REGION"
 echo "Service: $DEFAULT_SERVICE_NAME"
+echo "Max instances: $MAX_INSTANCES"
+echo "Persistence: $PERSISTENCE"
 echo "Source:  $TOOLS_DIR"
 echo "--------------------------------------------------"
 
@@ -64,7 +94,9 @@ fi
 current_dir=$(pwd)
 cd "$TOOLS_DIR" || exit
 
-# Deploy to Cloud Run
+# Deploy to Cloud Run. The server learns the instance limit through
+# CALENDAR_MAX_INSTANCES and refuses online shard additions above one;
+# CALENDAR_DATA_DIR points it at the mounted bucket, if any.
 echo "Deploying to Cloud Run... This may take a few minutes."
 SERVICE_URL=$(gcloud run deploy "$DEFAULT_SERVICE_NAME" \
     --source . \
@@ -72,6 +104,9 @@ SERVICE_URL=$(gcloud run deploy "$DEFAULT_SERVICE_NAME" \
     --region "$GCP_REGION" \
     --platform "managed" \
     --allow-unauthenticated \
+    --max-instances="$MAX_INSTANCES" \
+    --update-env-vars="$ENV_VARS" \
+    "${PERSISTENCE_FLAGS[@]}" \
     --port 8080 \
     --format="value(status.url)") 
 
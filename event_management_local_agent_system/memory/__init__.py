@@ -0,0 +1,2 @@
+from .embedders import Embedder, HashingEmbedder, SentenceTransformerEmbedder
+from .vector_memory_service import VectorMemoryService
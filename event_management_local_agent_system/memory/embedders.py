@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import re
+from typing import List, Protocol
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by do for from had has have how i in is it its "
+    "me my of on or our so that the their them they this to was we what when "
+    "where which who will with you your".split()
+)
+
+
+class Embedder(Protocol):
+    """
+    Turns texts into fixed-size vectors that run entirely on the local machine.
+
+    Implementations return a float32 array of shape (len(texts), dim) whose
+    rows are L2-normalized, so a dot product is the cosine similarity.
+    """
+
+    name: str
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray: ...
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder based on signed feature hashing.
+
+    Words and their character trigrams are hashed into `dim` buckets, so
+    "preferred venue" still matches "we prefer this venue". It captures lexical
+    overlap rather than meaning, which is enough for recalling facts the user
+    stated before (e.g., "Lisa is 7") and needs no model download.
+    """
+
+    def __init__(self, dim: int = 256, trigram_weight: float = 0.5):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in _TOKEN_RE.findall(text.lower()):
+                if word in _STOP_WORDS:
+                    continue
+                bucket, sign = self._bucket(word)
+                vectors[row, bucket] += sign
+                padded = f"<{word}>"
+                for i in range(len(padded) - 2):
+                    bucket, sign = self._bucket(padded[i : i + 3])
+                    vectors[row, bucket] += sign * self.trigram_weight
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """
+    Semantic embedder backed by a local `sentence-transformers` model.
+
+    Requires the optional `sentence-transformers` package; the model is
+    downloaded once and then runs offline.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "SentenceTransformerEmbedder requires the 'sentence-transformers' "
+                "package. Install it with 'pip install sentence-transformers'."
+            ) from e
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+        logger.info("Loaded embedding model %s (dim=%d)", model_name, self.dim)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self._model.encode(texts, convert_to_numpy=True)
+        return _normalize(np.asarray(vectors, dtype=np.float32))
@@ -0,0 +1,595 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from google.adk.events import Event
+from google.adk.memory.base_memory_service import (
+    BaseMemoryService,
+    MemoryResult,
+    SearchMemoryResponse,
+)
+from google.adk.sessions import Session
+from google.genai.types import Content, Part
+
+from .embedders import Embedder, HashingEmbedder
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Users get row blocks that double in size, from MIN_BLOCK_ROWS up to MAX_BLOCK_ROWS
+MIN_BLOCK_ROWS = 64
+MAX_BLOCK_ROWS = 65536
+
+# Users with at least this many memories get an inverted-file (IVF) index, so
+# a search scores a few clusters of their rows instead of all of them
+IVF_MIN_ROWS = 32768
+# Clusters scored per search; about sqrt(rows) clusters are built per user
+IVF_PROBES = 16
+# k-means training sample per cluster and iterations
+IVF_SAMPLE_PER_LIST = 128
+IVF_TRAIN_ITERATIONS = 8
+
+_MANIFEST_FILE = "manifest.json"
+_VECTORS_FILE = "vectors.f32"
+_SNIPPETS_FILE = "snippets.jsonl"
+
+# (owner key, session id, event id, author, timestamp, text)
+Snippet = Tuple[str, str, str, str, float, str]
+
+
+class _InvertedLists:
+    """
+    A spherical k-means partition of one user's rows (IVF-Flat): each cluster
+    keeps its rows' vectors in one contiguous array, and a search only scores
+    the clusters whose centroids are closest to the query. Rows added after
+    training join their nearest cluster.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        rows: List[np.ndarray],
+        vectors: List[np.ndarray],
+    ):
+        self.centroids = centroids
+        self.rows = rows
+        self.vectors = vectors
+        self.trained_rows = sum(len(r) for r in rows)
+        # Rows added since a cluster's arrays were last rebuilt, and a buffer
+        # their vectors are written to until it is full
+        self._tail_rows: List[List[int]] = [[] for _ in rows]
+        self._tail_vectors: List[Optional[np.ndarray]] = [None] * len(rows)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, rows: np.ndarray) -> "_InvertedLists":
+        rng = np.random.default_rng(0)
+        nlist = max(1, int(np.sqrt(len(rows))))
+        sample_size = min(len(rows), nlist * IVF_SAMPLE_PER_LIST)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, sample_size, False))])
+        centroids = sample[rng.choice(sample_size, nlist, False)].copy()
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(labels, minlength=nlist)
+            starts = np.cumsum(counts) - counts
+            filled = counts > 0
+            # Empty clusters keep their centroid
+            centroids[filled] = np.add.reduceat(
+                sample[np.argsort(labels, kind="stable")], starts[filled], axis=0
+            )
+            centroids /= np.maximum(
+                np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12
+            )
+        del sample
+
+        labels = np.concatenate(
+            [
+                np.argmax(np.asarray(vectors[rows[i : i + 65536]]) @ centroids.T, 1)
+                for i in range(0, len(rows), 65536)
+            ]
+        )
+        sorted_rows = rows[np.argsort(labels, kind="stable")]
+        splits = np.cumsum(np.bincount(labels, minlength=nlist))[:-1]
+        return cls(
+            centroids,
+            np.split(sorted_rows, splits),
+            np.split(np.asarray(vectors[sorted_rows]), splits),
+        )
+
+    def add(self, rows: List[int], vectors: np.ndarray) -> None:
+        labels = np.argmax(vectors @ self.centroids.T, axis=1)
+        for row, vector, label in zip(rows, vectors, labels):
+            tail = self._tail_rows[label]
+            buffer = self._tail_vectors[label]
+            if buffer is None:
+                # Merged once it grows by a quarter, so copying stays amortized O(1)
+                size = max(64, len(self.rows[label]) // 4)
+                buffer = self._tail_vectors[label] = np.empty(
+                    (size, len(vector)), dtype=np.float32
+                )
+            buffer[len(tail)] = vector
+            tail.append(row)
+            if len(tail) == len(buffer):
+                self.rows[label] = np.concatenate([self.rows[label], tail])
+                self.vectors[label] = np.concatenate([self.vectors[label], buffer])
+                self._tail_rows[label] = []
+                self._tail_vectors[label] = None
+
+    def search(
+        self, query_vector: np.ndarray, probes: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the `probes` clusters nearest to the query and their scores."""
+        probes = min(probes, len(self.rows))
+        nearest = np.argpartition(-(self.centroids @ query_vector), probes - 1)
+        rows, scores = [], []
+        for i in nearest[:probes]:
+            rows.append(self.rows[i])
+            scores.append(self.vectors[i] @ query_vector)
+            tail = self._tail_rows[i]
+            if tail:
+                rows.append(np.asarray(tail, dtype=np.int64))
+                scores.append(self._tail_vectors[i][: len(tail)] @ query_vector)
+        return np.concatenate(rows), np.concatenate(scores)
+
+
+class _OwnerBlocks:
+    """The contiguous row blocks of the shared matrix reserved for one user."""
+
+    def __init__(self):
+        self.blocks: List[List[int]] = []  # [start, size, used]
+        self.rows = 0
+        self.ivf: Optional[_InvertedLists] = None
+        self.indexing = False
+
+    def row_array(self) -> np.ndarray:
+        """The user's rows in the order they were added."""
+        return np.concatenate(
+            [np.arange(start, start + used) for start, _, used in self.blocks]
+            or [np.empty(0, dtype=np.int64)]
+        )
+
+    def next_row(self, allocate) -> int:
+        if not self.blocks or self.blocks[-1][2] == self.blocks[-1][1]:
+            size = min(max(MIN_BLOCK_ROWS, self.rows), MAX_BLOCK_ROWS)
+            self.blocks.append([allocate(size), size, 0])
+        block = self.blocks[-1]
+        row = block[0] + block[2]
+        block[2] += 1
+        self.rows += 1
+        return row
+
+
+def _chunk_text(text: str, max_chars: int) -> List[str]:
+    """Splits text on paragraph and sentence boundaries into short snippets."""
+    chunks: List[str] = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(". ", 0, max_chars)
+            cut = cut + 1 if cut > 0 else max_chars
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            chunks.append(paragraph)
+    return chunks
+
+
+class VectorMemoryService(BaseMemoryService):
+    """
+    Memory service that recalls past session snippets by embedding similarity.
+
+    Every text part of a session event is split into short snippets and
+    embedded with a local, pluggable `Embedder`. Vectors live in one float32
+    matrix (memory-mapped when `index_dir` is set) in which each user owns a
+    few contiguous blocks, so a search is a handful of matrix-vector products
+    over that user's rows and its cost does not grow with other users' data.
+
+    A user's own memories are scanned in full up to `ivf_min_rows`. Beyond
+    that, a background thread clusters them (IVF, about sqrt(rows) k-means
+    clusters, each with a contiguous in-memory copy of its vectors) and a
+    search scores the `ivf_probes` clusters nearest to the query, which is
+    approximate but keeps recall latency flat as one user's history grows.
+    The clustering is retrained when the user's rows double; it is not
+    persisted but rebuilt in the background after a restart, and searches
+    scan in full until it is ready.
+
+    Args:
+        embedder: Embedder used for snippets and queries (default HashingEmbedder).
+        index_dir: Directory to persist the index to. In-memory only if None.
+        top_k: Maximum number of snippets returned per search.
+        min_score: Minimum cosine similarity for a snippet to be returned.
+        max_snippet_chars: Maximum length of a single embedded snippet.
+        ivf_min_rows: Memories of one user above which they are clustered.
+        ivf_probes: Clusters scored per search of a clustered user.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        index_dir: Optional[str] = None,
+        top_k: int = 5,
+        min_score: float = 0.2,
+        max_snippet_chars: int = 400,
+        ivf_min_rows: int = IVF_MIN_ROWS,
+        ivf_probes: int = IVF_PROBES,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_probes = ivf_probes
+        self.index_dir = index_dir
+        self.top_k = top_k
+        self.min_score = min_score
+        self.max_snippet_chars = max_snippet_chars
+
+        self._lock = threading.Lock()
+        self._allocated = 0
+        self._count = 0
+        self._vectors = np.empty((0, self.embedder.dim), dtype=np.float32)
+        self._snippets: Dict[int, Snippet] = {}
+        self._owners: Dict[str, _OwnerBlocks] = {}
+        self._seen_events: set[str] = set()
+        self._indexers: List[threading.Thread] = []
+
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+            self._load()
+
+    # Persistence
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _open_vectors(self, capacity: int) -> np.ndarray:
+        path = self._path(_VECTORS_FILE)
+        size = capacity * self.embedder.dim * np.dtype(np.float32).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(
+            path, dtype=np.float32, mode="r+", shape=(capacity, self.embedder.dim)
+        )
+
+    def _load(self) -> None:
+        manifest_path = self._path(_MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["embedder"] != self.embedder.name:
+            raise ValueError(
+                f"Index at {self.index_dir} was built with embedder "
+                f"'{manifest['embedder']}', not '{self.embedder.name}'."
+            )
+
+        block_starts: List[int] = []
+        block_refs: List[List[int]] = []
+        for owner, start, size in manifest["blocks"]:
+            owner_blocks = self._owners.setdefault(owner, _OwnerBlocks())
+            block = [start, size, 0]
+            owner_blocks.blocks.append(block)
+            block_starts.append(start)
+            block_refs.append(block)
+            self._allocated = max(self._allocated, start + size)
+        order = sorted(range(len(block_starts)), key=block_starts.__getitem__)
+        block_starts = [block_starts[i] for i in order]
+        block_refs = [block_refs[i] for i in order]
+
+        count = manifest["count"]
+        with open(self._path(_SNIPPETS_FILE), "r+", encoding="utf-8") as f:
+            for _ in range(count):
+                r = json.loads(f.readline())
+                snippet = (r["o"], r["s"], r["e"], r["a"], r["ts"], r["t"])
+                self._snippets[r["r"]] = snippet
+                self._seen_events.add(f"{r['s']}/{r['e']}")
+                block_refs[bisect.bisect_right(block_starts, r["r"]) - 1][2] += 1
+                self._owners[r["o"]].rows += 1
+            # Drop rows written after the last manifest update
+            f.truncate(f.tell())
+
+        self._count = count
+        self._vectors = self._open_vectors(max(self._allocated, MIN_BLOCK_ROWS))
+        logger.info("Loaded %d memories from %s", self._count, self.index_dir)
+        with self._lock:
+            for owner, owner_blocks in self._owners.items():
+                self._maybe_cluster(owner, owner_blocks)
+
+    def _persist(self, rows: List[int]) -> None:
+        with open(self._path(_SNIPPETS_FILE), "a", encoding="utf-8") as f:
+            for row in rows:
+                owner, session_id, event_id, author, ts, text = self._snippets[row]
+                record = {
+                    "r": row,
+                    "o": owner,
+                    "s": session_id,
+                    "e": event_id,
+                    "a": author,
+                    "ts": ts,
+                    "t": text,
+                }
+                f.write(json.dumps(record) + "\n")
+        self._vectors.flush()
+        manifest = {
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "count": self._count,
+            "blocks": [
+                [owner, start, size]
+                for owner, owner_blocks in self._owners.items()
+                for start, size, _ in owner_blocks.blocks
+            ],
+        }
+        tmp_path = self._path(_MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._path(_MANIFEST_FILE))
+
+    # Index maintenance
+
+    def _allocate(self, size: int) -> int:
+        """Reserves `size` contiguous rows, growing the matrix geometrically."""
+        start = self._allocated
+        self._allocated += size
+        capacity = len(self._vectors)
+        if self._allocated > capacity:
+            capacity = max(capacity * 2, self._allocated, MIN_BLOCK_ROWS)
+            if self.index_dir:
+                if isinstance(self._vectors, np.memmap):
+                    self._vectors.flush()
+                self._vectors = self._open_vectors(capacity)
+            else:
+                grown = np.empty((capacity, self.embedder.dim), dtype=np.float32)
+                grown[:start] = self._vectors[:start]
+                self._vectors = grown
+        return start
+
+    def _append(self, vectors: np.ndarray, snippets: List[Snippet]) -> None:
+        with self._lock:
+            rows = []
+            added: Dict[str, List[int]] = {}
+            for i, snippet in enumerate(snippets):
+                owner_blocks = self._owners.setdefault(snippet[0], _OwnerBlocks())
+                row = owner_blocks.next_row(self._allocate)
+                self._snippets[row] = snippet
+                self._seen_events.add(f"{snippet[1]}/{snippet[2]}")
+                rows.append(row)
+                added.setdefault(snippet[0], []).append(i)
+            self._vectors[np.asarray(rows)] = vectors
+            self._count += len(snippets)
+            for owner, positions in added.items():
+                owner_blocks = self._owners[owner]
+                if owner_blocks.ivf is not None:
+                    owner_blocks.ivf.add(
+                        [rows[i] for i in positions], vectors[positions]
+                    )
+                self._maybe_cluster(owner, owner_blocks)
+            if self.index_dir:
+                self._persist(rows)
+
+    def _maybe_cluster(self, owner: str, owner_blocks: _OwnerBlocks) -> None:
+        """Starts (re)clustering a user's rows once there are enough; holds _lock."""
+        if owner_blocks.indexing or owner_blocks.rows < self.ivf_min_rows:
+            return
+        ivf = owner_blocks.ivf
+        if ivf is not None and owner_blocks.rows < 2 * ivf.trained_rows:
+            return
+        owner_blocks.indexing = True
+        indexer = threading.Thread(
+            target=self._cluster,
+            args=(owner, owner_blocks, self._vectors, owner_blocks.row_array()),
+            name=f"memory-ivf-{owner}",
+            daemon=True,
+        )
+        self._indexers = [t for t in self._indexers if t.is_alive()] + [indexer]
+        indexer.start()
+
+    def _cluster(
+        self,
+        owner: str,
+        owner_blocks: _OwnerBlocks,
+        vectors: np.ndarray,
+        rows: np.ndarray,
+    ) -> None:
+        started = time.perf_counter()
+        try:
+            # Rows are never moved, so they can be read without the lock
+            ivf = _InvertedLists.train(vectors, rows)
+            with self._lock:
+                # Rows added while training come after the ones it saw
+                newer = owner_blocks.row_array()[len(rows) :]
+                if len(newer):
+                    ivf.add(newer.tolist(), self._vectors[newer])
+                owner_blocks.ivf = ivf
+            logger.info(
+                "Clustered %d memories of %s into %d lists in %.1fs",
+                len(rows),
+                owner,
+                len(ivf.rows),
+                time.perf_counter() - started,
+            )
+        except Exception as e:
+            logger.error("Clustering the memories of %s failed: %s", owner, e)
+        finally:
+            with self._lock:
+                owner_blocks.indexing = False
+                # The rows may have doubled again while this one trained
+                self._maybe_cluster(owner, owner_blocks)
+
+    def _wait_for_clustering(self) -> None:
+        # A finished clustering may have started the next one
+        while indexers := [t for t in self._indexers if t.is_alive()]:
+            for indexer in indexers:
+                indexer.join()
+
+    def _search(
+        self, owner: str, query_vector: np.ndarray, top_k: int
+    ) -> List[Tuple[float, int]]:
+        with self._lock:
+            owner_blocks = self._owners.get(owner)
+            if owner_blocks is None or owner_blocks.rows == 0:
+                return []
+            if owner_blocks.ivf is not None:
+                rows, scores = owner_blocks.ivf.search(query_vector, self.ivf_probes)
+            else:
+                rows = owner_blocks.row_array()
+                scores = np.concatenate(
+                    [
+                        self._vectors[start : start + used] @ query_vector
+                        for start, _, used in owner_blocks.blocks
+                        if used
+                    ]
+                )
+        k = min(top_k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            (float(scores[i]), int(rows[i]))
+            for i in best
+            if scores[i] >= self.min_score
+        ]
+
+    def _ingest(self, session: Session) -> int:
+        """Embeds and stores the session's new events; returns the snippet count."""
+        owner = f"{session.app_name}/{session.user_id}"
+        events = []
+        with self._lock:
+            # Reserve the events, so concurrent turns of a session add each once
+            for event in session.events:
+                if not event.content or not event.content.parts:
+                    continue
+                key = f"{session.id}/{event.id}"
+                if key not in self._seen_events:
+                    self._seen_events.add(key)
+                    events.append(event)
+        snippets = []
+        for event in events:
+            text = "\n".join(part.text for part in event.content.parts if part.text)
+            for chunk in _chunk_text(text, self.max_snippet_chars):
+                snippets.append(
+                    (owner, session.id, event.id, event.author, event.timestamp, chunk)
+                )
+        try:
+            if snippets:
+                vectors = self.embedder.embed([snippet[5] for snippet in snippets])
+                self._append(vectors, snippets)
+        except BaseException:
+            with self._lock:
+                self._seen_events.difference_update(
+                    f"{session.id}/{event.id}" for event in events
+                )
+            raise
+        return len(snippets)
+
+    def _recall(self, owner: str, query: str) -> List[Tuple[float, int]]:
+        query_vector = self.embedder.embed([query])[0]
+        return self._search(owner, query_vector, self.top_k)
+
+    # BaseMemoryService
+
+    async def add_session_to_memory(self, session: Session):
+        # Scanning the session, embedding and disk writes run off the event
+        # loop; interact() calls this after every turn
+        added = await asyncio.to_thread(self._ingest, session)
+        if added:
+            logger.debug("Added %d memory snippets from session %s", added, session.id)
+
+    async def search_memory(
+        self, *, app_name: str, user_id: str, query: str
+    ) -> SearchMemoryResponse:
+        started = time.perf_counter()
+        # Embedding the query and scanning the user's rows run off the event loop
+        hits = await asyncio.to_thread(self._recall, f"{app_name}/{user_id}", query)
+
+        response = SearchMemoryResponse()
+        by_session: Dict[str, MemoryResult] = {}
+        for _, row in hits:
+            _, session_id, event_id, author, ts, text = self._snippets[row]
+            result = by_session.get(session_id)
+            if result is None:
+                result = MemoryResult(session_id=session_id, events=[])
+                by_session[session_id] = result
+                response.memories.append(result)
+            result.events.append(
+                Event(
+                    id=event_id,
+                    author=author,
+                    timestamp=ts,
+                    content=Content(
+                        parts=[Part(text=text)],
+                        role="user" if author == "user" else "model",
+                    ),
+                )
+            )
+        logger.debug(
+            "Memory search returned %d snippets in %.2f ms",
+            len(hits),
+            (time.perf_counter() - started) * 1000,
+        )
+        return response
+
+
+if __name__ == "__main__":
+    # Recall latency benchmark: python -m memory.vector_memory_service
+    # One heavy user: python -m memory.vector_memory_service --users 1
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--memories", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=IVF_PROBES)
+    args = parser.parse_args()
+
+    service = VectorMemoryService(ivf_probes=args.probes)
+    dim = service.embedder.dim
+    rng = np.random.default_rng(0)
+    owners = [f"bench/user_{i}" for i in range(args.users)]
+    # Memories come in topics of ~100 related snippets, like real histories
+    topics = rng.standard_normal((max(16, args.memories // 100), dim), np.float32)
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+    batch = 100_000
+    for start in range(0, args.memories, batch):
+        n = min(batch, args.memories - start)
+        vectors = topics[rng.integers(0, len(topics), n)]
+        vectors += rng.standard_normal((n, dim), dtype=np.float32) / np.sqrt(dim)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        service._append(
+            vectors,
+            [
+                (owners[(start + i) % args.users], "s", str(start + i), "user", 0.0, "")
+                for i in range(n)
+            ],
+        )
+    started = time.perf_counter()
+    service._wait_for_clustering()
+    print(f"Clustering finished {time.perf_counter() - started:.1f}s after loading")
+
+    timings, found, expected = [], 0, 0
+    for i in range(args.queries):
+        owner_blocks = service._owners[owners[i % args.users]]
+        rows = owner_blocks.row_array()
+        # A query close to one of the user's memories
+        vector = service._vectors[rows[rng.integers(len(rows))]].copy()
+        vector += rng.standard_normal(dim, dtype=np.float32) / np.sqrt(dim) / 2
+        vector /= np.linalg.norm(vector)
+        started = time.perf_counter()
+        hits = service._search(owners[i % args.users], vector, service.top_k)
+        timings.append((time.perf_counter() - started) * 1000)
+        scores = service._vectors[rows] @ vector
+        exact = np.argsort(-scores)[: service.top_k]
+        exact = exact[scores[exact] >= service.min_score]
+        found += len({row for _, row in hits} & set(rows[exact].tolist()))
+        expected += len(exact)
+    timings.sort()
+    print(
+        f"{args.memories} memories, {args.users} users: "
+        f"p50={timings[len(timings) // 2]:.3f} ms "
+        f"p99={timings[int(len(timings) * 0.99) - 1]:.3f} ms "
+        f"recall@{service.top_k}={found / expected:.3f}"
+    )
@@ -0,0 +1,2 @@
+from .runner_pool import PooledRunner, RunnerConfig, RunnerPool
+from .turn_profiler import TurnProfiler
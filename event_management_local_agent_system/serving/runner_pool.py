@@ -0,0 +1,429 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from google.adk.agents import BaseAgent
+from google.adk.artifacts import BaseArtifactService
+from google.adk.memory import BaseMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
+from google.adk.tools.agent_tool import AgentTool
+from mcp import ClientSession
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RunnerConfig:
+    """
+    Identifies one kind of Runner in the pool.
+
+    Requests with equal configs can share pooled Runners. `app_name` is used
+    as the Runner's app name, so sessions and memories stay addressable no
+    matter which pooled instance serves a turn.
+    """
+
+    app_name: str
+    mcp_url: Optional[str] = None
+
+
+# Builds the agent graph for a config; the exit stack owns its MCP connections
+AgentBuilder = Callable[[RunnerConfig], Awaitable[Tuple[BaseAgent, AsyncExitStack]]]
+
+
+def _mcp_tools(agent: BaseAgent) -> Iterator[Any]:
+    """Yields the tools of an agent graph, unwrapped, that may talk to MCP."""
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        for tool in getattr(current, "tools", []):
+            # Unwrap tools such as BackoffTool that delegate to another tool
+            while hasattr(tool, "tool"):
+                tool = tool.tool
+            if isinstance(tool, AgentTool):
+                pending.append(tool.agent)
+            else:
+                yield tool
+
+
+def _mcp_connections(agent: BaseAgent) -> List[Any]:
+    """Collects the lazily opened MCP connections (`LazyMCPConnection`)."""
+    connections: Dict[int, Any] = {}
+    for tool in _mcp_tools(agent):
+        connection = getattr(tool, "connection", None)
+        if hasattr(connection, "ping"):
+            connections[id(connection)] = connection
+    return list(connections.values())
+
+
+def _mcp_sessions(agent: BaseAgent) -> List[ClientSession]:
+    """Collects the open MCP sessions used anywhere in an agent graph."""
+    sessions: Dict[int, ClientSession] = {}
+    for tool in _mcp_tools(agent):
+        if getattr(tool, "mcp_session", None) is not None:
+            sessions[id(tool.mcp_session)] = tool.mcp_session
+    return list(sessions.values())
+
+
+class PooledRunner:
+    """A built Runner and the MCP sessions its agent graph depends on."""
+
+    def __init__(self, config: RunnerConfig, runner: Runner):
+        self.config = config
+        self.runner = runner
+        self.created_at = time.monotonic()
+        self.checked_at = self.created_at
+        self.leases = 0
+        self._close = asyncio.Event()
+
+    async def connect(self) -> None:
+        """Opens the MCP sessions that the agent graph's tools open lazily."""
+        connections = _mcp_connections(self.runner.agent)
+        await asyncio.gather(*(c.get_session() for c in connections))
+
+    async def _ping(self) -> None:
+        # Lazy connections reopen a lost session before pinging it
+        connections = _mcp_connections(self.runner.agent)
+        lazy = {id(c.session) for c in connections}
+        sessions = [s for s in _mcp_sessions(self.runner.agent) if id(s) not in lazy]
+        await asyncio.gather(
+            *(c.ping() for c in connections), *(s.send_ping() for s in sessions)
+        )
+
+    async def healthy(self, timeout: float) -> bool:
+        """Pings every MCP session of the agent graph, opening missing ones."""
+        try:
+            await asyncio.wait_for(self._ping(), timeout)
+        except Exception as e:
+            logger.warning(
+                "Pooled runner for %s failed its health check: %s",
+                self.config.app_name,
+                e,
+            )
+            return False
+        self.checked_at = time.monotonic()
+        return True
+
+    def close(self) -> None:
+        self._close.set()
+
+
+class _KeyPool:
+    def __init__(self):
+        self.idle: Deque[PooledRunner] = deque()
+        self.leased = 0
+        self.building = 0
+        self.condition = asyncio.Condition()
+
+    @property
+    def total(self) -> int:
+        return len(self.idle) + self.leased + self.building
+
+
+class RunnerPool:
+    """
+    Bounded pool of ready-to-use Runners, keyed by `RunnerConfig`.
+
+    Building an agent graph and opening its MCP connections is too slow for
+    the request path. The pool keeps
+    up to `max_size` Runners per config, each leased to one request at a time,
+    and keeps at least `min_idle` of them ready by building replacements in
+    the background. Idle Runners whose MCP sessions stop answering pings, or
+    that are older than `max_age` seconds, are closed and rebuilt. At most
+    `max_configs` configs are kept; the least recently used ones without
+    Runners in use are dropped, as soon as their last Runner is returned.
+
+    Session, artifact and memory services are shared by all pooled Runners,
+    so consecutive turns of a conversation can be served by different ones.
+    """
+
+    def __init__(
+        self,
+        build_agent: AgentBuilder,
+        session_service: BaseSessionService,
+        artifact_service: Optional[BaseArtifactService] = None,
+        memory_service: Optional[BaseMemoryService] = None,
+        max_size: int = 4,
+        min_idle: int = 1,
+        max_configs: int = 16,
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 5.0,
+        max_age: float = 3600.0,
+    ):
+        self.build_agent = build_agent
+        self.session_service = session_service
+        self.artifact_service = artifact_service
+        self.memory_service = memory_service
+        self.max_size = max_size
+        self.min_idle = min_idle
+        self.max_configs = max_configs
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.max_age = max_age
+
+        self._pools: "OrderedDict[RunnerConfig, _KeyPool]" = OrderedDict()
+        self._background: set = set()
+        self._maintenance: Optional[asyncio.Task] = None
+        self.builds = 0
+        self.build_failures = 0
+        self.retired = 0
+
+    async def start(self, configs: Iterable[RunnerConfig] = ()) -> None:
+        """Builds `min_idle` Runners per config and starts the health checks."""
+        await asyncio.gather(*(self.warm(config) for config in configs))
+        if self._maintenance is None:
+            self._maintenance = asyncio.create_task(self._maintain())
+
+    async def warm(self, config: RunnerConfig) -> None:
+        """Waits until `config` has at least `min_idle` idle Runners."""
+        pool = self._pool(config)
+        missing = min(self.min_idle - len(pool.idle), self.max_size - pool.total)
+        if missing <= 0:
+            return
+        pool.building += missing
+        results = await asyncio.gather(
+            *(self._build(config) for _ in range(missing)), return_exceptions=True
+        )
+        async with pool.condition:
+            pool.building -= missing
+            pool.idle.extend(r for r in results if isinstance(r, PooledRunner))
+            pool.condition.notify_all()
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors and not pool.idle:
+            raise errors[0]
+
+    @asynccontextmanager
+    async def lease(self, config: RunnerConfig) -> AsyncIterator[Runner]:
+        """Hands out a Runner for `config` for the duration of one request."""
+        pool = self._pool(config)
+        item = await self._acquire(config, pool)
+        try:
+            yield item.runner
+        except BaseException:
+            # Make the next lease check the connections before reusing them
+            item.checked_at = float("-inf")
+            raise
+        finally:
+            item.leases += 1
+            async with pool.condition:
+                pool.leased -= 1
+                if config in self._pools:
+                    pool.idle.append(item)
+                else:
+                    self._retire(item)
+                pool.condition.notify()
+            # Configs in use could not be evicted when the cap was exceeded
+            self._evict()
+
+    async def _acquire(self, config: RunnerConfig, pool: _KeyPool) -> PooledRunner:
+        while True:
+            async with pool.condition:
+                while not pool.idle and pool.total >= self.max_size:
+                    await pool.condition.wait()
+                if pool.idle:
+                    item = pool.idle.popleft()
+                    pool.leased += 1
+                else:
+                    item = None
+                    pool.building += 1
+
+            if item is None:
+                # Nothing warm yet: this request has to pay for the build
+                logger.info("No warm runner for %s; building one", config.app_name)
+                try:
+                    item = await self._build(config)
+                finally:
+                    async with pool.condition:
+                        pool.building -= 1
+                        if item is not None:
+                            pool.leased += 1
+                    if item is None:
+                        self._evict()
+                return item
+
+            self._replenish(config, pool)
+            stale = time.monotonic() - item.checked_at > self.health_check_interval
+            if not stale or await item.healthy(self.health_check_timeout):
+                return item
+            async with pool.condition:
+                pool.leased -= 1
+                self._retire(item)
+                pool.condition.notify()
+
+    async def _build(self, config: RunnerConfig) -> PooledRunner:
+        """Builds a Runner in a dedicated task that later closes its connections.
+
+        MCP connections are entered in an `AsyncExitStack` whose cancel scopes
+        must be exited by the task that entered them, so each pooled Runner
+        gets a task that builds it, waits until it is retired and then closes it.
+        """
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self._hold(config, ready))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return await ready
+
+    async def _hold(self, config: RunnerConfig, ready: asyncio.Future) -> None:
+        started = time.perf_counter()
+        try:
+            agent, exit_stack = await self.build_agent(config)
+        except Exception as e:
+            self.build_failures += 1
+            logger.error("Building a runner for %s failed: %s", config.app_name, e)
+            ready.set_exception(e)
+            return
+        item = PooledRunner(
+            config,
+            Runner(
+                agent=agent,
+                app_name=config.app_name,
+                session_service=self.session_service,
+                artifact_service=self.artifact_service,
+                memory_service=self.memory_service,
+            ),
+        )
+        try:
+            # Warm runners hold open sessions, so leases skip the connect
+            await asyncio.wait_for(item.connect(), self.health_check_timeout)
+        except Exception as e:
+            # Tools still connect on their first call once the server is back
+            logger.warning(
+                "Connecting a runner for %s to MCP failed: %s", config.app_name, e
+            )
+        self.builds += 1
+        logger.info(
+            "Built a runner for %s in %.2fs",
+            config.app_name,
+            time.perf_counter() - started,
+        )
+        ready.set_result(item)
+        try:
+            await item._close.wait()
+        finally:
+            try:
+                await exit_stack.aclose()
+            except Exception as e:
+                logger.warning("Closing a pooled runner failed: %s", e)
+
+    def _retire(self, item: PooledRunner) -> None:
+        self.retired += 1
+        item.close()
+
+    def _replenish(self, config: RunnerConfig, pool: _KeyPool) -> None:
+        """Starts background builds until `min_idle` Runners are idle again."""
+        missing = min(
+            self.min_idle - len(pool.idle) - pool.building,
+            self.max_size - pool.total,
+        )
+        for _ in range(max(0, missing)):
+            pool.building += 1
+            task = asyncio.create_task(self._build_in_background(config, pool))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _build_in_background(self, config: RunnerConfig, pool: _KeyPool):
+        item = None
+        try:
+            item = await self._build(config)
+        except Exception:
+            pass  # Logged by _hold; the next maintenance round retries
+        finally:
+            async with pool.condition:
+                pool.building -= 1
+                if item is not None:
+                    if config in self._pools:
+                        pool.idle.append(item)
+                    else:
+                        self._retire(item)
+                pool.condition.notify()
+            self._evict()
+
+    def _pool(self, config: RunnerConfig) -> _KeyPool:
+        pool = self._pools.get(config)
+        if pool is not None:
+            self._pools.move_to_end(config)
+            return pool
+        pool = self._pools[config] = _KeyPool()
+        self._evict()
+        return pool
+
+    def _evict(self) -> None:
+        """Drops least recently used configs while there are more than allowed."""
+        for config, pool in list(self._pools.items())[:-1]:
+            if len(self._pools) <= self.max_configs:
+                return
+            if not pool.leased and not pool.building:
+                del self._pools[config]
+                while pool.idle:
+                    self._retire(pool.idle.popleft())
+                logger.info("Evicted pooled runners for %s", config.app_name)
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for config, pool in list(self._pools.items()):
+                try:
+                    await self._check(config, pool)
+                except Exception as e:
+                    logger.error("Runner pool maintenance failed: %s", e)
+
+    async def _check(self, config: RunnerConfig, pool: _KeyPool) -> None:
+        async with pool.condition:
+            candidates = list(pool.idle)
+            pool.idle.clear()
+            pool.leased += len(candidates)
+        now = time.monotonic()
+        for item in candidates:
+            keep = now - item.created_at < self.max_age and await item.healthy(
+                self.health_check_timeout
+            )
+            async with pool.condition:
+                pool.leased -= 1
+                if keep:
+                    pool.idle.append(item)
+                else:
+                    self._retire(item)
+                pool.condition.notify()
+        if config in self._pools:
+            self._replenish(config, pool)
+        self._evict()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            config.app_name: {
+                "idle": len(pool.idle),
+                "leased": pool.leased,
+                "building": pool.building,
+            }
+            for config, pool in self._pools.items()
+        }
+
+    async def close(self) -> None:
+        """Closes every pooled Runner and its MCP connections."""
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            self._maintenance = None
+        for pool in self._pools.values():
+            while pool.idle:
+                self._retire(pool.idle.popleft())
+        self._pools.clear()
+        holders = [t for t in self._background if not t.done()]
+        await asyncio.gather(*holders, return_exceptions=True)
@@ -0,0 +1,268 @@
+import cProfile
+import contextlib
+import glob
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import statistics
+import sys
+import sysconfig
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, ContextManager, Dict, Iterator, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Directory sampled turns' profiles are written to; profiling is off when empty
+TURN_PROFILE_DIR = os.getenv("TURN_PROFILE_DIR", "")
+
+# Fraction of turns profiled while TURN_PROFILE_DIR is set
+TURN_PROFILE_SAMPLE_RATE = float(os.getenv("TURN_PROFILE_SAMPLE_RATE", "0.01"))
+
+# Seconds after a profiled turn before the next one may be profiled, which
+# bounds the overhead however many turns run concurrently
+TURN_PROFILE_MIN_INTERVAL = float(os.getenv("TURN_PROFILE_MIN_INTERVAL", "10"))
+
+# Functions and allocation sites listed per turn in turns.jsonl
+TOP_PER_TURN = 10
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+_BUILTIN_MODULE_RE = re.compile(r"<built-in method (\w+)\.|of '(\w+)\.[\w.]+' objects>")
+
+_UNSAMPLED = contextlib.nullcontext()
+
+
+def _function_name(key: Tuple[str, int, str]) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name
+    if filename.startswith(_APP_DIR):
+        filename = os.path.relpath(filename, _APP_DIR)
+    return f"{filename}:{line}({name})"
+
+
+def _package(key: Tuple[str, int, str]) -> str:
+    """The package a profiled function belongs to, e.g. google.adk or asyncio."""
+    filename, _, name = key
+    if filename == "~":
+        match = _BUILTIN_MODULE_RE.search(name)
+        return (match.group(1) or match.group(2)) if match else "builtins"
+    parts = filename.replace(os.sep, "/").split("/")
+    if "site-packages" in parts:
+        rest = parts[parts.index("site-packages") + 1 :]
+        if rest[0] == "google" and len(rest) > 2:
+            return f"google.{rest[1]}"
+        return rest[0].removesuffix(".py")
+    if filename.startswith(_APP_DIR):
+        return "app:" + os.path.relpath(filename, _APP_DIR).split(os.sep)[0]
+    if filename.startswith(_STDLIB_DIR):
+        return (
+            os.path.relpath(filename, _STDLIB_DIR).split(os.sep)[0].removesuffix(".py")
+        )
+    return filename
+
+
+class TurnProfiler:
+    """
+    Profiles the CPU time and allocations of a sampled fraction of turns.
+
+    A sampled turn runs under cProfile and tracemalloc. Time spent waiting for
+    the model or a tool shows up in the event loop's `select` call; the rest
+    is the Python-side work of the Runner, AgentTool wrapping, event
+    processing and logging. Each sampled turn leaves in `output_dir`:
+
+    - `<turn_id>.prof`: the CPU profile (`python -m pstats`, snakeviz),
+    - `<turn_id>.tracemalloc`: allocations made during the turn and still
+      alive at its end (`tracemalloc.Snapshot.load`),
+    - a line in `turns.jsonl` with wall time, CPU time of the event loop's
+      thread, peak traced memory and the turn's hottest functions and
+      allocation sites.
+
+    The files are written on a background thread. `report()` aggregates every
+    profiled turn into a hot-function report.
+
+    Both profilers see the whole event loop thread: with many concurrent
+    turns, the work of others interleaved with a sampled turn is included and
+    slowed down too (several times over while profiled), so only one turn is
+    profiled at a time and at most one per `min_interval` seconds. Calls
+    offloaded to other threads are not profiled. When the profiler is off,
+    `turn()` only checks a float; unsampled turns also draw a random number.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = TURN_PROFILE_DIR,
+        sample_rate: float = TURN_PROFILE_SAMPLE_RATE,
+        min_interval: float = TURN_PROFILE_MIN_INTERVAL,
+    ):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate if output_dir else 0.0
+        self.min_interval = min_interval
+        self.profiled = 0
+        self._active = False
+        self._next_allowed = 0.0
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._last_write: Optional[Future] = None
+        if self.sample_rate > 0:
+            os.makedirs(output_dir, exist_ok=True)
+            self._writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="turn-profile-writer"
+            )
+            logger.info(
+                "Profiling %.1f%% of turns into %s", self.sample_rate * 100, output_dir
+            )
+
+    def turn(self, session_id: str = "", agent: str = "") -> ContextManager:
+        """Wraps one turn; profiles it if it is sampled."""
+        if (
+            self.sample_rate <= 0
+            or self._active
+            or random.random() >= self.sample_rate
+            or time.monotonic() < self._next_allowed
+            or sys.getprofile() is not None
+        ):
+            return _UNSAMPLED
+        return self._profile(session_id, agent)
+
+    @contextlib.contextmanager
+    def _profile(self, session_id: str, agent: str) -> Iterator[str]:
+        self._active = True
+        turn_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        # Allocations are only attributed to the turn if tracing starts with it
+        trace = not tracemalloc.is_tracing()
+        if trace:
+            tracemalloc.start()
+        profile = cProfile.Profile()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        profile.enable()
+        try:
+            yield turn_id
+        finally:
+            profile.disable()
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            snapshot, peak = None, 0
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1]
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            self._active = False
+            self._next_allowed = time.monotonic() + self.min_interval
+            self.profiled += 1
+            summary = {
+                "turn_id": turn_id,
+                "session_id": session_id,
+                "agent": agent,
+                "wall_ms": round(wall * 1000, 2),
+                "cpu_ms": round(cpu * 1000, 2),
+                "peak_traced_kib": round(peak / 1024, 1),
+            }
+            self._last_write = self._writer.submit(
+                self._write, summary, profile, snapshot
+            )
+
+    def _write(
+        self,
+        summary: Dict[str, Any],
+        profile: cProfile.Profile,
+        snapshot: Optional[tracemalloc.Snapshot],
+    ) -> None:
+        path = os.path.join(self.output_dir, summary["turn_id"])
+        try:
+            profile.dump_stats(path + ".prof")
+            stats = pstats.Stats(profile).stats
+            summary["function_calls"] = sum(nc for _, nc, _, _, _ in stats.values())
+            hottest = sorted(stats.items(), key=lambda item: -item[1][2])
+            summary["top_functions"] = [
+                {
+                    "function": _function_name(key),
+                    "own_ms": round(tt * 1000, 3),
+                    "calls": nc,
+                }
+                for key, (_, nc, tt, _, _) in hottest[:TOP_PER_TURN]
+            ]
+            if snapshot is not None:
+                snapshot.dump(path + ".tracemalloc")
+                sites = snapshot.statistics("lineno")
+                summary["retained_kib"] = round(sum(s.size for s in sites) / 1024, 1)
+                summary["top_allocations"] = [
+                    {"line": str(s.traceback), "kib": round(s.size / 1024, 1)}
+                    for s in sites[:TOP_PER_TURN]
+                ]
+            with open(
+                os.path.join(self.output_dir, "turns.jsonl"), "a", encoding="utf-8"
+            ) as summaries:
+                summaries.write(json.dumps(summary) + "\n")
+        except Exception as e:
+            logger.error("Writing the profile of turn %s failed: %s", path, e)
+
+    def flush(self) -> None:
+        """Waits until the profiles of finished turns are on disk."""
+        if self._last_write is not None:
+            self._last_write.result()
+
+
+def report(profile_dir: str, top: int = 25) -> str:
+    """Aggregates the profiled turns in `profile_dir` into a text report."""
+    profiles = sorted(glob.glob(os.path.join(profile_dir, "*.prof")))
+    if not profiles:
+        return f"No turn profiles in {profile_dir}"
+    turns = []
+    summaries_path = os.path.join(profile_dir, "turns.jsonl")
+    if os.path.exists(summaries_path):
+        with open(summaries_path, encoding="utf-8") as summaries:
+            turns = [json.loads(line) for line in summaries if line.strip()]
+    count = len(profiles)
+    stats = pstats.Stats(*profiles).stats
+    total = sum(tt for _, _, tt, _, _ in stats.values()) or 1e-9
+
+    lines = [f"Profiled turns: {count}"]
+    if turns:
+        wall = statistics.median(turn["wall_ms"] for turn in turns)
+        cpu = statistics.median(turn["cpu_ms"] for turn in turns)
+        peak = statistics.median(turn["peak_traced_kib"] for turn in turns)
+        lines.append(
+            f"Per turn (median): {wall:.1f} ms wall, {cpu:.1f} ms CPU on the event "
+            f"loop thread ({cpu / max(wall, 1e-9):.0%}), {peak:.0f} KiB peak traced"
+        )
+
+    by_package: Counter = Counter()
+    for key, (_, _, tt, _, _) in stats.items():
+        by_package[_package(key)] += tt
+    lines.append("\nTime by package (ms per turn; select is waiting for I/O):")
+    for package, tt in by_package.most_common(top):
+        lines.append(f"  {tt * 1000 / count:>9.2f}  {tt / total:>4.0%}  {package}")
+
+    lines.append("\nHot functions by own time (ms per turn, calls per turn):")
+    hottest = sorted(stats.items(), key=lambda item: -item[1][2])[:top]
+    for key, (_, nc, tt, _, _) in hottest:
+        lines.append(
+            f"  {tt * 1000 / count:>9.3f}  {nc / count:>9.0f}  {_function_name(key)}"
+        )
+
+    snapshots = sorted(glob.glob(os.path.join(profile_dir, "*.tracemalloc")))
+    if snapshots:
+        sizes: Counter = Counter()
+        blocks: Counter = Counter()
+        for path in snapshots:
+            for stat in tracemalloc.Snapshot.load(path).statistics("lineno"):
+                site = str(stat.traceback)
+                sizes[site] += stat.size
+                blocks[site] += stat.count
+        lines.append(
+            "\nAllocations still alive at the end of the turn "
+            "(KiB per turn, blocks per turn):"
+        )
+        for site, size in sizes.most_common(top):
+            lines.append(
+                f"  {size / 1024 / len(snapshots):>9.1f}  "
+                f"{blocks[site] / len(snapshots):>9.0f}  {site}"
+            )
+    return "\n".join(lines)
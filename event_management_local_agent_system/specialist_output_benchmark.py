@@ -0,0 +1,180 @@
+"""
+Measures how much specialist output the EventOrganizerAgent re-reads per turn.
+
+Runs the same multi-turn conversation twice: once with the planner returning
+free-form prose through a plain AgentTool (the previous setup) and once with
+the structured planner behind a BoundedAgentTool. Stub models stand in for
+Gemini unless --live is given, so the prompt sizes are exact but the stub
+latencies only show framework overhead; with --live the latencies are real.
+
+Usage: python specialist_output_benchmark.py [--turns 6] [--live]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import AsyncGenerator, List
+
+from google.adk.agents import LlmAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+from agents.birthday_planner import birthday_planner_agent
+from agents.event_organizer import create_event_organizer_agent
+
+# Same estimate as batch.py, which cannot be imported without an MCP server
+CHARS_PER_TOKEN = 4
+
+QUERIES = [
+    "Party ideas for my son Leo, turning 7, who loves dinosaurs and space.",
+    "Any ideas for his sister Mia's 10th? She likes painting and horses.",
+    "What about a surprise party for grandpa's 80th? He loves jazz.",
+    "Ideas for a joint party for twins turning 5 who love trains.",
+    "Something for a 16-year-old into gaming and music.",
+    "Low-budget ideas for a 3-year-old's garden party.",
+]
+
+THEME = (
+    "Picture the room transformed: streamers, handmade banners and a photo "
+    "corner with costumes. Guests start with a welcome craft, then a treasure "
+    "hunt with clues hidden around the venue, followed by a themed relay race. "
+    "Serve colourful finger food, a cake decorated to match and fruit punch "
+    "in labelled bottles. Close with a short show and party bags. "
+)
+
+
+class StubLlm(BaseLlm):
+    """Deterministic stand-in for the organizer and planner models."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        last = llm_request.contents[-1].parts[-1]
+        if llm_request.config.response_schema is not None:
+            themes = [
+                {
+                    "id": str(i),
+                    "name": f"Theme {i}",
+                    "summary": f"A lively theme number {i} built around the interests.",
+                    "details": THEME * 2,
+                }
+                for i in range(1, 6)
+            ]
+            text = json.dumps({"themes": themes})
+        elif "Generator" in str(llm_request.config.system_instruction):
+            text = "".join(
+                f"**Theme {i}**: A lively theme built around the interests. {THEME * 2}\n"
+                for i in range(1, 6)
+            )
+        elif last.text:
+            call = types.FunctionCall(
+                name=birthday_planner_agent.name, args={"request": last.text}
+            )
+            yield LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(function_call=call)]
+                )
+            )
+            return
+        else:
+            text = "Here are five themes: Theme 1 to Theme 5. Want details on one?"
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)])
+        )
+
+
+def prose_planner(model) -> LlmAgent:
+    """The planner as it was before it had an output schema."""
+    return LlmAgent(
+        name=birthday_planner_agent.name,
+        model=model,
+        description=birthday_planner_agent.description,
+        instruction=(
+            "You are a specialized Birthday Party Idea Generator.\n"
+            "Given the age and interests of the birthday person, provide 3-5 creative "
+            "and distinct theme or activity suggestions suitable for them. Be "
+            "descriptive and fun!"
+        ),
+    )
+
+
+def build_organizer(bounded: bool, live: bool) -> LlmAgent:
+    model = "gemini-2.0-flash" if live else StubLlm(model="stub")
+    calendar = LlmAgent(name="CalendarServiceAgent", model=model, instruction="")
+    if bounded:
+        planner = birthday_planner_agent.model_copy(update={"model": model})
+        organizer = create_event_organizer_agent(planner, calendar)
+    else:
+        planner = prose_planner(model)
+        organizer = create_event_organizer_agent(planner, calendar)
+        organizer.tools = [AgentTool(agent=planner), AgentTool(agent=calendar)]
+    organizer.model = model
+    return organizer
+
+
+async def run(bounded: bool, turns: int, live: bool) -> dict:
+    organizer = build_organizer(bounded, live)
+    prompt_chars: List[int] = []
+
+    def measure(callback_context, llm_request):
+        instruction = str(llm_request.config.system_instruction or "")
+        chars = len(instruction) + sum(
+            len(json.dumps(part.model_dump(mode="json", exclude_none=True)))
+            for content in llm_request.contents
+            for part in content.parts or []
+        )
+        prompt_chars.append(chars)
+
+    organizer.before_model_callback = measure
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=organizer,
+        app_name="OutputBudgetBenchmark",
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService(),
+    )
+    session = session_service.create_session(
+        app_name="OutputBudgetBenchmark", user_id="bench"
+    )
+    latencies = []
+    for query in (QUERIES * turns)[:turns]:
+        message = types.Content(role="user", parts=[types.Part(text=query)])
+        started = time.perf_counter()
+        async for _ in runner.run_async(
+            user_id="bench", session_id=session.id, new_message=message
+        ):
+            pass
+        latencies.append(time.perf_counter() - started)
+    return {
+        "organizer_prompt_tokens_last_turn": prompt_chars[-1] // CHARS_PER_TOKEN,
+        "organizer_prompt_tokens_total": sum(prompt_chars) // CHARS_PER_TOKEN,
+        "organizer_model_calls": len(prompt_chars),
+        "p50_turn_ms": round(statistics.median(latencies) * 1000, 1),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    before = await run(bounded=False, turns=args.turns, live=args.live)
+    after = await run(bounded=True, turns=args.turns, live=args.live)
+    print(f"{'':36}{'AgentTool':>12}{'Bounded':>12}")
+    for key in before:
+        print(f"{key:36}{before[key]:>12}{after[key]:>12}")
+    saved = (
+        1
+        - after["organizer_prompt_tokens_total"]
+        / before["organizer_prompt_tokens_total"]
+    )
+    print(f"Organizer prompt tokens over {args.turns} turns: {saved:.0%} fewer")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--live", action="store_true", help="Use the real models")
+    asyncio.run(main(parser.parse_args()))
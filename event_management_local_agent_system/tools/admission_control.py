@@ -0,0 +1,291 @@
+import asyncio
+import base64
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict
+
+from fastmcp.exceptions import ToolError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from logging_config import get_event_logger
+
+# Set up logging; shed calls are logged through the sampled event logger so
+# that an overload does not also flood the log pipeline
+logger = logging.getLogger(__name__)
+event_logger = get_event_logger(__name__)
+
+# Identity of the client whose SSE connection the current tool call arrived on
+current_client: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_client", default="anonymous"
+)
+
+# Header clients can send to be identified independently of their IP address
+CLIENT_ID_HEADER = b"x-client-id"
+FORWARDED_FOR_HEADER = b"x-forwarded-for"
+AUTHORIZATION_HEADER = b"authorization"
+
+# What per-client limits and round-robin turns are keyed on:
+# - 'address': the caller's address as seen by the trusted proxy (default),
+# - 'principal': the identity in the bearer token, for services that only
+#   admit IAM-authenticated callers (Cloud Run verifies the token before the
+#   request reaches the server; this module does not),
+# - 'client-id': the X-Client-Id header, for trusted callers only.
+# Headers are chosen by the caller: a caller could rotate them to claim every
+# round-robin slot, which is why neither mode that reads them is the default.
+ADMISSION_CLIENT_KEY = os.getenv("ADMISSION_CLIENT_KEY", "address").lower()
+
+# Proxies in front of the server that append the caller's address to
+# X-Forwarded-For (Cloud Run's front end is one). Entries further left were
+# sent by the caller and are ignored; 0 uses the peer address instead.
+ADMISSION_TRUSTED_PROXY_HOPS = int(os.getenv("ADMISSION_TRUSTED_PROXY_HOPS", "1"))
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}; retry_after={retry_after:.1f}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds concurrent tool executions and the queue in front of them.
+
+    Up to `max_concurrent` calls run at once and up to `max_queue` wait for a
+    slot. Waiters are queued per client and served round-robin, and a single
+    client may hold at most `max_per_client` running or queued calls, so one
+    busy client cannot starve the others. Anything beyond those limits, or
+    waiting longer than `queue_timeout` seconds, is rejected immediately with
+    a retry-after hint derived from the recent service time.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queue: int = 64,
+        max_per_client: int = 8,
+        queue_timeout: float = 5.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._queued = 0
+        self._per_client: Dict[str, int] = {}
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._avg_service_time = 0.1
+        self.shed = 0
+        self.admitted = 0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "16")),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+            max_per_client=int(os.getenv("ADMISSION_MAX_PER_CLIENT", "8")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5")),
+        )
+
+    def retry_after(self) -> float:
+        """Estimated seconds until the current backlog has drained."""
+        backlog = (self._queued + self._active) / self.max_concurrent
+        return min(30.0, max(0.5, backlog * self._avg_service_time))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.shed += 1
+        return Overloaded(reason, self.retry_after())
+
+    async def acquire(self, client: str) -> None:
+        if self._per_client.get(client, 0) >= self.max_per_client:
+            raise self._reject("Too many concurrent requests from this client")
+        if self._active < self.max_concurrent and not self._queued:
+            self._active += 1
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+            self.admitted += 1
+            return
+        if self._queued >= self.max_queue:
+            raise self._reject("Server overloaded")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client, deque()).append(waiter)
+        self._queued += 1
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release(client)
+            else:
+                self._drop_waiter(client, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("Timed out waiting in the admission queue")
+            raise
+        self.admitted += 1
+
+    def _drop_waiter(self, client: str, waiter: asyncio.Future) -> None:
+        queue = self._waiters.get(client)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._waiters[client]
+            self._queued -= 1
+        self._decrement(client)
+
+    def _decrement(self, client: str) -> None:
+        remaining = self._per_client.get(client, 0) - 1
+        if remaining > 0:
+            self._per_client[client] = remaining
+        else:
+            self._per_client.pop(client, None)
+
+    def release(self, client: str) -> None:
+        self._decrement(client)
+        # Hand the slot to the next client in round-robin order
+        while self._waiters:
+            next_client, queue = next(iter(self._waiters.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(next_client)
+            else:
+                del self._waiters[next_client]
+            self._queued -= 1
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _record(self, elapsed: float) -> None:
+        self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * elapsed
+
+    def guard(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wraps a tool function so each call goes through admission control."""
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            client = current_client.get()
+            try:
+                await self.acquire(client)
+            except Overloaded as e:
+                event_logger.info(
+                    "Shedding %s call from %s: %s", func.__name__, client, e.reason
+                )
+                raise ToolError(str(e)) from e
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            finally:
+                self._record(time.perf_counter() - started)
+                self.release(client)
+
+        return wrapper
+
+
+class ConnectionAdmissionMiddleware:
+    """
+    ASGI middleware that limits open SSE connections and tags each request
+    with its client identity.
+
+    New SSE connections beyond `max_connections` are refused with HTTP 503
+    and a Retry-After header before any MCP session is created.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        admission: AdmissionController,
+        max_connections: int = 256,
+        sse_path: str = "/sse",
+    ):
+        self.app = app
+        self.admission = admission
+        self.max_connections = max_connections
+        self.sse_path = sse_path
+        self.open_connections = 0
+
+    @staticmethod
+    def client_address(headers: Dict[bytes, bytes], scope: Scope) -> str:
+        """The caller's address as appended by the trusted proxy hop."""
+        if ADMISSION_TRUSTED_PROXY_HOPS > 0 and FORWARDED_FOR_HEADER in headers:
+            hops = [
+                hop.strip()
+                for hop in headers[FORWARDED_FOR_HEADER].decode("latin-1").split(",")
+                if hop.strip()
+            ]
+            if len(hops) >= ADMISSION_TRUSTED_PROXY_HOPS:
+                return hops[-ADMISSION_TRUSTED_PROXY_HOPS]
+        client = scope.get("client")
+        return client[0] if client else "anonymous"
+
+    @staticmethod
+    def principal(headers: Dict[bytes, bytes]) -> str:
+        """The email or subject of a bearer token verified upstream, or ''."""
+        scheme, _, token = headers.get(AUTHORIZATION_HEADER, b"").partition(b" ")
+        parts = token.split(b".")
+        if scheme.lower() != b"bearer" or len(parts) != 3:
+            return ""
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(parts[1] + b"=" * 4))
+        except ValueError:
+            return ""
+        if not isinstance(claims, dict):
+            return ""
+        return str(claims.get("email") or claims.get("sub") or "")
+
+    def client_id(self, scope: Scope) -> str:
+        """The key the caller's per-client limits are counted under."""
+        headers = dict(scope.get("headers", []))
+        if ADMISSION_CLIENT_KEY == "principal":
+            principal = self.principal(headers)
+            if principal:
+                return f"principal:{principal}"
+        elif ADMISSION_CLIENT_KEY == "client-id" and CLIENT_ID_HEADER in headers:
+            return headers[CLIENT_ID_HEADER].decode("latin-1")
+        return self.client_address(headers, scope)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = current_client.set(self.client_id(scope))
+        try:
+            if scope["path"] != self.sse_path:
+                await self.app(scope, receive, send)
+                return
+            if self.open_connections >= self.max_connections:
+                retry_after = max(1, round(self.admission.retry_after()))
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 503,
+                        "headers": [
+                            (b"retry-after", str(retry_after).encode()),
+                            (b"content-type", b"text/plain"),
+                        ],
+                    }
+                )
+                await send(
+                    {"type": "http.response.body", "body": b"Too many connections"}
+                )
+                return
+            self.open_connections += 1
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.open_connections -= 1
+        finally:
+            current_client.reset(token)
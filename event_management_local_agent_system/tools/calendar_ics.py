@@ -0,0 +1,279 @@
+import codecs
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
+
+from calendar_store import CalendarEvent
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# RFC 5545 limits content lines to 75 octets, excluding the line break
+MAX_LINE_OCTETS = 75
+
+_DURATION_RE = re.compile(
+    r"^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+_UNESCAPE_RE = re.compile(r"\\(.?)")
+
+
+def _unescape_text(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return _UNESCAPE_RE.sub(
+        lambda m: "\n" if m.group(1) in ("n", "N") else m.group(1), value
+    )
+
+
+def _escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _parse_datetime(value: str) -> datetime:
+    """Parses DATE or DATE-TIME values; UTC and TZID times are kept as wall time."""
+    value = value.strip().rstrip("Z")
+    # Fixed-width fields are sliced directly; strptime dominates import time
+    if len(value) == 15 and value[8] == "T":
+        return datetime(
+            int(value[0:4]),
+            int(value[4:6]),
+            int(value[6:8]),
+            int(value[9:11]),
+            int(value[11:13]),
+            int(value[13:15]),
+        )
+    if "T" in value:
+        return datetime.strptime(value, "%Y%m%dT%H%M")
+    return datetime.strptime(value, "%Y%m%d")
+
+
+def _parse_duration(value: str) -> timedelta:
+    match = _DURATION_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid DURATION: {value}")
+    parts = {k: int(v) for k, v in match.groupdict().items() if v and k != "sign"}
+    delta = timedelta(**parts)
+    return -delta if match.group("sign") == "-" else delta
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _fold(line: str) -> str:
+    """Folds a content line into CRLF-separated chunks of at most 75 octets."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + "\r\n"
+    chunks = []
+    current: List[str] = []
+    size = 0
+    limit = MAX_LINE_OCTETS
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            chunks.append("".join(current))
+            current, size = [], 0
+            # Continuation lines start with a space that counts towards the limit
+            limit = MAX_LINE_OCTETS - 1
+        current.append(char)
+        size += char_size
+    chunks.append("".join(current))
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+class IcsEventParser:
+    """
+    Incremental parser turning iCalendar content lines into VEVENT dicts.
+
+    Lines are pushed one at a time with `feed_line`, so callers can parse
+    from files, HTTP bodies or any other stream while only holding the event
+    currently being read. Folded lines are unfolded and only the properties
+    the calendar service stores are kept.
+    """
+
+    def __init__(self):
+        self._pending: Optional[str] = None
+        self._current: Optional[Dict[str, Any]] = None
+        self._depth = 0
+        self.skipped = 0
+
+    def feed_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Consumes one physical line and returns an event once one is complete."""
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if self._pending is not None:
+                self._pending += line[1:]
+            return None
+        logical, self._pending = self._pending, line
+        return self._process(logical) if logical else None
+
+    def close(self) -> Optional[Dict[str, Any]]:
+        """Flushes the last buffered line at the end of the input."""
+        logical, self._pending = self._pending, None
+        return self._process(logical) if logical else None
+
+    def _process(self, line: str) -> Optional[Dict[str, Any]]:
+        name_part, sep, value = line.partition(":")
+        if not sep:
+            return None
+        name, *params = name_part.split(";")
+        name = name.upper()
+
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and self._current is None:
+                self._current = {}
+                self._depth = 0
+            elif self._current is not None:
+                # Nested components such as VALARM are ignored
+                self._depth += 1
+            return None
+        if name == "END":
+            if self._current is None:
+                return None
+            if self._depth:
+                self._depth -= 1
+                return None
+            event, self._current = self._current, None
+            return self._finish(event)
+        if self._current is None or self._depth:
+            return None
+
+        if name == "SUMMARY":
+            self._current["title"] = _unescape_text(value)
+        elif name == "DESCRIPTION":
+            self._current["description"] = _unescape_text(value)
+        elif name == "UID":
+            self._current["uid"] = value.strip()
+        elif name in ("DTSTART", "DTEND"):
+            self._current[name.lower()] = value
+            if any(p.upper() == "VALUE=DATE" for p in params) or "T" not in value:
+                self._current[f"{name.lower()}_is_date"] = True
+        elif name == "DURATION":
+            self._current["duration"] = value
+        return None
+
+    def _finish(self, raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            start = _parse_datetime(raw["dtstart"])
+            if "dtend" in raw:
+                end = _parse_datetime(raw["dtend"])
+            elif "duration" in raw:
+                end = start + _parse_duration(raw["duration"])
+            elif raw.get("dtstart_is_date"):
+                end = start + timedelta(days=1)
+            else:
+                end = start
+        except (KeyError, ValueError) as e:
+            self.skipped += 1
+            logger.debug("Skipping VEVENT without a usable start/end: %s", e)
+            return None
+        return {
+            "uid": raw.get("uid", ""),
+            "title": raw.get("title", ""),
+            "description": raw.get("description", ""),
+            "start": start,
+            "end": end,
+        }
+
+
+def iter_ics_events(
+    lines: Iterable[str], parser: Optional[IcsEventParser] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily parses VEVENTs from an iterable of lines (e.g., an open file).
+
+    Memory use is bounded by the size of a single event, regardless of how
+    many events the input contains. Pass a `parser` to inspect its `skipped`
+    count afterwards.
+    """
+    parser = parser or IcsEventParser()
+    for line in lines:
+        event = parser.feed_line(line)
+        if event is not None:
+            yield event
+    event = parser.close()
+    if event is not None:
+        yield event
+
+
+async def aiter_ics_events(
+    chunks: AsyncIterable[bytes],
+    parser: Optional[IcsEventParser] = None,
+    encoding: str = "utf-8",
+) -> AsyncIterator[Dict[str, Any]]:
+    """Same as `iter_ics_events`, for byte chunks such as an HTTP request body."""
+    parser = parser or IcsEventParser()
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            event = parser.feed_line(line)
+            if event is not None:
+                yield event
+    buffer += decoder.decode(b"", final=True)
+    for line in buffer.split("\n"):
+        event = parser.feed_line(line)
+        if event is not None:
+            yield event
+    event = parser.close()
+    if event is not None:
+        yield event
+
+
+def iter_ics_chunks(
+    events: Iterable[CalendarEvent],
+    calendar_name: str = "ADK Calendar",
+    chunk_size: int = 64 * 1024,
+) -> Iterator[str]:
+    """
+    Serializes events to iCalendar text, yielding chunks of about `chunk_size`
+    characters so that exports never hold the whole calendar in memory.
+    """
+    stamp = _format_datetime(datetime.utcnow()) + "Z"
+    buffer: List[str] = [
+        "BEGIN:VCALENDAR\r\n",
+        "VERSION:2.0\r\n",
+        "PRODID:-//ADK Workshop//Calendar MCP Service//EN\r\n",
+        _fold(f"X-WR-CALNAME:{_escape_text(calendar_name)}"),
+    ]
+    size = sum(len(line) for line in buffer)
+    for event in events:
+        lines = [
+            "BEGIN:VEVENT\r\n",
+            _fold(f"UID:{event.uid or event.event_id + '@adk-calendar-mcp'}"),
+            f"DTSTAMP:{stamp}\r\n",
+            f"DTSTART:{_format_datetime(event.start)}\r\n",
+            f"DTEND:{_format_datetime(event.end)}\r\n",
+            _fold(f"SUMMARY:{_escape_text(event.title)}"),
+        ]
+        if event.description:
+            lines.append(_fold(f"DESCRIPTION:{_escape_text(event.description)}"))
+        lines.append("END:VEVENT\r\n")
+        buffer.extend(lines)
+        size += sum(len(line) for line in lines)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    buffer.append("END:VCALENDAR\r\n")
+    yield "".join(buffer)
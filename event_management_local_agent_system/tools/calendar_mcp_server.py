@@ -1,25 +1,232 @@
 import asyncio
+import hashlib
+import hmac
+import json
 import os
 import logging
+import re
+import uvicorn
+from typing import Optional
+from urllib.parse import quote
 from fastmcp import FastMCP
-from calendar_tools import create_calendar_event
+from starlette.concurrency import iterate_in_threadpool
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from calendar_ics import IcsEventParser, aiter_ics_events, iter_ics_chunks
+from calendar_shards import SHARD_ADMIN_TOKEN, RemoteShard, store
+from calendar_tools import (
+    EventBatchImporter,
+    check_calendar_availability,
+    create_calendar_event,
+    export_calendar_events,
+    import_calendar_events,
+    search_calendar_events,
+)
+from admission_control import (
+    AdmissionController,
+    ConnectionAdmissionMiddleware,
+    Overloaded,
+    current_client,
+)
+from logging_config import setup_logging
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize FastMCP App
 mcp = FastMCP("ADKCalendarMCPService")
-logging.info(f"FastMCP server initialized")
+logger.info("FastMCP server initialized")
+
+# Bound concurrent tool executions so spikes are shed instead of queued forever
+admission = AdmissionController.from_env()
+
+# Instances the service may scale to; the shard ring lives in one process,
+# so shards can only be added while running with a single instance
+CALENDAR_MAX_INSTANCES = int(os.getenv("CALENDAR_MAX_INSTANCES", "1"))
 
 # Register the Python functions as MCP tools
-mcp.tool()(create_calendar_event)
-logging.info("Tools registered with FastMCP server.")
+mcp.tool()(admission.guard(create_calendar_event))
+mcp.tool()(admission.guard(check_calendar_availability))
+mcp.tool()(admission.guard(search_calendar_events))
+mcp.tool()(admission.guard(import_calendar_events))
+mcp.tool()(admission.guard(export_calendar_events))
+logger.info("Tools registered with FastMCP server.")
+
+
+_tool_manifest = None
+
+
+async def get_tool_manifest() -> dict:
+    """Returns the tool schemas and a hash identifying this version of them."""
+    global _tool_manifest
+    if _tool_manifest is None:
+        tools = sorted(
+            (
+                tool.to_mcp_tool(name=key).model_dump(mode="json", exclude_none=True)
+                for key, tool in (await mcp.get_tools()).items()
+            ),
+            key=lambda tool: tool["name"],
+        )
+        encoded = json.dumps(tools, sort_keys=True).encode("utf-8")
+        version = hashlib.sha256(encoded).hexdigest()[:16]
+        _tool_manifest = {"version": version, "tools": tools}
+    return _tool_manifest
+
+
+# Lets clients cache the tool list instead of calling list_tools on every start
+@mcp.custom_route("/tools/manifest", methods=["GET"])
+async def tool_manifest(request: Request) -> Response:
+    """Serves the tool manifest; answers 304 if the client's copy is current."""
+    manifest = await get_tool_manifest()
+    etag = f'"{manifest["version"]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(manifest, headers={"ETag": etag})
+
+
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        {"status": "error", "message": str(e)},
+        status_code=503,
+        headers={"Retry-After": str(max(1, round(e.retry_after)))},
+    )
+
+
+# Bulk routes that stream .ics data instead of passing it through a tool call
+@mcp.custom_route("/calendars/{calendar_id}/import", methods=["POST"])
+async def import_ics(request: Request) -> JSONResponse:
+    """Imports an .ics request body, parsing it as it arrives."""
+    calendar_id = request.path_params["calendar_id"]
+    client = current_client.get()
+    try:
+        await admission.acquire(client)
+    except Overloaded as e:
+        return overloaded_response(e)
+    try:
+        importer = EventBatchImporter(calendar_id)
+        parser = IcsEventParser()
+        async for parsed in aiter_ics_events(request.stream(), parser):
+            await importer.aadd(parsed)
+        return JSONResponse(await importer.aresult(skipped=parser.skipped))
+    finally:
+        admission.release(client)
+
+
+@mcp.custom_route("/calendars/{calendar_id}/export.ics", methods=["GET"])
+async def export_ics(request: Request) -> Response:
+    """Streams a calendar as .ics without building the whole file in memory."""
+    calendar_id = request.path_params["calendar_id"]
+    client = current_client.get()
+    try:
+        await admission.acquire(client)
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    async def chunks():
+        # Holds the admission slot until the whole calendar has been sent
+        try:
+            async for chunk in iterate_in_threadpool(
+                iter_ics_chunks(
+                    store.iter_events(calendar_id), calendar_name=calendar_id
+                )
+            ):
+                yield chunk
+        finally:
+            admission.release(client)
+
+    # The ID is client input: keep quotes and line breaks out of the header
+    filename = re.sub(r"[^\w.-]", "_", calendar_id, flags=re.ASCII)
+    disposition = (
+        f'attachment; filename="{filename}.ics"; '
+        f"filename*=UTF-8''{quote(calendar_id, safe='')}.ics"
+    )
+    return StreamingResponse(
+        chunks(),
+        media_type="text/calendar",
+        headers={"Content-Disposition": disposition},
+    )
+
+
+def shard_admin_denied(request: Request) -> Optional[JSONResponse]:
+    """Rejects a /shards request that lacks the admin token."""
+    if not SHARD_ADMIN_TOKEN:
+        return JSONResponse(
+            {"status": "error", "message": "Shard administration is disabled."}, 403
+        )
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), SHARD_ADMIN_TOKEN.encode()):
+        return JSONResponse(
+            {"status": "error", "message": "Invalid admin token."},
+            401,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return None
+
+
+# Shard administration; adding a shard moves its calendars while serving traffic
+@mcp.custom_route("/shards", methods=["GET"])
+async def list_shards(request: Request) -> JSONResponse:
+    """Returns the number of calendars and events held by each shard."""
+    if denied := shard_admin_denied(request):
+        return denied
+    return JSONResponse(await asyncio.to_thread(store.shard_stats))
+
+
+@mcp.custom_route("/shards", methods=["POST"])
+async def add_shard(request: Request) -> JSONResponse:
+    """Adds a shard server, e.g. {"url": "http://127.0.0.1:9004"}."""
+    if denied := shard_admin_denied(request):
+        return denied
+    if CALENDAR_MAX_INSTANCES > 1:
+        # Other instances would keep routing with the old ring
+        return JSONResponse(
+            {
+                "status": "error",
+                "message": f"The service may run {CALENDAR_MAX_INSTANCES} "
+                "instances; deploy with MAX_INSTANCES=1 to add shards while "
+                "running, or list them in CALENDAR_SHARDS.",
+            },
+            409,
+        )
+    if not store.membership_path:
+        # Without somewhere to record it, the shard would be forgotten on restart
+        return JSONResponse(
+            {
+                "status": "error",
+                "message": "Set CALENDAR_DATA_DIR to add shards while running, "
+                "or list them in CALENDAR_SHARDS.",
+            },
+            409,
+        )
+    url = (await request.json()).get("url", "")
+    if not url.startswith(("http://", "https://")):
+        return JSONResponse(
+            {"status": "error", "message": "Provide the shard's http(s) URL."}, 400
+        )
+    try:
+        moved = await asyncio.to_thread(store.add_shard, url, RemoteShard(url))
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, 409)
+    return JSONResponse({"status": "success", "shard": url, **moved})
 
 
 # Entry point for Cloud Run
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
-    logging.info(f"Starting FastMCP server on port {port}...")
-    asyncio.run(mcp.run_sse_async(host="0.0.0.0", port=port))
+    app = mcp.http_app(
+        transport="sse",
+        middleware=[
+            Middleware(
+                ConnectionAdmissionMiddleware,
+                admission=admission,
+                max_connections=int(os.getenv("MAX_SSE_CONNECTIONS", "256")),
+            )
+        ],
+    )
+    logger.info("Starting FastMCP server on port %d...", port)
+    config = uvicorn.Config(
+        app, host="0.0.0.0", port=port, lifespan="on", timeout_graceful_shutdown=0
+    )
+    asyncio.run(uvicorn.Server(config).serve())
@@ -0,0 +1,403 @@
+import contextlib
+import fcntl
+import gc
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from calendar_store import CalendarEvent, CalendarStore
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Directory for snapshots and write-ahead logs; unset keeps events in memory only
+CALENDAR_DATA_DIR = os.getenv("CALENDAR_DATA_DIR")
+
+# Log records written before the next snapshot is started in the background
+SNAPSHOT_EVERY = int(os.getenv("CALENDAR_SNAPSHOT_EVERY", "100000"))
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+_OP_ADD = 1
+_OP_DELETE_CALENDAR = 2
+
+# op, start and end in microseconds since the epoch, byte lengths of the
+# event ID, calendar ID, title, description and UID that follow
+_EVENT = struct.Struct("<Bqq5I")
+# op, byte length of the calendar ID that follows
+_DELETE = struct.Struct("<BI")
+# Every log record: payload length, CRC-32 of the payload
+_RECORD = struct.Struct("<II")
+# magic, first log segment not covered by the snapshot, number of events
+_SNAPSHOT_HEADER = struct.Struct("<8sQQ")
+_SNAPSHOT_MAGIC = b"CALSNAP1"
+_CRC = struct.Struct("<I")
+
+_SNAPSHOT_RE = re.compile(r"snapshot-(\d+)\.bin$")
+_SEGMENT_RE = re.compile(r"wal-(\d+)\.log$")
+# Snapshots being written; a crash can leave one behind
+_TEMP_SNAPSHOT_RE = re.compile(r"snapshot-(\d+)\.bin\.tmp$")
+
+
+def _encode_event(event: CalendarEvent) -> bytes:
+    fields = [
+        value.encode("utf-8")
+        for value in (
+            event.event_id,
+            event.calendar_id,
+            event.title,
+            event.description,
+            event.uid,
+        )
+    ]
+    return _EVENT.pack(
+        _OP_ADD,
+        (event.start - _EPOCH) // _MICROSECOND,
+        (event.end - _EPOCH) // _MICROSECOND,
+        *map(len, fields),
+    ) + b"".join(fields)
+
+
+def _decode_event(buffer, offset: int) -> Tuple[CalendarEvent, int]:
+    _, start, end, *lengths = _EVENT.unpack_from(buffer, offset)
+    a = offset + _EVENT.size
+    b = a + lengths[0]
+    c = b + lengths[1]
+    d = c + lengths[2]
+    e = d + lengths[3]
+    f = e + lengths[4]
+    event = CalendarEvent(
+        str(buffer[a:b], "utf-8"),
+        sys.intern(str(buffer[b:c], "utf-8")),
+        str(buffer[c:d], "utf-8"),
+        str(buffer[d:e], "utf-8"),
+        _EPOCH + timedelta(0, 0, start),
+        _EPOCH + timedelta(0, 0, end),
+        str(buffer[e:f], "utf-8"),
+    )
+    return event, f
+
+
+def _frame(payload: bytes) -> bytes:
+    return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class PersistentCalendarStore(CalendarStore):
+    """
+    A `CalendarStore` that survives restarts.
+
+    Every write is appended to a write-ahead log (and fsynced, unless `sync`
+    is off) before it is applied in memory. After `snapshot_every` log
+    records, a background thread writes a snapshot of the live events and
+    deletes the log segments it covers, so a restart loads one snapshot
+    through `mmap` and replays at most `snapshot_every` records, however long
+    the store's history is. Events replaced by UID or deleted with their
+    calendar do not survive into the next snapshot. Once recovered, a
+    background thread builds the search indexes of all calendars.
+
+    Files in `data_dir`: `snapshot-<n>.bin` holds every event written before
+    log segment `n`; `wal-<n>.log` are the log segments, replayed in order.
+    A record cut short by a crash at the end of the last segment is
+    discarded; a bad record in an earlier segment fails the start-up instead
+    of replaying later segments past the gap.
+    `LOCK` is held with `flock` while the store is open, so a second process
+    opening the same directory fails instead of interleaving its writes.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        snapshot_every: int = SNAPSHOT_EVERY,
+        sync: bool = True,
+        lock_stripes: int = 256,
+    ):
+        super().__init__(lock_stripes=lock_stripes)
+        self.data_dir = data_dir
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self._wal_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._records_since_snapshot = 0
+        # Appends to the log so far, and how many of them are known to be on disk
+        self._written = self._synced = 0
+        os.makedirs(data_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(data_dir, "LOCK"), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(
+                f"Calendar data directory {data_dir} is in use by another process"
+            ) from None
+
+        started = time.perf_counter()
+        # Cyclic GC passes over millions of fresh objects would dominate the load
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._remove_temp_snapshots()
+            snapshot_events, segment = self._load_latest_snapshot()
+            replayed = 0
+            segments = [
+                seq for seq in self._sequence_numbers(_SEGMENT_RE) if seq >= segment
+            ]
+            sizes = [os.path.getsize(self._segment_path(seq)) for seq in segments]
+            for i, seq in enumerate(segments):
+                # Segments opened by restarts after a torn one stay empty
+                last = not any(sizes[i + 1 :])
+                replayed += self._replay(self._segment_path(seq), last)
+                segment = seq + 1
+        except BaseException:
+            # Let the directory be opened again once the problem is fixed
+            self._lock_file.close()
+            raise
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        self._records_since_snapshot = replayed
+        self._segment = segment
+        self._wal = open(self._segment_path(segment), "ab")
+        self.recovery = {
+            "snapshot_events": snapshot_events,
+            "replayed_records": replayed,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info("Calendar store recovered from %s: %s", data_dir, self.recovery)
+        # The first searches after a restart find their calendars indexed
+        threading.Thread(
+            target=self.build_indexes, name="calendar-index", daemon=True
+        ).start()
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.data_dir, f"wal-{seq:010d}.log")
+
+    def _snapshot_path(self, seq: int) -> str:
+        return os.path.join(self.data_dir, f"snapshot-{seq:010d}.bin")
+
+    def _sequence_numbers(self, pattern: re.Pattern) -> List[int]:
+        return sorted(
+            int(match.group(1))
+            for match in map(pattern.match, os.listdir(self.data_dir))
+            if match
+        )
+
+    def _remove_temp_snapshots(self) -> None:
+        for seq in self._sequence_numbers(_TEMP_SNAPSHOT_RE):
+            path = self._snapshot_path(seq) + ".tmp"
+            logger.warning("Removing %s left by an interrupted snapshot", path)
+            os.remove(path)
+
+    def _load_latest_snapshot(self) -> Tuple[int, int]:
+        """Loads the newest snapshot; returns its event count and first segment."""
+        snapshots = self._sequence_numbers(_SNAPSHOT_RE)
+        if not snapshots:
+            return 0, 0
+        path = self._snapshot_path(snapshots[-1])
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as buffer:
+            body = memoryview(buffer)[: -_CRC.size]
+            try:
+                (crc,) = _CRC.unpack_from(buffer, len(buffer) - _CRC.size)
+                if zlib.crc32(body) != crc:
+                    raise ValueError(f"Calendar snapshot {path} is corrupt")
+                magic, segment, count = _SNAPSHOT_HEADER.unpack_from(buffer)
+                if magic != _SNAPSHOT_MAGIC:
+                    raise ValueError(f"{path} is not a calendar snapshot")
+            finally:
+                body.release()
+            offset = _SNAPSHOT_HEADER.size
+            batch = []
+            for _ in range(count):
+                event, offset = _decode_event(buffer, offset)
+                batch.append(event)
+            self._recover_events(batch)
+        return count, segment
+
+    def _replay(self, path: str, last: bool) -> int:
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = replayed = 0
+        batch: List[CalendarEvent] = []
+        while offset + _RECORD.size <= len(data):
+            length, crc = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            payload = data[start : start + length]
+            # A zero-filled tail has length 0 and a matching CRC
+            if not length or len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            if payload[0] == _OP_ADD:
+                batch.append(_decode_event(payload, 0)[0])
+            elif payload[0] == _OP_DELETE_CALENDAR:
+                self._recover_events(batch)
+                batch = []
+                self._apply_delete(str(payload[_DELETE.size :], "utf-8"))
+            else:
+                break
+            offset = start + length
+            replayed += 1
+        self._recover_events(batch)
+        if offset < len(data) and not last:
+            raise ValueError(
+                f"Calendar log segment {path} is corrupt at byte {offset}, "
+                "and later segments depend on it"
+            )
+        if offset < len(data):
+            logger.warning(
+                "Discarding %d bytes of an incomplete record at the end of %s",
+                len(data) - offset,
+                path,
+            )
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+                os.fsync(f.fileno())
+        return replayed
+
+    def _recover_events(self, events: List[CalendarEvent]) -> None:
+        # Nothing else runs during recovery, so no locks and no logging
+        for calendar_id, batch in self._by_calendar(events).items():
+            self._apply_events(calendar_id, batch)
+
+    def _append(self, records: List[bytes]) -> None:
+        """
+        Appends records to the log and waits until they are on disk.
+
+        Writers of different calendars append concurrently and only wait for
+        the fsync together: whoever syncs first covers every record written
+        before it (group commit), so N concurrent writes cost far fewer than
+        N fsyncs. Callers hold their calendar's lock until this returns.
+        """
+        with self._wal_lock:
+            self._wal.write(b"".join(records))
+            self._written += 1
+            position = self._written
+            self._records_since_snapshot += len(records)
+            if (
+                self._records_since_snapshot >= self.snapshot_every
+                and not self._snapshot_lock.locked()
+            ):
+                threading.Thread(
+                    target=self._snapshot_in_background,
+                    name="calendar-snapshot",
+                    daemon=True,
+                ).start()
+        with self._sync_lock:
+            if self._synced >= position:
+                return
+            with self._wal_lock:
+                self._wal.flush()
+                position = self._written
+            if self.sync:
+                os.fsync(self._wal.fileno())
+            self._synced = position
+
+    def _log_events(self, events: List[CalendarEvent]) -> None:
+        self._append([_frame(_encode_event(event)) for event in events])
+
+    def _log_delete(self, calendar_id: str) -> None:
+        encoded = calendar_id.encode("utf-8")
+        self._append(
+            [_frame(_DELETE.pack(_OP_DELETE_CALENDAR, len(encoded)) + encoded)]
+        )
+
+    def _snapshot_in_background(self) -> None:
+        try:
+            self.snapshot()
+        except Exception as e:
+            # The log segments are kept, so nothing is lost; the next one retries
+            logger.error("Writing a calendar snapshot failed: %s", e)
+
+    def snapshot(self) -> Optional[str]:
+        """
+        Writes a snapshot of the live events and drops the log it replaces.
+
+        Writes only wait while the log is switched to a new segment and the
+        event references are collected, holding every calendar lock so that
+        no write is between its log append and applying it; encoding and
+        writing the snapshot happen outside the locks. Returns the snapshot
+        path, or None if another snapshot is already being written.
+        """
+        if not self._snapshot_lock.acquire(blocking=False):
+            return None
+        try:
+            started = time.perf_counter()
+            with contextlib.ExitStack() as stack:
+                for lock in self._calendar_locks:
+                    stack.enter_context(lock)
+                with self._wal_lock:
+                    self._wal.close()
+                    self._segment += 1
+                    segment = self._segment
+                    self._wal = open(self._segment_path(segment), "ab")
+                    self._records_since_snapshot = 0
+                with self._lock:
+                    events = [
+                        event
+                        for calendar in self._events.values()
+                        for event in calendar.values()
+                    ]
+
+            path = self._snapshot_path(segment)
+            crc = 0
+            with open(path + ".tmp", "wb") as f:
+                header = _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, segment, len(events))
+                f.write(header)
+                crc = zlib.crc32(header, crc)
+                for i in range(0, len(events), 10_000):
+                    chunk = b"".join(map(_encode_event, events[i : i + 10_000]))
+                    f.write(chunk)
+                    crc = zlib.crc32(chunk, crc)
+                f.write(_CRC.pack(crc))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            _fsync_dir(self.data_dir)
+
+            for seq in self._sequence_numbers(_SNAPSHOT_RE):
+                if seq < segment:
+                    os.remove(self._snapshot_path(seq))
+            for seq in self._sequence_numbers(_SEGMENT_RE):
+                if seq < segment:
+                    os.remove(self._segment_path(seq))
+            logger.info(
+                "Wrote calendar snapshot %s with %d events in %.2fs",
+                path,
+                len(events),
+                time.perf_counter() - started,
+            )
+            return path
+        finally:
+            self._snapshot_lock.release()
+
+    def close(self) -> None:
+        with self._wal_lock:
+            self._wal.close()
+        self._lock_file.close()
+
+
+def local_store(name: str) -> CalendarStore:
+    """
+    Returns a store persisted under CALENDAR_DATA_DIR/<name>, or an in-memory
+    store if CALENDAR_DATA_DIR is not set.
+    """
+    if not CALENDAR_DATA_DIR:
+        return CalendarStore()
+    return PersistentCalendarStore(os.path.join(CALENDAR_DATA_DIR, name))
@@ -0,0 +1,282 @@
+import heapq
+import itertools
+import math
+import re
+import sys
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Words left out of the index and of queries ("when is the pixel party?")
+STOPWORDS = frozenset(
+    "a an and are at be by for from how in is it my of on or our the this to "
+    "what when where which who with".split()
+)
+
+# Distinct description words indexed per event; long descriptions are cut here
+MAX_TOKENS_PER_EVENT = 64
+
+# Longer numbers (ticket or sequence numbers) are not indexed, as nearly
+# every one of them would need its own postings list
+MAX_NUMBER_DIGITS = 4
+
+# Matches in the title count this much more than matches in the description
+TITLE_BOOST = 2.0
+
+# Replaced or deleted events an index keeps before it is rebuilt
+COMPACT_MIN_STALE = 1024
+
+# Candidates above which a date range is applied through the month postings
+# instead of checking each candidate's start time
+MONTH_FILTER_MIN = 1000
+
+# A word occurring once is stored as its slot number alone
+Postings = Union[int, array]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of `text` without stop words, in order of appearance."""
+    return [
+        token
+        for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS
+        and (len(token) <= MAX_NUMBER_DIGITS if token.isdigit() else len(token) > 1)
+    ]
+
+
+def _month(moment: datetime) -> int:
+    return moment.year * 12 + moment.month - 1
+
+
+def _first_day(month: int) -> datetime:
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def _post(postings: Dict[Any, Postings], key: Any, slot: int) -> None:
+    slots = postings.get(key)
+    if slots is None:
+        # Words are shared by all calendars' postings instead of copied
+        postings[sys.intern(key) if type(key) is str else key] = slot
+    elif type(slots) is int:
+        postings[key] = array("I", (slots, slot))
+    else:
+        slots.append(slot)
+
+
+def _slots(slots: Optional[Postings]) -> Union[Tuple[int, ...], array]:
+    if slots is None:
+        return ()
+    return (slots,) if type(slots) is int else slots
+
+
+def best_matches(
+    matches: Iterable[Tuple[float, Any]], limit: int
+) -> List[Tuple[float, Any]]:
+    """
+    Returns the `limit` highest scored (score, event) pairs, best first.
+
+    Equal scores are ordered by how close the event is to now, so "when is the
+    party?" finds the next party before last year's.
+    """
+    now = datetime.now()
+    return heapq.nlargest(
+        limit,
+        matches,
+        key=lambda match: (match[0], -abs(match[1].start - now)),
+    )
+
+
+class CalendarIndex:
+    """
+    Inverted index over the titles and descriptions of one calendar's events.
+
+    Every indexed event gets a slot number; postings are append-only arrays of
+    4-byte slots per word, kept separately for titles and descriptions, plus
+    one per month of the start time. Queries narrow down candidates with set
+    operations on slots before looking at any event. Replacing or deleting an
+    event only marks its slot as stale: a slot is live while its event is
+    still the one the calendar holds under that ID, and the index is rebuilt
+    once stale slots outnumber live ones.
+
+    The owning store calls `add` after putting an event into `events`, and
+    `discard` after replacing or removing one, under its write lock.
+    """
+
+    __slots__ = ("events", "docs", "title", "text", "months", "stale")
+
+    def __init__(self, events: Dict[str, Any]):
+        self.events = events
+        self.docs: List[Any] = []
+        self.title: Dict[str, Postings] = {}
+        self.text: Dict[str, Postings] = {}
+        self.months: Dict[int, Postings] = {}
+        self.stale = 0
+
+    @staticmethod
+    def _words(event) -> Tuple[Set[str], Set[str]]:
+        title = set(tokenize(event.title))
+        text = dict.fromkeys(tokenize(event.description))
+        if len(text) > MAX_TOKENS_PER_EVENT:
+            text = itertools.islice(text, MAX_TOKENS_PER_EVENT)
+        return title, set(text).difference(title)
+
+    def add(self, event) -> None:
+        if self.stale > max(COMPACT_MIN_STALE, len(self.events)):
+            # Re-indexes every event of the calendar, this one included
+            self.rebuild()
+            return
+        slot = len(self.docs)
+        self.docs.append(event)
+        title, text = self._words(event)
+        for token in title:
+            _post(self.title, token, slot)
+        for token in text:
+            _post(self.text, token, slot)
+        _post(self.months, _month(event.start), slot)
+
+    def discard(self, event) -> None:
+        self.stale += 1
+
+    def rebuild(self) -> None:
+        self.docs, self.title, self.text, self.months = [], {}, {}, {}
+        self.stale = 0
+        for event in self.events.values():
+            self.add(event)
+
+    def _in_months(self, start: Optional[datetime], end: Optional[datetime]) -> set:
+        first = _month(start) if start else min(self.months)
+        last = _month(end) if end else max(self.months)
+        window = set()
+        for month, slots in self.months.items():
+            if first <= month <= last:
+                window.update(_slots(slots))
+        return window
+
+    def _nearest(self, slots: set, now: datetime) -> Iterator[Tuple[timedelta, set]]:
+        """
+        Yields `slots` by month of their start, nearest month to `now` first,
+        with the least time between `now` and any start in that month.
+        """
+        center = _month(now)
+
+        def gap(month: int) -> timedelta:
+            if month > center:
+                return _first_day(month) - now
+            if month < center:
+                return now - _first_day(month + 1)
+            return timedelta(0)
+
+        for month in sorted(self.months, key=gap):
+            ring = slots.intersection(_slots(self.months[month]))
+            if ring:
+                yield gap(month), ring
+
+    def _resolve(
+        self,
+        slots: Iterable[int],
+        score: float,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        found: Dict[str, Tuple[float, Any]],
+    ) -> List[Any]:
+        """Adds the live events of `slots` in [start, end) to `found`."""
+        added = []
+        for slot in slots:
+            event = self.docs[slot]
+            if self.events.get(event.event_id) is not event:
+                continue  # Replaced or deleted since it was indexed
+            if (start and event.start < start) or (end and event.start >= end):
+                continue
+            found[event.event_id] = (score, event)
+            added.append(event)
+        return added
+
+    def search(
+        self,
+        tokens: Iterable[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 10,
+        max_candidates: int = 50_000,
+    ) -> List[Tuple[float, Any]]:
+        """
+        Returns (score, event) for the events matching `tokens`.
+
+        Events matching every word are preferred; if there are none, events
+        matching any word are scored, rarest words first. Only events starting
+        in [start, end) are returned when either bound is given.
+
+        Candidates are split into tiers of equal score with set operations
+        and only the best tiers are looked at: at least the `limit` best
+        events in the order of `best_matches`, so a common word does not read
+        every event that contains it.
+        """
+        matches = []
+        for token in dict.fromkeys(tokens):
+            title = _slots(self.title.get(token))
+            text = _slots(self.text.get(token))
+            if title or text:
+                matches.append((len(title) + len(text), title, text))
+        if not matches:
+            return []
+        matches.sort(key=lambda match: match[0])
+
+        _, title, text = matches[0]
+        candidates = set(title).union(text)
+        for _, title, text in matches[1:]:
+            if not candidates:
+                break
+            candidates = candidates.intersection(title).union(
+                candidates.intersection(text)
+            )
+        if not candidates and len(matches) > 1:
+            for _, title, text in matches:
+                candidates.update(title, text)
+                if len(candidates) >= max_candidates:
+                    break
+        if (start or end) and len(candidates) > MONTH_FILTER_MIN:
+            candidates &= self._in_months(start, end)
+
+        # Titles and descriptions of an event share no word, so every word
+        # adds its title score, its description score or nothing
+        size = len(self.events)
+        tiers = {0.0: candidates} if candidates else {}
+        for count, title, text in matches:
+            idf = math.log(1.0 + size / count)
+            split: Dict[float, set] = {}
+            for score, slots in tiers.items():
+                in_title = slots.intersection(title)
+                rest = slots.difference(in_title) if in_title else slots
+                in_text = rest.intersection(text)
+                rest = rest.difference(in_text) if in_text else rest
+                for part_score, part in (
+                    (score + idf * TITLE_BOOST, in_title),
+                    (score + idf, in_text),
+                    (score, rest),
+                ):
+                    if part:
+                        split.setdefault(part_score, set()).update(part)
+            tiers = split
+
+        found: Dict[str, Tuple[float, Any]] = {}
+        now = datetime.now()
+        for score in sorted(tiers, reverse=True):
+            if len(found) >= limit:
+                break
+            slots = tiers[score]
+            if len(slots) <= MONTH_FILTER_MIN:
+                self._resolve(slots, score, start, end, found)
+                continue
+            # Equal scores go to the events nearest to now, so months further
+            # out than the nearest `limit` events found so far are skipped
+            needed, nearest = limit - len(found), []
+            for least, ring in self._nearest(slots, now):
+                if len(nearest) >= needed and least > nearest[needed - 1]:
+                    break
+                added = self._resolve(ring, score, start, end, found)
+                nearest = sorted(nearest + [abs(event.start - now) for event in added])[
+                    :needed
+                ]
+        return list(found.values())
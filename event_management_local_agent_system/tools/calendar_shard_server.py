@@ -0,0 +1,162 @@
+import hmac
+import json
+import logging
+import os
+from datetime import datetime
+from urllib.parse import unquote
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from calendar_persistence import local_store
+from calendar_store import CalendarEvent
+from logging_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Directory name of this shard's data under CALENDAR_DATA_DIR
+SHARD_NAME = os.getenv("SHARD_NAME", "shard-" + os.getenv("PORT", "9001"))
+
+# Token the MCP server's RemoteShards send; requests without it are rejected
+SHARD_ADMIN_TOKEN = os.getenv("SHARD_ADMIN_TOKEN", "")
+
+# Interface to listen on; any other than localhost requires SHARD_ADMIN_TOKEN
+SHARD_HOST = os.getenv("SHARD_HOST", "127.0.0.1")
+
+# The events owned by this shard process
+shard_store = local_store(SHARD_NAME)
+
+
+class BearerTokenMiddleware:
+    """Rejects requests without `Authorization: Bearer <token>`, if one is set."""
+
+    def __init__(self, app, token: str):
+        self.app = app
+        self.token = token.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.token:
+            supplied = dict(scope["headers"]).get(b"authorization", b"")
+            if not hmac.compare_digest(supplied.removeprefix(b"Bearer "), self.token):
+                response = JSONResponse(
+                    {"status": "error", "message": "Invalid shard token."},
+                    401,
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+async def add_events(request: Request) -> JSONResponse:
+    events = [CalendarEvent.from_dict(item) for item in await request.json()]
+    # Store calls block on the log's fsync; keep them off the event loop
+    return JSONResponse(
+        {"event_ids": await run_in_threadpool(shard_store.add_events, events)}
+    )
+
+
+def list_calendars(request: Request) -> JSONResponse:
+    return JSONResponse({"calendars": shard_store.calendar_ids()})
+
+
+def get_event(calendar_id: str, event_id: str) -> JSONResponse:
+    event = shard_store.get_event(calendar_id, event_id)
+    if event is None:
+        return _not_found()
+    return JSONResponse(event.to_dict())
+
+
+def iter_events(calendar_id: str) -> StreamingResponse:
+    """Streams a calendar as one JSON event per line."""
+    lines = (
+        json.dumps(event.to_dict()) + "\n"
+        for event in shard_store.iter_events(calendar_id)
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+def delete_calendar(calendar_id: str) -> JSONResponse:
+    deleted = shard_store.delete_calendar(calendar_id)
+    return JSONResponse({"deleted": deleted})
+
+
+def _not_found() -> JSONResponse:
+    return JSONResponse({"status": "error", "message": "Not found"}, 404)
+
+
+def calendar_resource(request: Request):
+    """
+    Serves /calendars/{calendar_id}[/events[/{event_id}]].
+
+    IDs are percent-encoded by `RemoteShard` and may contain '/', so they are
+    split from the raw path rather than matched by the router.
+    """
+    raw_path = request.scope.get("raw_path") or request.url.path.encode()
+    segments = [unquote(part) for part in raw_path.decode("ascii").split("/")[2:]]
+    if request.method == "DELETE" and len(segments) == 1:
+        return delete_calendar(segments[0])
+    if request.method == "GET" and len(segments) == 2 and segments[1] == "events":
+        return iter_events(segments[0])
+    if request.method == "GET" and len(segments) == 3 and segments[1] == "events":
+        return get_event(segments[0], segments[2])
+    return _not_found()
+
+
+async def busy(request: Request) -> JSONResponse:
+    body = await request.json()
+    intervals = await run_in_threadpool(
+        shard_store.busy,
+        body["calendar_ids"],
+        datetime.fromisoformat(body["start"]),
+        datetime.fromisoformat(body["end"]),
+    )
+    return JSONResponse(
+        {
+            calendar_id: [[s.isoformat(), e.isoformat()] for s, e in spans]
+            for calendar_id, spans in intervals.items()
+        }
+    )
+
+
+async def search(request: Request) -> JSONResponse:
+    body = await request.json()
+    matches = await run_in_threadpool(
+        shard_store.search,
+        body["calendar_ids"],
+        body["query"],
+        datetime.fromisoformat(body["start"]) if body.get("start") else None,
+        datetime.fromisoformat(body["end"]) if body.get("end") else None,
+        body.get("limit", 10),
+    )
+    return JSONResponse(
+        {"matches": [{"score": s, "event": e.to_dict()} for s, e in matches]}
+    )
+
+
+app = Starlette(
+    routes=[
+        Route("/events", add_events, methods=["POST"]),
+        Route("/busy", busy, methods=["POST"]),
+        Route("/search", search, methods=["POST"]),
+        Route("/calendars", list_calendars, methods=["GET"]),
+        Route("/calendars/{path:path}", calendar_resource, methods=["GET", "DELETE"]),
+    ],
+    middleware=[Middleware(BearerTokenMiddleware, token=SHARD_ADMIN_TOKEN)],
+)
+
+
+# Each shard runs as its own process, e.g. `PORT=9001 python calendar_shard_server.py`
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 9001))
+    if SHARD_HOST not in ("127.0.0.1", "::1", "localhost") and not SHARD_ADMIN_TOKEN:
+        raise SystemExit(f"Set SHARD_ADMIN_TOKEN to serve a shard on {SHARD_HOST}")
+    logger.info("Starting calendar shard on %s:%d...", SHARD_HOST, port)
+    uvicorn.run(app, host=SHARD_HOST, port=port, log_level="warning")
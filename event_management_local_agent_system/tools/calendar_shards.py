@@ -0,0 +1,476 @@
+import bisect
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from calendar_persistence import CALENDAR_DATA_DIR, local_store
+from calendar_search import best_matches
+from calendar_store import CalendarEvent
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Events copied per request when a calendar moves to another shard
+MIGRATION_BATCH_SIZE = 1000
+
+# File below CALENDAR_DATA_DIR recording shards added while running
+MEMBERSHIP_FILE = "shards.json"
+
+# Bearer token for the /shards admin routes and for shard servers; the admin
+# routes are disabled and shard servers only listen on localhost when unset
+SHARD_ADMIN_TOKEN = os.getenv("SHARD_ADMIN_TOKEN", "")
+
+Interval = Tuple[datetime, datetime]
+Match = Tuple[float, CalendarEvent]
+
+
+class CalendarShard(Protocol):
+    """The subset of the `CalendarStore` API a shard has to provide."""
+
+    def add_events(self, events: Iterable[CalendarEvent]) -> List[str]: ...
+
+    def get_event(self, calendar_id: str, event_id: str) -> Optional[CalendarEvent]: ...
+
+    def iter_events(self, calendar_id: str) -> Iterator[CalendarEvent]: ...
+
+    def count(self, calendar_id: str) -> int: ...
+
+    def calendar_ids(self) -> Dict[str, int]: ...
+
+    def busy(
+        self, calendar_ids: Iterable[str], start: datetime, end: datetime
+    ) -> Dict[str, List[Interval]]: ...
+
+    def search(
+        self,
+        calendar_ids: Iterable[str],
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 10,
+    ) -> List[Match]: ...
+
+    def delete_calendar(self, calendar_id: str) -> int: ...
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to node names.
+
+    Every node is placed at `vnodes` points on the ring, so adding a node only
+    moves about 1/N of the keys, taken evenly from all existing nodes.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 64):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(set(self._owners))
+
+    def add(self, node: str) -> None:
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("The hash ring has no nodes")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(vnodes=self.vnodes)
+        ring._points = list(self._points)
+        ring._owners = list(self._owners)
+        return ring
+
+
+class RemoteShard:
+    """A shard served by a separate `calendar_shard_server.py` process."""
+
+    def __init__(self, url: str, timeout: float = 10.0, token: str = SHARD_ADMIN_TOKEN):
+        self.url = url.rstrip("/")
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        self._client = httpx.Client(base_url=self.url, timeout=timeout, headers=headers)
+
+    @staticmethod
+    def _calendar_path(calendar_id: str) -> str:
+        return f"/calendars/{quote(calendar_id, safe='')}"
+
+    def add_events(self, events: Iterable[CalendarEvent]) -> List[str]:
+        payload = [event.to_dict() for event in events]
+        response = self._client.post("/events", json=payload)
+        response.raise_for_status()
+        return response.json()["event_ids"]
+
+    def get_event(self, calendar_id: str, event_id: str) -> Optional[CalendarEvent]:
+        response = self._client.get(
+            f"{self._calendar_path(calendar_id)}/events/{quote(event_id, safe='')}"
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return CalendarEvent.from_dict(response.json())
+
+    def iter_events(self, calendar_id: str) -> Iterator[CalendarEvent]:
+        path = f"{self._calendar_path(calendar_id)}/events"
+        with self._client.stream("GET", path) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    yield CalendarEvent.from_dict(json.loads(line))
+
+    def count(self, calendar_id: str) -> int:
+        return self.calendar_ids().get(calendar_id, 0)
+
+    def calendar_ids(self) -> Dict[str, int]:
+        response = self._client.get("/calendars")
+        response.raise_for_status()
+        return response.json()["calendars"]
+
+    def busy(
+        self, calendar_ids: Iterable[str], start: datetime, end: datetime
+    ) -> Dict[str, List[Interval]]:
+        response = self._client.post(
+            "/busy",
+            json={
+                "calendar_ids": list(calendar_ids),
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+            },
+        )
+        response.raise_for_status()
+        return {
+            calendar_id: [
+                (datetime.fromisoformat(s), datetime.fromisoformat(e)) for s, e in spans
+            ]
+            for calendar_id, spans in response.json().items()
+        }
+
+    def search(
+        self,
+        calendar_ids: Iterable[str],
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 10,
+    ) -> List[Match]:
+        response = self._client.post(
+            "/search",
+            json={
+                "calendar_ids": list(calendar_ids),
+                "query": query,
+                "start": start.isoformat() if start else None,
+                "end": end.isoformat() if end else None,
+                "limit": limit,
+            },
+        )
+        response.raise_for_status()
+        return [
+            (match["score"], CalendarEvent.from_dict(match["event"]))
+            for match in response.json()["matches"]
+        ]
+
+    def delete_calendar(self, calendar_id: str) -> int:
+        response = self._client.delete(self._calendar_path(calendar_id))
+        response.raise_for_status()
+        return response.json()["deleted"]
+
+
+class ShardedCalendarStore:
+    """
+    Partitions calendars across shards with consistent hashing on the calendar ID.
+
+    It exposes the same API as `CalendarStore`, so the calendar tools do not
+    know whether they talk to one in-process store or to several shard
+    processes. Queries spanning several calendars (free/busy, search) are sent
+    to all involved shards concurrently.
+
+    `add_shard` rebalances online: only the calendars the new shard takes over
+    are copied, each under its own lock, while every other calendar stays
+    readable and writable. Reads of a calendar that is being moved are served
+    by its old shard until the copy is complete.
+
+    With `membership_path`, added shards and the calendars still to be moved
+    are saved there before anything moves, so that a restart routes with the
+    same ring and finishes an interrupted rebalance (`resume_rebalance`).
+    The ring lives in this process only: every instance serving the same
+    shards must run with the same membership, i.e. one instance at a time.
+    """
+
+    def __init__(
+        self,
+        shards: Dict[str, CalendarShard],
+        vnodes: int = 64,
+        max_workers: int = 16,
+        lock_stripes: int = 256,
+        membership_path: Optional[str] = None,
+        added: Iterable[str] = (),
+        moving: Optional[Dict[str, str]] = None,
+    ):
+        if not shards:
+            raise ValueError("At least one shard is required")
+        self._shards: Dict[str, CalendarShard] = dict(shards)
+        self.membership_path = membership_path
+        # Shards added after start-up, on top of the configured ones
+        self._added: List[str] = list(added)
+        self._ring = HashRing(self._shards, vnodes=vnodes)
+        # Calendars still served by their previous shard during a rebalance
+        self._pinned: Dict[str, str] = dict(moving or {})
+        self._rebalance_lock = threading.Lock()
+        self._write_locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="calendar-shard"
+        )
+
+    @property
+    def shard_names(self) -> List[str]:
+        return list(self._shards)
+
+    def shard_name_for(self, calendar_id: str) -> str:
+        pinned = self._pinned.get(calendar_id)
+        return pinned if pinned is not None else self._ring.node_for(calendar_id)
+
+    def _shard_for(self, calendar_id: str) -> CalendarShard:
+        return self._shards[self.shard_name_for(calendar_id)]
+
+    def _write_lock(self, calendar_id: str) -> threading.Lock:
+        return self._write_locks[_hash(calendar_id) % len(self._write_locks)]
+
+    def add_event(self, event: CalendarEvent) -> str:
+        """Adds or replaces a single event and returns its event ID."""
+        return self.add_events([event])[0]
+
+    def add_events(self, events: Iterable[CalendarEvent]) -> List[str]:
+        """Adds a batch of events, sending one request per calendar."""
+        by_calendar: Dict[str, List[CalendarEvent]] = defaultdict(list)
+        for event in events:
+            by_calendar[event.calendar_id].append(event)
+        event_ids = []
+        for calendar_id, batch in by_calendar.items():
+            with self._write_lock(calendar_id):
+                event_ids.extend(self._shard_for(calendar_id).add_events(batch))
+        return event_ids
+
+    def get_event(self, calendar_id: str, event_id: str) -> Optional[CalendarEvent]:
+        return self._shard_for(calendar_id).get_event(calendar_id, event_id)
+
+    def iter_events(self, calendar_id: str) -> Iterator[CalendarEvent]:
+        return self._shard_for(calendar_id).iter_events(calendar_id)
+
+    def count(self, calendar_id: str) -> int:
+        return self._shard_for(calendar_id).count(calendar_id)
+
+    def calendar_ids(self) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        for counts in self._executor.map(
+            lambda shard: shard.calendar_ids(), list(self._shards.values())
+        ):
+            result.update(counts)
+        return result
+
+    def busy(
+        self, calendar_ids: Iterable[str], start: datetime, end: datetime
+    ) -> Dict[str, List[Interval]]:
+        """Fans a free/busy query out to every shard owning one of the calendars."""
+        by_shard: Dict[str, List[str]] = defaultdict(list)
+        for calendar_id in calendar_ids:
+            by_shard[self.shard_name_for(calendar_id)].append(calendar_id)
+        futures = [
+            self._executor.submit(self._shards[name].busy, ids, start, end)
+            for name, ids in by_shard.items()
+        ]
+        result: Dict[str, List[Interval]] = {}
+        for future in futures:
+            result.update(future.result())
+        return result
+
+    def search(
+        self,
+        calendar_ids: Iterable[str],
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 10,
+    ) -> List[Match]:
+        """Searches every shard owning one of the calendars and merges the top hits."""
+        by_shard: Dict[str, List[str]] = defaultdict(list)
+        for calendar_id in calendar_ids:
+            by_shard[self.shard_name_for(calendar_id)].append(calendar_id)
+        futures = [
+            self._executor.submit(
+                self._shards[name].search, ids, query, start, end, limit
+            )
+            for name, ids in by_shard.items()
+        ]
+        return best_matches(
+            (match for future in futures for match in future.result()), limit
+        )
+
+    def delete_calendar(self, calendar_id: str) -> int:
+        with self._write_lock(calendar_id):
+            return self._shard_for(calendar_id).delete_calendar(calendar_id)
+
+    def shard_stats(self) -> Dict[str, Dict[str, int]]:
+        """Returns the number of calendars and events held by each shard."""
+        names = list(self._shards)
+        counts = self._executor.map(
+            lambda name: self._shards[name].calendar_ids(), names
+        )
+        return {
+            name: {"calendars": len(c), "events": sum(c.values())}
+            for name, c in zip(names, counts)
+        }
+
+    def add_shard(self, name: str, shard: CalendarShard) -> Dict[str, int]:
+        """
+        Adds a shard and moves the calendars it now owns onto it.
+
+        New calendars are routed by the new ring as soon as this is called;
+        existing ones keep being served by their old shard until they have
+        been copied. Returns the number of moved calendars and events.
+        """
+        with self._rebalance_lock:
+            if name in self._shards:
+                raise ValueError(f"Shard '{name}' already exists")
+            ring = self._ring.copy()
+            ring.add(name)
+            # Writes pause only while the calendars are listed and the new ring
+            # is installed, so that no calendar is created behind our back
+            with contextlib.ExitStack() as stack:
+                for lock in self._write_locks:
+                    stack.enter_context(lock)
+                moves = [
+                    (calendar_id, shard_name)
+                    for shard_name, calendars in zip(
+                        self._shards,
+                        self._executor.map(
+                            lambda s: s.calendar_ids(), self._shards.values()
+                        ),
+                    )
+                    for calendar_id in calendars
+                    if ring.node_for(calendar_id) == name
+                ]
+                self._shards[name] = shard
+                self._added.append(name)
+                # Pin before switching rings so readers never see an empty shard
+                self._pinned.update(moves)
+                self._ring = ring
+                # Before anything moves, so a restart neither routes with the
+                # old ring nor loses track of calendars left to move
+                self._save_membership()
+            logger.info(
+                "Added shard '%s'; moving %d calendars onto it", name, len(moves)
+            )
+            moved_events = self._finish_moves()
+            logger.info(
+                "Rebalance onto '%s' done: %d calendars, %d events",
+                name,
+                len(moves),
+                moved_events,
+            )
+            return {"moved_calendars": len(moves), "moved_events": moved_events}
+
+    def resume_rebalance(self) -> int:
+        """Moves the calendars a rebalance interrupted by a restart left behind."""
+        with self._rebalance_lock:
+            if not self._pinned:
+                return 0
+            logger.info("Resuming the move of %d calendars", len(self._pinned))
+            return self._finish_moves()
+
+    def _finish_moves(self) -> int:
+        moved_events = 0
+        for calendar_id, old_name in list(self._pinned.items()):
+            with self._write_lock(calendar_id):
+                # Copies are idempotent: events keep their IDs on the new shard
+                new_name = self._ring.node_for(calendar_id)
+                moved_events += self._move(calendar_id, old_name, new_name)
+                self._pinned.pop(calendar_id, None)
+                self._shards[old_name].delete_calendar(calendar_id)
+                self._save_membership()
+        return moved_events
+
+    def _save_membership(self) -> None:
+        if not self.membership_path:
+            return
+        tmp_path = self.membership_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"added": self._added, "moving": self._pinned}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.membership_path)
+
+    def _move(self, calendar_id: str, source: str, target: str) -> int:
+        moved = 0
+        batch: List[CalendarEvent] = []
+        for event in self._shards[source].iter_events(calendar_id):
+            batch.append(event)
+            if len(batch) >= MIGRATION_BATCH_SIZE:
+                moved += len(self._shards[target].add_events(batch))
+                batch = []
+        if batch:
+            moved += len(self._shards[target].add_events(batch))
+        return moved
+
+
+def store_from_env() -> ShardedCalendarStore:
+    """
+    Builds the store from CALENDAR_SHARDS: either a number of in-process shards
+    (default 1) or a comma-separated list of shard server URLs. In-process
+    shards are persisted under CALENDAR_DATA_DIR when it is set, and so are
+    shard servers added while running; without it, membership changes only
+    through CALENDAR_SHARDS.
+    """
+    spec = os.getenv("CALENDAR_SHARDS", "1").strip()
+    if spec.isdigit():
+        shards = {f"local-{i}": local_store(f"local-{i}") for i in range(int(spec))}
+    else:
+        urls = [url.strip() for url in spec.split(",") if url.strip()]
+        shards = {url: RemoteShard(url) for url in urls}
+
+    membership_path, membership = None, {}
+    if CALENDAR_DATA_DIR:
+        os.makedirs(CALENDAR_DATA_DIR, exist_ok=True)
+        membership_path = os.path.join(CALENDAR_DATA_DIR, MEMBERSHIP_FILE)
+        if os.path.exists(membership_path):
+            with open(membership_path, encoding="utf-8") as f:
+                membership = json.load(f)
+    added = [url for url in membership.get("added", []) if url not in shards]
+    shards.update((url, RemoteShard(url)) for url in added)
+    logger.info("Calendar store uses %d shard(s): %s", len(shards), list(shards))
+    sharded = ShardedCalendarStore(
+        shards,
+        membership_path=membership_path,
+        added=added,
+        moving=membership.get("moving"),
+    )
+    sharded.resume_rebalance()
+    return sharded
+
+
+# Process-wide store used by the MCP calendar tools
+store = store_from_env()
@@ -1,14 +1,150 @@
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, List, Optional, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import asyncio
+import contextvars
+import functools
+import hashlib
+import io
 import logging
+import os
+import time as time_module
+
+from calendar_ics import IcsEventParser, iter_ics_chunks, iter_ics_events
+from calendar_shards import ShardedCalendarStore, store
+from calendar_store import DEFAULT_CALENDAR_ID, CalendarEvent, new_event_id
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+logger = logging.getLogger(__name__)
+
+# Number of parsed events inserted into the store per lock acquisition
+IMPORT_BATCH_SIZE = int(os.getenv("CALENDAR_IMPORT_BATCH_SIZE", "1000"))
+
+# Directory that exported .ics files are written to, as '<calendar_id>.ics'
+EXPORT_DIR = os.getenv("CALENDAR_EXPORT_DIR", "exports")
+
+# Most events a single search returns
+MAX_SEARCH_RESULTS = 50
+
+# Characters of each matching event's description included in search results
+SEARCH_DESCRIPTION_CHARS = 200
+
+# Threads that run blocking store calls (disk, shard requests) for the tools
+STORE_IO_WORKERS = int(os.getenv("CALENDAR_STORE_IO_WORKERS", "16"))
+
+_store_io = ThreadPoolExecutor(
+    max_workers=STORE_IO_WORKERS, thread_name_prefix="calendar-store-io"
 )
 
+T = TypeVar("T")
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a blocking store call on the bounded store I/O pool.
+
+    The tools are coroutines on the MCP server's event loop; a store call
+    waiting on fsync or on a shard would otherwise stall every SSE client.
+    The caller's context variables (log context, client ID) go along.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _store_io, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+class EventBatchImporter:
+    """
+    Collects parsed iCalendar events and inserts them into a store in batches.
+
+    Used by both the `import_calendar_events` tool and the streaming HTTP
+    import route, so that throughput is reported the same way for both.
+    """
+
+    def __init__(
+        self,
+        calendar_id: str,
+        target: Optional[ShardedCalendarStore] = None,
+        batch_size: int = IMPORT_BATCH_SIZE,
+    ):
+        self.calendar_id = calendar_id
+        self.target = target or store
+        self.batch_size = batch_size
+        self.imported = 0
+        self._batch: List[CalendarEvent] = []
+        self._started = time_module.perf_counter()
+
+    def _event(self, parsed: Dict[str, Any]) -> CalendarEvent:
+        return CalendarEvent(
+            event_id=new_event_id(),
+            calendar_id=self.calendar_id,
+            title=parsed["title"],
+            description=parsed["description"],
+            start=parsed["start"],
+            end=parsed["end"],
+            uid=parsed["uid"],
+        )
+
+    def add(self, parsed: Dict[str, Any]) -> None:
+        self._batch.append(self._event(parsed))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    async def aadd(self, parsed: Dict[str, Any]) -> None:
+        """Like `add`, but inserts full batches on the store I/O pool."""
+        self._batch.append(self._event(parsed))
+        if len(self._batch) >= self.batch_size:
+            await run_blocking(self.flush)
 
-def create_calendar_event(
-    date: str, time: str, duration_hours: int, title: str, description: str
+    def flush(self) -> None:
+        if self._batch:
+            self.target.add_events(self._batch)
+            self.imported += len(self._batch)
+            self._batch = []
+
+    async def aresult(self, skipped: int = 0) -> Dict[str, Any]:
+        return await run_blocking(self.result, skipped)
+
+    def result(self, skipped: int = 0) -> Dict[str, Any]:
+        self.flush()
+        elapsed = time_module.perf_counter() - self._started
+        events_per_second = self.imported / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            "[MCP Calendar Tool Server] Imported %d events into '%s' (%.0f events/s)",
+            self.imported,
+            self.calendar_id,
+            events_per_second,
+        )
+        return {
+            "status": "success",
+            "calendar_id": self.calendar_id,
+            "imported": self.imported,
+            "skipped": skipped,
+            "elapsed_seconds": round(elapsed, 3),
+            "events_per_second": round(events_per_second, 1),
+            "message": f"Imported {self.imported} events into '{self.calendar_id}'.",
+        }
+
+
+def import_events(
+    lines: Iterable[str], calendar_id: str = DEFAULT_CALENDAR_ID
+) -> Dict[str, Any]:
+    """Parses iCalendar lines and inserts the events in batches."""
+    importer = EventBatchImporter(calendar_id)
+    parser = IcsEventParser()
+    for parsed in iter_ics_events(lines, parser):
+        importer.add(parsed)
+    return importer.result(skipped=parser.skipped)
+
+
+async def create_calendar_event(
+    date: str,
+    time: str,
+    duration_hours: int,
+    title: str,
+    description: str,
+    calendar_id: str = DEFAULT_CALENDAR_ID,
+    event_id: str = "",
 ) -> Dict[str, Any]:
     """
     Creates a new event in the calendar.
@@ -18,16 +154,262 @@ def create_calendar_event(
         duration_hours (int): The duration of the event in hours.
         title (str): The title of the event.
         description (str): A brief description of the event.
+        calendar_id (str): The calendar to add the event to (default 'primary').
+        event_id (str): Optional ID for the event; creating an event with the
+            same ID again replaces it instead of adding another.
     Returns:
         dict: Indicating success or failure of event creation.
     """
-    logging.info(
-        f"[MCP Calendar Tool Server] Creating event: {title} on {date} at {time} for {duration_hours} hours"
+    logger.info(
+        "[MCP Calendar Tool Server] Creating event: %s on %s at %s for %s hours",
+        title,
+        date,
+        time,
+        duration_hours,
+    )
+    try:
+        start = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return {
+            "status": "error",
+            "message": "Invalid date or time. Use 'YYYY-MM-DD' and 'HH:MM'.",
+        }
+    if not event_id:
+        # Stable across processes, so a retried create replaces the same event
+        key = "\0".join((calendar_id, title, date, time)).encode("utf-8")
+        event_id = f"mcp_event_{hashlib.blake2b(key, digest_size=8).hexdigest()}"
+    await run_blocking(
+        store.add_event,
+        CalendarEvent(
+            event_id=event_id,
+            calendar_id=calendar_id,
+            title=title,
+            description=description,
+            start=start,
+            end=start + timedelta(hours=duration_hours),
+        ),
     )
-    event_id = f"mcp_event_{hash(title + date + time)}"
-    logging.info(f"[MCP Calendar Tool Server] Event ID: {event_id}")
+    logger.info("[MCP Calendar Tool Server] Event ID: %s", event_id)
     return {
         "status": "success",
         "event_id": event_id,
         "message": f"Event '{title}' created via MCP.",
     }
+
+
+async def check_calendar_availability(
+    date: str,
+    start_time: str = "09:00",
+    end_time: str = "17:00",
+    calendar_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Checks when one or more calendars are free on a given day.
+    Args:
+        date (str): The day to check (e.g., '2025-07-20').
+        start_time (str): Start of the window to check (default '09:00').
+        end_time (str): End of the window to check (default '17:00').
+        calendar_ids (list[str]): The calendars that must all be free
+            (default ['primary']).
+    Returns:
+        dict: The busy intervals across all calendars and the free slots left.
+    """
+    calendar_ids = calendar_ids or [DEFAULT_CALENDAR_ID]
+    try:
+        window_start = datetime.strptime(f"{date} {start_time}", "%Y-%m-%d %H:%M")
+        window_end = datetime.strptime(f"{date} {end_time}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return {
+            "status": "error",
+            "message": "Invalid date or time. Use 'YYYY-MM-DD' and 'HH:MM'.",
+        }
+    if window_end <= window_start:
+        return {"status": "error", "message": "end_time must be after start_time."}
+
+    busy_by_calendar = await run_blocking(
+        store.busy, calendar_ids, window_start, window_end
+    )
+    intervals = sorted(span for spans in busy_by_calendar.values() for span in spans)
+    busy: List[List[datetime]] = []
+    for start, end in intervals:
+        start, end = max(start, window_start), min(end, window_end)
+        if busy and start <= busy[-1][1]:
+            busy[-1][1] = max(busy[-1][1], end)
+        else:
+            busy.append([start, end])
+
+    free = []
+    cursor = window_start
+    for start, end in busy:
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+
+    logger.info(
+        "[MCP Calendar Tool Server] Checked %d calendars on %s: %d busy, %d free",
+        len(calendar_ids),
+        date,
+        len(busy),
+        len(free),
+    )
+    return {
+        "status": "success",
+        "date": date,
+        "calendar_ids": calendar_ids,
+        "busy": [
+            {"start": s.strftime("%H:%M"), "end": e.strftime("%H:%M")} for s, e in busy
+        ],
+        "free": [
+            {"start": s.strftime("%H:%M"), "end": e.strftime("%H:%M")} for s, e in free
+        ],
+    }
+
+
+async def search_calendar_events(
+    query: str,
+    calendar_ids: Optional[List[str]] = None,
+    start_date: str = "",
+    end_date: str = "",
+    limit: int = 10,
+) -> Dict[str, Any]:
+    """
+    Finds existing events by words in their title or description.
+    Args:
+        query (str): Words to look for (e.g., 'pixel party').
+        calendar_ids (list[str]): The calendars to search (default ['primary']).
+        start_date (str): Only events starting on or after this day
+            (e.g., '2025-07-01'; default no limit).
+        end_date (str): Only events starting on or before this day
+            (e.g., '2025-07-31'; default no limit).
+        limit (int): The maximum number of events to return (default 10).
+    Returns:
+        dict: The matching events with their IDs and times, best match first.
+    """
+    calendar_ids = calendar_ids or [DEFAULT_CALENDAR_ID]
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        end = (
+            datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+            if end_date
+            else None
+        )
+    except ValueError:
+        return {"status": "error", "message": "Invalid date. Use 'YYYY-MM-DD'."}
+    if not query.strip():
+        return {"status": "error", "message": "Provide words to search for."}
+    limit = max(1, min(int(limit), MAX_SEARCH_RESULTS))
+
+    started = time_module.perf_counter()
+    matches = await run_blocking(store.search, calendar_ids, query, start, end, limit)
+    logger.info(
+        "[MCP Calendar Tool Server] Search for '%s' in %d calendars: %d matches in %.1f ms",
+        query,
+        len(calendar_ids),
+        len(matches),
+        (time_module.perf_counter() - started) * 1000,
+    )
+    return {
+        "status": "success",
+        "query": query,
+        "events": [
+            {
+                "event_id": event.event_id,
+                "calendar_id": event.calendar_id,
+                "title": event.title,
+                "description": event.description[:SEARCH_DESCRIPTION_CHARS],
+                "date": event.start.strftime("%Y-%m-%d"),
+                "start_time": event.start.strftime("%H:%M"),
+                "end_time": event.end.strftime("%H:%M"),
+                "score": round(score, 3),
+            }
+            for score, event in matches
+        ],
+        "message": f"Found {len(matches)} matching events.",
+    }
+
+
+async def import_calendar_events(
+    ics_content: str, calendar_id: str = DEFAULT_CALENDAR_ID
+) -> Dict[str, Any]:
+    """
+    Imports events from iCalendar (.ics) data into a calendar.
+    Args:
+        ics_content (str): The .ics file contents.
+        calendar_id (str): The calendar to import into (default 'primary').
+    Returns:
+        dict: The number of imported events and the import throughput.
+    """
+    if not ics_content:
+        return {"status": "error", "message": "ics_content is empty."}
+    return await run_blocking(import_events, io.StringIO(ics_content), calendar_id)
+
+
+def export_path(calendar_id: str) -> Optional[str]:
+    """
+    Returns the file a calendar is exported to, or None if its ID is unsafe.
+
+    Tool arguments come from the model, and so possibly from text injected
+    into an event, so a calendar ID must not lead out of EXPORT_DIR.
+    """
+    if not calendar_id or any(part in calendar_id for part in ("/", "\\", "..", "\0")):
+        return None
+    export_dir = os.path.realpath(EXPORT_DIR)
+    path = os.path.realpath(os.path.join(export_dir, f"{calendar_id}.ics"))
+    if os.path.dirname(path) != export_dir:
+        return None
+    return path
+
+
+async def export_calendar_events(
+    calendar_id: str = DEFAULT_CALENDAR_ID,
+) -> Dict[str, Any]:
+    """
+    Exports all events of a calendar to an iCalendar (.ics) file.
+    Args:
+        calendar_id (str): The calendar to export (default 'primary').
+    Returns:
+        dict: The file path, number of exported events and export throughput.
+    """
+    ics_path = export_path(calendar_id)
+    if ics_path is None:
+        return {"status": "error", "message": f"Invalid calendar ID: {calendar_id!r}"}
+    return await run_blocking(export_events, calendar_id, ics_path)
+
+
+def export_events(calendar_id: str, ics_path: str) -> Dict[str, Any]:
+    """Writes a calendar to an .ics file in chunks."""
+    os.makedirs(os.path.dirname(ics_path) or ".", exist_ok=True)
+    started = time_module.perf_counter()
+    exported = 0
+
+    def counted(events):
+        nonlocal exported
+        for event in events:
+            exported += 1
+            yield event
+
+    with open(ics_path, "w", encoding="utf-8", newline="") as ics_file:
+        for chunk in iter_ics_chunks(
+            counted(store.iter_events(calendar_id)), calendar_name=calendar_id
+        ):
+            ics_file.write(chunk)
+
+    elapsed = time_module.perf_counter() - started
+    events_per_second = exported / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        "[MCP Calendar Tool Server] Exported %d events from '%s' (%.0f events/s)",
+        exported,
+        calendar_id,
+        events_per_second,
+    )
+    return {
+        "status": "success",
+        "calendar_id": calendar_id,
+        "ics_path": ics_path,
+        "exported": exported,
+        "elapsed_seconds": round(elapsed, 3),
+        "events_per_second": round(events_per_second, 1),
+        "message": f"Exported {exported} events from '{calendar_id}' to {ics_path}.",
+    }
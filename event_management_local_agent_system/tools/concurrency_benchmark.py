@@ -0,0 +1,148 @@
+"""
+Many simultaneous clients calling the calendar tools against a persisted store.
+
+Every client creates events in its own calendar and checks its availability
+in a loop, while a probe measures how late the event loop wakes up (the delay
+every other SSE client of the server would see). Three setups are compared:
+
+1. The tools calling the store on the event loop, one store-wide write lock
+   (how the tools used to work).
+2. Async tools with blocking store calls on the store I/O pool, one lock.
+3. Async tools with per-calendar locks, whose log writes share fsyncs.
+
+--fsync-ms adds to every fsync to model a network volume (Cloud Run volume
+mounts take milliseconds per fsync; a local SSD takes well under one).
+
+Usage: python concurrency_benchmark.py [--clients 200] [--duration 5] [--fsync-ms 2]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+import calendar_tools
+from calendar_persistence import PersistentCalendarStore
+from calendar_shards import ShardedCalendarStore
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def on_loop(func, *args, **kwargs):
+    """Runs a store call inline, as the synchronous tools did."""
+    return func(*args, **kwargs)
+
+
+async def run(args: argparse.Namespace, data_dir: str, lock_stripes: int) -> Dict:
+    store = PersistentCalendarStore(data_dir, lock_stripes=lock_stripes)
+    calendar_tools.store = ShardedCalendarStore({"local-0": store})
+    latencies: List[float] = []
+    lags: List[float] = []
+    deadline = time.perf_counter() + args.duration
+
+    async def client(i: int) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            result = await calendar_tools.create_calendar_event(
+                date="2025-07-20",
+                time=f"{9 + len(latencies) % 8:02d}:00",
+                duration_hours=1,
+                title=f"Sync {len(latencies)}",
+                description="Weekly planning",
+                calendar_id=f"user-{i}",
+            )
+            assert result["status"] == "success", result
+            latencies.append(time.perf_counter() - started)
+            await calendar_tools.check_calendar_availability(
+                date="2025-07-20", calendar_ids=[f"user-{i}"]
+            )
+            # Each call is a separate request; let the other clients in
+            await asyncio.sleep(0)
+
+    async def probe() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    fsyncs_before = fsync_calls[0]
+    started = time.perf_counter()
+    await asyncio.gather(probe(), *(client(i) for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    store.close()
+    return {
+        "writes_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags) * 1000 if lags else 0.0,
+        "writes_per_fsync": len(latencies) / max(1, fsync_calls[0] - fsyncs_before),
+    }
+
+
+fsync_calls = [0]
+
+
+def main(args: argparse.Namespace) -> None:
+    real_fsync = os.fsync
+
+    def fsync(fd: int) -> None:
+        real_fsync(fd)
+        fsync_calls[0] += 1
+        time.sleep(args.fsync_ms / 1000)
+
+    os.fsync = fsync
+    blocking = calendar_tools.run_blocking
+    root = tempfile.mkdtemp(prefix="calendar_concurrency_")
+    print(
+        f"{args.clients} clients for {args.duration:.0f}s, "
+        f"{args.fsync_ms:g} ms per fsync, {calendar_tools.STORE_IO_WORKERS} I/O threads"
+    )
+    print(
+        f"{'':<34}{'writes/s':>9}{'p50':>9}{'p99':>9}"
+        f"{'loop lag p99':>14}{'max':>9}{'writes/fsync':>14}"
+    )
+    results = {}
+    try:
+        for label, runner, stripes in (
+            ("store calls on the event loop", on_loop, 1),
+            ("async tools, one store lock", blocking, 1),
+            ("async tools, per-calendar locks", blocking, 256),
+        ):
+            calendar_tools.run_blocking = runner
+            data_dir = os.path.join(root, f"{len(results)}")
+            r = results[label] = asyncio.run(run(args, data_dir, stripes))
+            print(
+                f"{label:<34}{r['writes_per_s']:>9.0f}{r['p50_ms']:>7.1f}ms"
+                f"{r['p99_ms']:>7.1f}ms{r['lag_p99_ms']:>12.1f}ms"
+                f"{r['lag_max_ms']:>7.1f}ms{r['writes_per_fsync']:>14.1f}"
+            )
+    finally:
+        calendar_tools.run_blocking = blocking
+        os.fsync = real_fsync
+        shutil.rmtree(root)
+
+    before = results["store calls on the event loop"]
+    after = results["async tools, per-calendar locks"]
+    assert after["lag_p99_ms"] < before["lag_p99_ms"] / 2, "the loop still stalls"
+    assert after["writes_per_s"] > before["writes_per_s"] * 2, "no more throughput"
+    print(
+        f"\nOK: {after['writes_per_s'] / before['writes_per_s']:.1f}x the writes, "
+        f"event loop lag p99 {before['lag_p99_ms']:.0f} -> {after['lag_p99_ms']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--fsync-ms", type=float, default=2.0)
+    main(parser.parse_args())
@@ -0,0 +1,315 @@
+"""
+Shared logging setup for the agents and the calendar MCP servers.
+
+This file is kept byte-identical in three places because each is packaged and
+deployed on its own and cannot import from the others:
+
+- event_management_local_agent_system/tools/ (the local agents import it as
+  `tools.logging_config`; the MCP server's Docker image copies it),
+- event_management_remote_agent_system/src/tools/ (uploaded with the remote
+  agent to Agent Engine, and the remote MCP server's Docker image),
+- event_management_remote_agent_system/ (the deploy and client scripts).
+
+Change all three together; `python check_shared_files.py` in the repository
+root fails while the copies differ.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+# Context shared by every record logged from the current task/thread
+session_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "session_id", default=None
+)
+agent_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "agent_id", default=None
+)
+
+# Logging cost of the current turn or request, see `track_logging_cost`
+_cost_var: contextvars.ContextVar[Optional["LoggingCost"]] = contextvars.ContextVar(
+    "logging_cost", default=None
+)
+
+# Suffix of the loggers used for high-volume, sampled event logs
+EVENT_LOGGER_SUFFIX = "events"
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "session_id",
+    "agent_id",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+# Renders tracebacks before records are queued
+_exception_formatter = logging.Formatter()
+
+
+class LoggingStats:
+    """
+    Counters describing the cost of logging on the calling threads.
+
+    `caller_ns` is the time spent inside the queue handler, so the difference
+    between two snapshots is the logging overhead of the code in between.
+    Every thread that logs updates them, so updates take a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.caller_ns = 0
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def add_caller_ns(self, elapsed: int, cost: Optional["LoggingCost"]) -> None:
+        with self._lock:
+            self.caller_ns += elapsed
+            if cost is not None:
+                # Tasks and threads started inside a tracked block share its cost
+                cost.caller_ns += elapsed
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "sampled_out": self.sampled_out,
+                "caller_ns": self.caller_ns,
+            }
+
+
+stats = LoggingStats()
+
+
+class LoggingCost:
+    """Time spent inside the queue handler by the code of one tracked block."""
+
+    __slots__ = ("caller_ns",)
+
+    def __init__(self):
+        self.caller_ns = 0
+
+
+class ContextFilter(logging.Filter):
+    """Attaches the current session and agent IDs to each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "session_id", None) is None:
+            record.session_id = session_id_var.get()
+        if getattr(record, "agent_id", None) is None:
+            record.agent_id = agent_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps roughly `rate` of the records reaching it; warnings always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        if self.rate > 0.0 and random.random() < self.rate:
+            return True
+        stats.add("sampled_out")
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Renders records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+            + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("session_id", "agent_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                payload[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the background listener without blocking.
+
+    Like `QueueHandler.prepare`, the message and any traceback are rendered
+    on the calling thread, so arguments changed after the call cannot alter
+    the record and tracebacks do not keep frames alive in the queue; the
+    writer thread only lays the record out and writes it. When the queue is
+    full the record is dropped rather than blocking the event loop.
+    """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        start = time.perf_counter_ns()
+        try:
+            return super().handle(record)
+        finally:
+            stats.add_caller_ns(time.perf_counter_ns() - start, _cost_var.get())
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            stats.add("enqueued")
+        except queue.Full:
+            stats.add("dropped")
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    event_sample_rate: Optional[float] = None,
+    queue_size: int = 10000,
+) -> None:
+    """
+    Configures the root logger once per process.
+
+    Records go through a bounded queue to a single writer thread that formats
+    and emits them. Settings default to the LOG_LEVEL, LOG_FORMAT ('json' or
+    'text') and LOG_EVENT_SAMPLE_RATE environment variables.
+
+    Args:
+        level (str): Minimum level for the root logger (e.g., 'INFO').
+        fmt (str): 'json' for structured output, 'text' for human-readable lines.
+        event_sample_rate (float): Fraction of event-logger records to keep.
+        queue_size (int): Maximum number of records buffered for the writer.
+    """
+    global _listener
+    with _setup_lock:
+        root = logging.getLogger()
+        if any(getattr(h, "_shared_queue_handler", False) for h in root.handlers):
+            return
+
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+        if event_sample_rate is None:
+            event_sample_rate = float(os.getenv("LOG_EVENT_SAMPLE_RATE", "0.1"))
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        if fmt == "json":
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(
+                logging.Formatter(
+                    "%(asctime)s [%(levelname)s] %(name)s "
+                    "(session=%(session_id)s agent=%(agent_id)s): %(message)s"
+                )
+            )
+
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(queue_size)
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        queue_handler._shared_queue_handler = True
+
+        # Replace any handlers installed by earlier basicConfig calls
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        _event_filter.rate = event_sample_rate
+
+
+def shutdown_logging() -> None:
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+_event_filter = SamplingFilter(rate=1.0)
+
+
+def get_event_logger(name: str) -> logging.Logger:
+    """
+    Returns the sampled logger for high-volume event records of `name`.
+
+    Records logged under '<name>.events' below WARNING are sampled before they
+    are queued, so only a fraction of them ever reaches the writer thread.
+    """
+    logger = logging.getLogger(f"{name}.{EVENT_LOGGER_SUFFIX}")
+    if _event_filter not in logger.filters:
+        logger.addFilter(_event_filter)
+    return logger
+
+
+@contextlib.contextmanager
+def log_context(
+    session_id: Optional[str] = None, agent_id: Optional[str] = None
+) -> Iterator[None]:
+    """Tags all records logged inside the block with the given IDs."""
+    session_token = session_id_var.set(session_id)
+    agent_token = agent_id_var.set(agent_id)
+    try:
+        yield
+    finally:
+        session_id_var.reset(session_token)
+        agent_id_var.reset(agent_token)
+
+
+@contextlib.contextmanager
+def track_logging_cost() -> Iterator[LoggingCost]:
+    """
+    Measures the logging overhead of the code inside the block.
+
+    Unlike differences of `stats.caller_ns`, concurrent turns do not count
+    each other's logging: the cost follows the context, including the tasks
+    the block starts.
+    """
+    cost = LoggingCost()
+    token = _cost_var.set(cost)
+    try:
+        yield cost
+    finally:
+        _cost_var.reset(token)
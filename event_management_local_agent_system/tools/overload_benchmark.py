@@ -0,0 +1,143 @@
+"""
+Local overload test for the calendar server's admission control.
+
+Drives a simulated tool (fixed service time, limited workers) with an open-loop
+arrival rate above its capacity, once with an unbounded queue and once through
+`AdmissionController`, and prints latency percentiles and the shed ratio.
+
+Usage: python overload_benchmark.py [--overload 2.0] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from admission_control import AdmissionController, current_client
+from fastmcp.exceptions import ToolError
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(
+    admission: AdmissionController | None,
+    workers: int,
+    service_time: float,
+    rate: float,
+    duration: float,
+    clients: int,
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(workers)
+
+    async def tool() -> None:
+        async with semaphore:
+            await asyncio.sleep(service_time)
+
+    handler = admission.guard(tool) if admission else tool
+    latencies: Dict[str, List[float]] = {"noisy": [], "others": []}
+    shed = 0
+
+    async def call(client: str) -> None:
+        nonlocal shed
+        current_client.set(client)
+        started = time.perf_counter()
+        try:
+            await handler()
+        except ToolError:
+            shed += 1
+            return
+        kind = "noisy" if client == "noisy" else "others"
+        latencies[kind].append(time.perf_counter() - started)
+
+    tasks = []
+    now = time.perf_counter()
+    deadline = now + duration
+    next_arrival = now
+    while now < deadline:
+        # Launch every arrival that is due; sleeping per request cannot keep up
+        while next_arrival <= now:
+            # Half of the traffic comes from a single noisy client
+            client = (
+                "noisy"
+                if random.random() < 0.5
+                else f"client-{random.randrange(clients)}"
+            )
+            tasks.append(asyncio.create_task(call(client)))
+            next_arrival += random.expovariate(rate)
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+    await asyncio.gather(*tasks)
+
+    everyone = latencies["noisy"] + latencies["others"]
+    return {
+        "requests": len(tasks),
+        "shed_ratio": shed / len(tasks),
+        "p50_ms": percentile(everyone, 50) * 1000,
+        "p99_ms": percentile(everyone, 99) * 1000,
+        "p99_others_ms": percentile(latencies["others"], 99) * 1000,
+        "mean_ms": statistics.fmean(everyone) * 1000 if everyone else 0.0,
+    }
+
+
+def report(label: str, result: Dict[str, float]) -> None:
+    print(
+        f"{label:<18} requests={result['requests']:<6} "
+        f"shed={result['shed_ratio']:6.1%}  p50={result['p50_ms']:8.1f} ms  "
+        f"p99={result['p99_ms']:8.1f} ms  mean={result['mean_ms']:8.1f} ms  "
+        f"p99 (other clients)={result['p99_others_ms']:8.1f} ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    capacity = args.workers / args.service_time
+    rate = capacity * args.overload
+    print(
+        f"Capacity {capacity:.0f} req/s, offered load {rate:.0f} req/s "
+        f"for {args.duration:.0f}s"
+    )
+
+    unbounded = await run(
+        None, args.workers, args.service_time, rate, args.duration, args.clients
+    )
+    report("no admission", unbounded)
+
+    admission = AdmissionController(
+        max_concurrent=args.workers,
+        max_queue=args.max_queue,
+        max_per_client=args.max_per_client,
+        queue_timeout=args.queue_timeout,
+    )
+    bounded = await run(
+        admission, args.workers, args.service_time, rate, args.duration, args.clients
+    )
+    report("admission control", bounded)
+
+    # Well-behaved clients wait behind at most max_queue calls; the noisy client
+    # is served round-robin with the others, so only its own tail grows
+    bound_ms = (args.max_queue / capacity + args.service_time) * 1000 * 3
+    assert bounded["p99_others_ms"] <= bound_ms, (
+        f"p99 {bounded['p99_others_ms']:.1f} ms exceeds the expected bound "
+        f"of {bound_ms:.1f} ms"
+    )
+    assert bounded["p99_ms"] <= args.queue_timeout * 1000 + bound_ms
+    print(f"OK: p99 for well-behaved clients is within {bound_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--service-time", type=float, default=0.02)
+    parser.add_argument("--overload", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--max-per-client", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,157 @@
+"""
+Measures the calendar store's memory per event and its restart time.
+
+1. RAM per event: loads --events events into a `CalendarStore` and measures
+   the allocated bytes per event with tracemalloc, next to the same events
+   as a `__dict__`-backed dataclass (the previous representation).
+2. Restart time: writes the same live events with a growing history of
+   replacements (re-imports with the same UID) and reopens the store, once
+   with snapshots and once replaying the whole write-ahead log.
+3. Crash safety: reopens a log whose last record was cut short, removes
+   the temporary file of an interrupted snapshot, and refuses a log with a
+   bad record before later segments.
+
+Usage: python persistence_benchmark.py [--events 100000]
+"""
+
+import argparse
+import dataclasses
+import gc
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from calendar_persistence import PersistentCalendarStore
+from calendar_store import CalendarEvent, CalendarStore
+
+# Documented in the README; a typical tool-created event (26-character ID,
+# ~20-character title, ~60-character description, no UID) stays below this
+BYTES_PER_EVENT_BUDGET = 480
+
+DictCalendarEvent = dataclasses.make_dataclass(
+    "DictCalendarEvent",
+    [
+        (f.name, f.type, dataclasses.field(default=f.default))
+        for f in dataclasses.fields(CalendarEvent)
+    ],
+)
+
+
+def make_events(
+    count: int, revision: int = 0, event_type=CalendarEvent, first: int = 0
+) -> list:
+    day = datetime(2025, 7, 20, 8, 0)
+    return [
+        event_type(
+            event_id=f"mcp_event_{i:016x}",
+            calendar_id=f"user-{i % 1000}",
+            title=f"Team sync #{i} (rev {revision})",
+            description=f"Weekly planning for project {i % 97}, room {i % 13}, bring notes.",
+            start=day + timedelta(minutes=30 * (i % 500)),
+            end=day + timedelta(minutes=30 * (i % 500) + 25),
+            uid=f"uid-{i}@bench" if revision else "",
+        )
+        for i in range(first, first + count)
+    ]
+
+
+def bytes_per_event(count: int, event_type) -> float:
+    gc.collect()
+    tracemalloc.start()
+    store = CalendarStore()
+    for i in range(0, count, 10_000):
+        batch = make_events(min(10_000, count - i), event_type=event_type, first=i)
+        store.add_events(batch)
+        del batch
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return used / count
+
+
+def write_history(data_dir: str, events: int, history: int, snapshot_every: int):
+    store = PersistentCalendarStore(data_dir, snapshot_every=snapshot_every, sync=False)
+    for revision in range(1, history + 1):
+        batch = make_events(events, revision)
+        for i in range(0, events, 10_000):
+            store.add_events(batch[i : i + 10_000])
+    while store._snapshot_lock.locked():
+        time.sleep(0.01)
+    store.close()
+
+
+def restart(data_dir: str, snapshot_every: int) -> dict:
+    started = time.perf_counter()
+    store = PersistentCalendarStore(data_dir, snapshot_every=snapshot_every)
+    elapsed = time.perf_counter() - started
+    live = sum(store.calendar_ids().values())
+    store.close()
+    return {"seconds": elapsed, "live_events": live, **store.recovery}
+
+
+def main(args: argparse.Namespace) -> None:
+    slotted = bytes_per_event(args.events, CalendarEvent)
+    with_dict = bytes_per_event(args.events, DictCalendarEvent)
+    print(
+        f"RAM per event: {slotted:.0f} bytes with __slots__, "
+        f"{with_dict:.0f} bytes with __dict__ ({args.events} events)"
+    )
+    assert slotted <= BYTES_PER_EVENT_BUDGET, f"{slotted:.0f} bytes per event"
+
+    root = tempfile.mkdtemp(prefix="calendar_persistence_")
+    try:
+        print(f"\nRestart with {args.events} live events:")
+        print(f"{'history':>10}{'snapshot+WAL':>16}{'WAL only':>12}")
+        for history in args.history:
+            times = []
+            for snapshot_every in (args.events, 10**12):
+                data_dir = os.path.join(root, f"h{history}_{snapshot_every}")
+                write_history(data_dir, args.events, history, snapshot_every)
+                result = restart(data_dir, snapshot_every)
+                assert result["live_events"] == args.events, result
+                if snapshot_every == args.events:
+                    assert result["replayed_records"] <= snapshot_every, result
+                times.append(result["seconds"])
+            print(f"{history * args.events:>10}{times[0]:>15.2f}s{times[1]:>11.2f}s")
+
+        data_dir = os.path.join(root, "torn")
+        store = PersistentCalendarStore(data_dir)
+        store.add_events(make_events(1000, revision=1))
+        store.close()
+        with open(store._segment_path(store._segment), "ab") as f:
+            f.write(b"\x80\x00\x00\x00garbage")
+        result = restart(data_dir, 10**12)
+        assert result["live_events"] == 1000, result
+        assert os.path.getsize(store._segment_path(store._segment)) > 0
+        print("\nOK: a log with a torn last record reopens with all committed events")
+
+        open(store._snapshot_path(99) + ".tmp", "wb").close()
+        restart(data_dir, 10**12)
+        assert not any(name.endswith(".tmp") for name in os.listdir(data_dir))
+        print("OK: an interrupted snapshot's temporary file is removed at start-up")
+
+        store = PersistentCalendarStore(data_dir)
+        store.add_events(make_events(10, revision=2))
+        store.close()
+        with open(store._segment_path(0), "r+b") as f:
+            f.seek(100)
+            f.write(b"garbage")
+        try:
+            restart(data_dir, 10**12)
+        except ValueError as e:
+            print(f"OK: a bad record before later segments fails the start-up: {e}")
+        else:
+            raise AssertionError("a corrupt segment was replayed past")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--history", type=int, nargs="+", default=[1, 5, 10])
+    main(parser.parse_args())
@@ -0,0 +1,200 @@
+"""
+Measures `search_calendar_events` lookups against a store with millions of events.
+
+1. Loads --events events spread over --calendars calendars, plus one large
+   calendar of --large-calendar events (a bulk .ics import), then measures
+   the first search of every calendar, which builds its index: the time per
+   event, the memory the indexes take, and how long writes to the large
+   calendar wait while it is indexed.
+2. Times typical queries (a rare phrase, a common word in the large calendar,
+   a date range, a miss) against scanning the calendar, and checks that both
+   find the same events, and that the top 10 are the best of all matches.
+3. Checks that replacing, re-importing and deleting events updates the index.
+
+Usage: python search_benchmark.py [--events 1000000]
+"""
+
+import argparse
+import gc
+import statistics
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from calendar_search import best_matches, tokenize
+from calendar_store import CalendarEvent, CalendarStore
+
+THEMES = (
+    "pixel space dinosaur pirate unicorn jungle superhero robot mermaid wizard "
+    "safari circus rainbow galaxy princess ninja volcano arctic carnival garden"
+).split()
+KINDS = "party sync review dinner workshop standup offsite lunch retro demo".split()
+PLACES = "room kitchen park rooftop library studio garage lounge".split()
+
+
+def make_event(i: int, calendar_id: str) -> CalendarEvent:
+    theme, kind = THEMES[i % len(THEMES)], KINDS[(i // 7) % len(KINDS)]
+    start = datetime(2024, 1, 1, 8) + timedelta(hours=13 * i % (24 * 730))
+    return CalendarEvent(
+        event_id=f"mcp_event_{i:016x}",
+        calendar_id=calendar_id,
+        title=f"{theme.title()} {kind} #{i}",
+        description=f"A {theme} themed {kind} in the {PLACES[i % len(PLACES)]}, "
+        f"bring snacks for {i % 40 + 2} people.",
+        start=start,
+        end=start + timedelta(hours=2),
+    )
+
+
+def load(store: CalendarStore, args: argparse.Namespace) -> None:
+    batch = []
+    for i in range(args.events + args.large_calendar):
+        calendar_id = f"user-{i % args.calendars}" if i < args.events else "imported"
+        batch.append(make_event(i, calendar_id))
+        if len(batch) == 10_000:
+            store.add_events(batch)
+            batch = []
+    store.add_events(batch)
+
+
+def scan(store: CalendarStore, calendar_ids, query: str, start, end) -> set:
+    """
+    The events `search` should find, by reading every event: per calendar,
+    those with all words of the query, or with any of them if none has all.
+    """
+    tokens = set(tokenize(query))
+    found = set()
+    for calendar_id in calendar_ids:
+        matching = {token: set() for token in tokens}
+        for event in store.iter_events(calendar_id):
+            if (start and event.start < start) or (end and event.start >= end):
+                continue
+            words = set(tokenize(event.title)) | set(tokenize(event.description))
+            for token in tokens & words:
+                matching[token].add(event.event_id)
+        every = set.intersection(*matching.values()) if matching else set()
+        found |= every or set().union(*matching.values())
+    return found
+
+
+def latency_ms(search, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = search()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), results
+
+
+def main(args: argparse.Namespace) -> None:
+    total = args.events + args.large_calendar
+    store = CalendarStore()
+    gc.disable()
+    started = time.perf_counter()
+    load(store, args)
+    print(f"Loaded {total} events in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    first_search = threading.Thread(target=store.search, args=(["imported"], "party"))
+    first_search.start()
+    writes = []
+    while first_search.is_alive():
+        event = make_event(total + len(writes), "imported")
+        event.title = "Karaoke night"
+        write_started = time.perf_counter()
+        store.add_event(event)
+        writes.append((time.perf_counter() - write_started) * 1000)
+        time.sleep(0.01)
+    first_search.join()
+    elapsed = time.perf_counter() - started
+    print(
+        f"First search of the {args.large_calendar}-event calendar: {elapsed:.2f}s "
+        f"({elapsed / args.large_calendar * 1e6:.1f} us per event to index)"
+    )
+    print(f"{len(writes)} writes to it meanwhile took at most {max(writes):.1f} ms")
+    assert len(store.search(["imported"], "karaoke", limit=total)) == len(writes)
+    tracemalloc.start()
+    for i in range(args.calendars):
+        store.search([f"user-{i}"], "party")
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Keep collections of the loaded events out of the query timings
+    gc.freeze()
+    gc.enable()
+    print(
+        f"The indexes of the other calendars take {used / args.events:.0f} bytes per event"
+    )
+
+    july = (datetime(2025, 7, 1), datetime(2025, 8, 1))
+    queries = [
+        ("'pixel party' in one user's calendar", ["user-42"], "pixel party", None),
+        ("'party' in the large calendar", ["imported"], "party", None),
+        ("'space' in July in the large calendar", ["imported"], "space", july),
+        (
+            "'pixel party' across 20 calendars",
+            [f"user-{i}" for i in range(20)],
+            "pixel party",
+            None,
+        ),
+        ("a miss in the large calendar", ["imported"], "karaoke", None),
+    ]
+    print(f"\n{'query':<42}{'indexed p50/max':>18}{'scan':>10}")
+    for label, calendar_ids, query, window in queries:
+        start, end = window or (None, None)
+        p50, worst, _ = latency_ms(
+            lambda: store.search(calendar_ids, query, start, end), args.repeat
+        )
+        scan_ms, _, expected = latency_ms(
+            lambda: scan(store, calendar_ids, query, start, end), 1
+        )
+        found = store.search(calendar_ids, query, start, end, limit=total)
+        assert {event.event_id for _, event in found} == expected, label
+        now = datetime.now()
+        best = [
+            (score, abs(event.start - now))
+            for score, event in store.search(calendar_ids, query, start, end)
+        ]
+        assert best == [
+            (score, abs(event.start - now)) for score, event in best_matches(found, 10)
+        ], label
+        print(f"{label:<42}{p50:>9.2f}/{worst:<6.2f}ms{scan_ms:>8.0f}ms")
+        assert p50 < args.budget_ms, f"{label}: {p50:.1f} ms"
+
+    # The index follows replacements, UID re-imports and deletions
+    store = CalendarStore()
+    event = make_event(0, "check")
+    store.add_event(event)
+    assert store.search(["check"], "pixel party")
+    store.add_event(
+        CalendarEvent(
+            event.event_id, "check", "Karaoke night", "", event.start, event.end
+        )
+    )
+    assert not store.search(["check"], "pixel") and store.search(["check"], "karaoke")
+    for revision in ("Pirate brunch", "Robot brunch"):
+        store.add_event(
+            CalendarEvent(
+                f"ics_{revision}",
+                "check",
+                revision,
+                "",
+                event.start,
+                event.end,
+                uid="uid-1@ics",
+            )
+        )
+    assert [e.title for _, e in store.search(["check"], "brunch")] == ["Robot brunch"]
+    store.delete_calendar("check")
+    assert not store.search(["check"], "karaoke")
+    print("\nOK: replacements, re-imports and deletions are reflected in the index")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--calendars", type=int, default=10_000)
+    parser.add_argument("--large-calendar", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    main(parser.parse_args())
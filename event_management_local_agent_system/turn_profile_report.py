@@ -0,0 +1,20 @@
+"""
+Aggregates the turns profiled by `TurnProfiler` into a hot-function report.
+
+Reads every `.prof` and `.tracemalloc` file in the directory (TURN_PROFILE_DIR
+by default) and prints, per profiled turn: the time by package, the hottest
+functions by their own time and the allocation sites still alive at the end.
+
+Usage: python turn_profile_report.py [DIR] [--top 25]
+"""
+
+import argparse
+
+from serving.turn_profiler import TURN_PROFILE_DIR, report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("profile_dir", nargs="?", default=TURN_PROFILE_DIR)
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    print(report(args.profile_dir, args.top))
@@ -0,0 +1,121 @@
+"""
+Measures what the per-turn profiling hook costs and shows the report it makes.
+
+Runs the same concurrent conversations through `interact()` three times, with
+stub models (see specialist_output_benchmark.py) so that only the Python-side
+work of the Runner, the AgentTool wrapping and event processing is left:
+
+1. profiling off (TURN_PROFILE_DIR unset, the default),
+2. --sample-rate of the turns profiled,
+3. every turn profiled, to show what a sampled turn itself costs,
+
+then prints the aggregated hot-function report of the profiled turns.
+
+Usage: python turn_profiling_benchmark.py [--turns 400] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import timeit
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+import conversation
+from serving.turn_profiler import TurnProfiler, report
+from specialist_output_benchmark import QUERIES, build_organizer
+from tools.logging_config import setup_logging
+
+
+async def run(agent_module, profiler: TurnProfiler, args: argparse.Namespace) -> dict:
+    agent_module.turn_profiler = profiler
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=build_organizer(bounded=True, live=False),
+        app_name="TurnProfilingBenchmark",
+        session_service=session_service,
+    )
+    latencies = []
+    turns = iter(range(args.turns))
+
+    async def client(i: int) -> None:
+        for turn in turns:
+            started = time.perf_counter()
+            await agent_module.interact(
+                app_name="TurnProfilingBenchmark",
+                user_id=f"user-{i}",
+                session_id=f"session-{i}-{turn // 6}",
+                query=QUERIES[turn % len(QUERIES)],
+                session_service=session_service,
+                runner=runner,
+                raise_errors=True,
+            )
+            latencies.append(time.perf_counter() - started)
+
+    started, cpu = time.perf_counter(), time.process_time()
+    # interact() echoes every query to stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(client(i) for i in range(args.concurrency)))
+    elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu
+    profiler.flush()
+    return {
+        "turns_per_s": len(latencies) / elapsed,
+        "cpu_ms": cpu / len(latencies) * 1000,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "profiled": profiler.profiled,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    setup_logging()
+    workdir = tempfile.mkdtemp(prefix="turn_profiles_")
+    try:
+        print(
+            f"{args.turns} turns, {args.concurrency} concurrent sessions, stub models"
+        )
+        print(f"{'':<30}{'turns/s':>9}{'CPU/turn':>11}{'p50':>10}{'profiled':>10}")
+        results = {}
+        for label, directory, rate in (
+            ("profiling off", "", 0.0),
+            (f"{args.sample_rate:.0%} of turns profiled", "sampled", args.sample_rate),
+            ("every turn profiled", "all", 1.0),
+        ):
+            profile_dir = os.path.join(workdir, directory) if directory else ""
+            profiler = TurnProfiler(profile_dir, rate, min_interval=0.0)
+            r = results[directory] = await run(conversation, profiler, args)
+            print(
+                f"{label:<30}{r['turns_per_s']:>9.1f}{r['cpu_ms']:>9.2f}ms"
+                f"{r['p50_ms']:>8.1f}ms{r['profiled']:>10}"
+            )
+
+        off = TurnProfiler("", 0.0, min_interval=0.0)
+        off_ns = timeit.timeit(lambda: off.turn("s", "a"), number=100_000) * 1e4
+        share = off_ns / (results[""]["cpu_ms"] * 1e6)
+        print(
+            f"\nThe hook costs {off_ns:.0f} ns per turn when off, "
+            f"{share:.4%} of a turn's CPU time"
+        )
+        assert share < 0.001, "the hook is not negligible when off"
+        assert results["all"]["profiled"] == args.turns
+
+        print("\nReport of the sampled turns (python turn_profile_report.py DIR):\n")
+        print(report(os.path.join(workdir, "sampled"), top=args.top))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sample-rate", type=float, default=0.05)
+    parser.add_argument("--top", type=int, default=15)
+    asyncio.run(main(parser.parse_args()))
@@ -4,16 +4,15 @@ import uuid
 from dotenv import load_dotenv
 import vertexai
 from vertexai import agent_engines
+from logging_config import get_event_logger, log_context, setup_logging
 
 # Configuration
 load_dotenv(".env")
 
-# Set up basic logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+# Set up logging
+setup_logging()
 logger = logging.getLogger(__name__)
+event_logger = get_event_logger(__name__)
 
 GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
 GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
@@ -42,12 +41,14 @@ def get_text_from_final_response(events) -> str:
 # Main
 def main():
     logger.info(
-        f"Initializing Vertex AI for project '{GOOGLE_CLOUD_PROJECT}' in '{GOOGLE_CLOUD_LOCATION}'"
+        "Initializing Vertex AI for project '%s' in '%s'",
+        GOOGLE_CLOUD_PROJECT,
+        GOOGLE_CLOUD_LOCATION,
     )
     vertexai.init(project=GOOGLE_CLOUD_PROJECT, location=GOOGLE_CLOUD_LOCATION)
 
     try:
-        logger.info(f"Connecting to remote agent engine: {AGENT_ENGINE_RESOURCE_NAME}")
+        logger.info("Connecting to remote agent engine: %s", AGENT_ENGINE_RESOURCE_NAME)
         remote_agent_app = agent_engines.get(AGENT_ENGINE_RESOURCE_NAME)
         logger.info("Successfully connected to the remote agent.")
 
@@ -55,20 +56,22 @@ def main():
         user_id = f"remote_user_{uuid.uuid4()}"
         query = "I need some cool ideas for a 10-year old's birthday. They like space exploration and robots."
 
-        logger.info(f"Creating remote session for user_id: {user_id}")
+        logger.info("Creating remote session for user_id: %s", user_id)
         remote_session_info = remote_agent_app.create_session(user_id=user_id)
         session_id = remote_session_info["id"]
-        logger.info(f"Remote session created with ID: {session_id}")
+        logger.info("Remote session created with ID: %s", session_id)
 
         print(f"\n> You: {query}")
-        logger.info(f"Sending query to remote agent (session: {session_id}): '{query}'")
+        with log_context(session_id=session_id, agent_id=AGENT_ENGINE_RESOURCE_NAME):
+            logger.info("Sending query to remote agent: '%s'", query)
 
-        response_events = []
-        for event in remote_agent_app.stream_query(
-            user_id=user_id, session_id=session_id, input={"text": query}
-        ):
-            logger.info(f"Received event: {event}")
-            response_events.append(event)
+            response_events = []
+            for event in remote_agent_app.stream_query(
+                user_id=user_id, session_id=session_id, input={"text": query}
+            ):
+                event_logger.info("Received event: %s", event)
+                response_events.append(event)
+            logger.info("Received %d events from remote agent.", len(response_events))
 
         agent_reply_text = "Could not extract a clear text reply."
         if response_events:
@@ -84,10 +87,10 @@ def main():
                         break
 
         print(f"\n< Agent: {agent_reply_text}")
-        logger.info(f"Agent's final reply: {agent_reply_text}")
+        logger.debug("Agent's final reply: %s", agent_reply_text)
 
     except Exception as e:
-        logger.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
 
 
 if __name__ == "__main__":
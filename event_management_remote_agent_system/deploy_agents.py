@@ -11,12 +11,10 @@ from src.agents import (
     organizer_agent,
 )
 from vertexai.preview import reasoning_engines
+from logging_config import setup_logging
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - [DeployWorkers] %(message)s",
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Define worker agents to deploy
@@ -40,14 +38,14 @@ def deploy_single_agent(agent_object, requirements, display_name_prefix="adk"):
 
     if agent_object is None or not isinstance(agent_object, Agent):
         logger.error(
-            f"Invalid agent object provided to deploy_single_agent: {agent_object}"
+            "Invalid agent object provided to deploy_single_agent: %s", agent_object
         )
         return None
 
     agent_name = getattr(agent_object, "name", "unknown-agent")
     display_name = f"{display_name_prefix}-{agent_name}"
-    logger.info(f"Attempting to deploy agent '{agent_name}' as '{display_name}'...")
-    logger.info(f"Using requirements: {requirements}")
+    logger.info("Attempting to deploy agent '%s' as '%s'...", agent_name, display_name)
+    logger.info("Using requirements: %s", requirements)
 
     # Get agent path string for reporting purposes
     try:
@@ -61,13 +59,13 @@ def deploy_single_agent(agent_object, requirements, display_name_prefix="adk"):
             extra_packages=["src"],
         )
 
-        logger.info(f"Deployment submitted successfully for '{agent_name}'!")
+        logger.info("Deployment submitted successfully for '%s'!", agent_name)
         resource_name = remote_app.resource_name if remote_app.resource_name else None
-        logger.info(f"Agent Engine Resource Name: {remote_app.name}")
-        logger.info(f"App Name (Resource name): {resource_name}")
+        logger.info("Agent Engine Resource Name: %s", remote_app.name)
+        logger.info("App Name (Resource name): %s", resource_name)
 
     except Exception as e:
-        logger.error(f"Deployment failed for '{display_name}': {e}", exc_info=True)
+        logger.error("Deployment failed for '%s': %s", display_name, e, exc_info=True)
 
 
 # Main
@@ -88,16 +86,19 @@ def main():
 
     # Initialize Vertex AI SDK
     logger.info(
-        f"Initializing Vertex AI: Project='{project_id}', Location='{location}', Staging='{staging_bucket}'"
+        "Initializing Vertex AI: Project='%s', Location='%s', Staging='%s'",
+        project_id,
+        location,
+        staging_bucket,
     )
     vertexai.init(project=project_id, location=location, staging_bucket=staging_bucket)
 
     # Deploy the agent
-    logger.info(f"Deploying {len(AGENTS_TO_DEPLOY)} worker agent(s)")
+    logger.info("Deploying %d worker agent(s)", len(AGENTS_TO_DEPLOY))
     for agent_obj in AGENTS_TO_DEPLOY:
         logger.info("-" * 40)
         agent_name = getattr(agent_obj, "name", "unknown")
-        logger.info(f"Deploying worker agent: {agent_name}")
+        logger.info("Deploying worker agent: %s", agent_name)
         deploy_single_agent(agent_obj, BASE_REQUIREMENTS)
 
 
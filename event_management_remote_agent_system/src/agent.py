@@ -10,6 +10,7 @@ from google.adk.artifacts import InMemoryArtifactService
 from google.adk.memory import InMemoryMemoryService
 from google.genai.types import Content, Part
 from .agents.event_organizer import organizer_agent
+from .tools.logging_config import log_context, setup_logging, track_logging_cost
 import uuid
 
 
@@ -17,9 +18,7 @@ import uuid
 load_dotenv()
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -33,35 +32,52 @@ async def interact(
     runner: Runner,
 ) -> str:
     """Sends a query to the agent and returns the final text response."""
-    logging.info(f"User ({user_id}) query: {query}")
-    print(f"\n> User ({user_id}): {query}")
-
-    session = session_service.get_session(
-        app_name=app_name, user_id=user_id, session_id=session_id
-    )
-    if not session:
-        session = session_service.create_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
-        )
-        logging.info(f"New session created: {session_id}")
-
-    user_message = Content(parts=[Part(text=query)], role="user")
-    final_response_text = "Agent did not provide a response."
-
-    try:
-        async for event in runner.run_async(
-            user_id=user_id, session_id=session_id, new_message=user_message
-        ):
-            if event.is_final_response() and event.content and event.content.parts:
-                final_response_text = (
-                    event.content.parts[0].text or "Agent sent non-text content."
+    with log_context(
+        session_id=session_id, agent_id=runner.agent.name
+    ), track_logging_cost() as logging_cost:
+        logger.info("User (%s) query: %s", user_id, query)
+        print(f"\n> User ({user_id}): {query}")
+        final_response_text = "Agent did not provide a response."
+
+        try:
+            session = session_service.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+            if not session:
+                session = session_service.create_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id
                 )
-    except Exception as e:
-        logging.error(f"Error during agent run: {e}")
-        return f"Error: {e}"
-
-    logging.info(f"Agent response: {final_response_text}")
-    return final_response_text
+                logger.info("New session created: %s", session_id)
+
+            user_message = Content(parts=[Part(text=query)], role="user")
+
+            try:
+                async for event in runner.run_async(
+                    user_id=user_id, session_id=session_id, new_message=user_message
+                ):
+                    if (
+                        event.is_final_response()
+                        and event.content
+                        and event.content.parts
+                    ):
+                        final_response_text = (
+                            event.content.parts[0].text
+                            or "Agent sent non-text content."
+                        )
+            except Exception as e:
+                logger.error("Error during agent run: %s", e)
+                final_response_text = f"Error: {e}"
+                return final_response_text
+
+            logger.debug("Agent response: %s", final_response_text)
+            return final_response_text
+        finally:
+            # Reported on errors too; only this turn's own logging is counted
+            logger.info(
+                "Agent responded with %d characters.",
+                len(final_response_text),
+                extra={"logging_overhead_us": logging_cost.caller_ns // 1000},
+            )
 
 
 root_agent = organizer_agent
@@ -85,7 +101,7 @@ if __name__ == "__main__":
             artifact_service=artifact_service,
             memory_service=memory_service,
         )
-        logger.info(f"Runner initialized for agent")
+        logger.info("Runner initialized for agent")
 
         user_id = f"mcp_user_{uuid.uuid4()}"
         current_session_id = f"mcp_session_{uuid.uuid4()}"
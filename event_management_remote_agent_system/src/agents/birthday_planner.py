@@ -2,9 +2,7 @@ from google.adk.agents import LlmAgent
 import logging
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 # Create the Birthday Planner Agent
 birthday_planner_agent = LlmAgent(
@@ -20,4 +18,4 @@ birthday_planner_agent = LlmAgent(
     ),
     tools=[],
 )
-logging.info("Birthday Planner Agent initialized.")
+logger.info("Birthday Planner Agent initialized.")
@@ -9,9 +9,7 @@ import asyncio
 import nest_asyncio
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 # Load and set environment variables from .env file
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
@@ -21,7 +19,7 @@ MCP_CALENDAR_SERVER_URL = os.getenv(
 
 # Register Claude Model for ADK
 LLMRegistry.register(Claude)
-logging.info("Claude model registered with LLMRegistry.")
+logger.info("Claude model registered with LLMRegistry.")
 
 
 async def create_calendar_service_agent():
@@ -29,8 +27,8 @@ async def create_calendar_service_agent():
     Creates the CalendarServiceAgent, asynchronously fetching tools from the MCP server.
     """
 
-    logging.info(
-        f"Attempting to connect to MCP Calendar Service at: {MCP_CALENDAR_SERVER_URL}"
+    logger.info(
+        "Attempting to connect to MCP Calendar Service at: %s", MCP_CALENDAR_SERVER_URL
     )
 
     # Fetch tools from the MCP Calendar Service
@@ -38,7 +36,7 @@ async def create_calendar_service_agent():
         connection_params=SseServerParams(url=MCP_CALENDAR_SERVER_URL)
     )
 
-    logging.info(f"Fetched {len(mcp_tools)} tools from MCP Calendar Service.")
+    logger.info("Fetched %d tools from MCP Calendar Service.", len(mcp_tools))
 
     agent = LlmAgent(
         name="CalendarServiceAgent",
@@ -53,7 +51,7 @@ async def create_calendar_service_agent():
         ),
         tools=mcp_tools,
     )
-    logging.info(
+    logger.info(
         "Calendar Service Agent initialized with tools from MCP Calendar Service."
     )
     return agent, exit_stack
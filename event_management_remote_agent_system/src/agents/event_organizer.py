@@ -9,9 +9,7 @@ from .calendar_service import calendar_agent
 import logging
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 organizer_agent = LlmAgent(
     name="EventOrganizerAgent",
@@ -32,4 +30,4 @@ organizer_agent = LlmAgent(
         agent_tool.AgentTool(agent=calendar_agent),
     ],
 )
-logging.info(f"Organizer Agent defined")
+logger.info("Organizer Agent defined")
@@ -3,23 +3,23 @@ import os
 import logging
 from fastmcp import FastMCP
 from calendar_tools import create_calendar_event
+from logging_config import setup_logging
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize FastMCP App
 mcp = FastMCP("ADKCalendarMCPService")
-logging.info(f"FastMCP server initialized")
+logger.info("FastMCP server initialized")
 
 # Register the Python functions as MCP tools
 mcp.tool()(create_calendar_event)
-logging.info("Tools registered with FastMCP server.")
+logger.info("Tools registered with FastMCP server.")
 
 
 # Entry point for Cloud Run
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
-    logging.info(f"Starting FastMCP server on port {port}...")
+    logger.info("Starting FastMCP server on port %d...", port)
     asyncio.run(mcp.run_sse_async(host="0.0.0.0", port=port))
@@ -2,9 +2,7 @@ from typing import Dict, Any
 import logging
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 
 def create_calendar_event(
@@ -21,11 +19,15 @@ def create_calendar_event(
     Returns:
         dict: Indicating success or failure of event creation.
     """
-    logging.info(
-        f"[MCP Calendar Tool Server] Creating event: {title} on {date} at {time} for {duration_hours} hours"
+    logger.info(
+        "[MCP Calendar Tool Server] Creating event: %s on %s at %s for %s hours",
+        title,
+        date,
+        time,
+        duration_hours,
     )
     event_id = f"mcp_event_{hash(title + date + time)}"
-    logging.info(f"[MCP Calendar Tool Server] Event ID: {event_id}")
+    logger.info("[MCP Calendar Tool Server] Event ID: %s", event_id)
     return {
         "status": "success",
         "event_id": event_id,